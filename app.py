@@ -2,9 +2,24 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import os
-
-# Import helper functions from nlp_utils for cleaning, sentiment, and topic modeling
-from nlp_utils import clean_text, get_sentiment, perform_topic_modeling
+import io
+import json
+import hashlib
+import threading
+
+# Import helper functions from nlp_utils for cleaning, sentiment, and topic modeling.
+# Modules that load scipy.sparse or pyarrow's dataset/parquet layers (brand_intel,
+# dedup, keyword_index, results_store, stream_state, trends) are imported where they are used.
+from nlp_utils import (
+    MINIBATCH_MIN_ROWS, TOPIC_VOCABULARY_SIZE, dataset_fingerprint, filter_platform, run_pipeline, perform_topic_modeling,
+    select_n_topics, topic_recommendations, warm_up
+)
+from nlp_cache import PIPELINE_VERSION, NLPCache
+from comment_view import PAGE_SIZES, CommentIndex, page, page_count
+from csv_ingest import STREAMING_MIN_BYTES, stream_analyze_csv
+from engagement import impact_table, rank_impact
+from profiling import PipelineProfile, max_rss_bytes, stage
+from youtube_ingest import QuotaExceededError, build_youtube_client, extract_video_id, iter_comment_pages
 
 # ---------------------------
 # Streamlit App Configuration
@@ -109,6 +124,201 @@ st.markdown(
     """, unsafe_allow_html=True
 )
 
+# ---------------------------
+# Persistent NLP Result Cache
+# ---------------------------
+# One cache connection per server process, shared by every session and rerun
+@st.cache_resource
+def get_nlp_cache():
+    cache_path = os.path.join(os.path.dirname(__file__), ".cache", "nlp_results.sqlite")
+    return NLPCache(cache_path)
+
+nlp_cache = get_nlp_cache()
+
+# ---------------------------
+# NLP Model Warm-up
+# ---------------------------
+# TextBlob and scikit-learn are imported lazily by nlp_utils, so the first page
+# renders without them. They are loaded in the background once per server
+# process (shared by every session) while the user picks a data source.
+@st.cache_resource(show_spinner=False)
+def warm_nlp_models():
+    thread = threading.Thread(target=warm_up, name="nlp-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+warm_nlp_models()
+
+# ---------------------------
+# Pipeline Profiling
+# ---------------------------
+# Every stage that runs during this rerun records its timing and memory here;
+# memoized stages that are served from the cache do not run and are not listed.
+profile = PipelineProfile()
+
+# Set BRAND_INTEL_PROFILE_LOG to a file path to append each profiled rerun to a JSON Lines log
+PROFILE_LOG = os.environ.get("BRAND_INTEL_PROFILE_LOG")
+
+# ---------------------------
+# Memoized Pipeline Stages
+# ---------------------------
+# Streamlit reruns this script on every widget interaction. Each stage below is
+# cached on a fingerprint of its inputs, so only stages whose inputs changed are
+# recomputed. Frames returned by cache_resource are shared: treat them as read-only.
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_csv(fingerprint, _source, _profile=None):
+    """Parses a CSV (path or bytes); cached on the source fingerprint."""
+    if isinstance(_source, bytes):
+        _source = io.BytesIO(_source)
+    with stage(_profile, "ingestion") as run:
+        df = pd.read_csv(_source)
+        run["rows"] = len(df)
+    return df
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def load_precomputed(fingerprint, _path, _profile=None):
+    """Loads headless batch results (Parquet + summary); cached on path and mtime."""
+    from brand_intel import load_results
+
+    with stage(_profile, "ingestion") as run:
+        df, summary = load_results(_path)
+        run["rows"] = len(df)
+    return df, summary
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def load_store(fingerprint, _root, _profile=None):
+    """Loads a results store (memory-mapped Arrow/Parquet partitions); cached on its file listing."""
+    from results_store import load_results_frame
+
+    with stage(_profile, "ingestion") as run:
+        df, topic_keywords, n_batches = load_results_frame(_root)
+        run["rows"] = len(df)
+    return df, {"rows": len(df), "topic_keywords": topic_keywords, "batches": n_batches}
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def analyze_comments(fingerprint, platform, dedupe, _raw_df, _profile=None):
+    """Platform filter + cleaning + sentiment; cached on dataset fingerprint, platform and dedupe."""
+    return run_pipeline(filter_platform(_raw_df, platform), cache=nlp_cache, dedupe=dedupe, profile=_profile)
+
+@st.cache_resource(show_spinner=False)
+def streamed_results():
+    """StreamStates of streamed uploads, keyed by (fingerprint, platform, dedupe, topic settings)."""
+    return {}
+
+def stream_upload(fingerprint, platform, dedupe, topic_settings, source, max_kept=4, profile=None):
+    """
+    Streams a large upload through the pipeline chunk by chunk, redrawing live
+    aggregates after each chunk. Every chunk is folded into a StreamState
+    (totals, keyword counts, trends, mini-batch topics and a row sample) and
+    dropped. Returns the state, which is kept for later reruns, or None if
+    the file cannot be read.
+    """
+    from stream_state import StreamState
+
+    store = streamed_results()
+    key = (fingerprint, platform, dedupe, topic_settings)
+    if key in store:
+        return store[key]
+
+    n_topics, engine, max_features, keyword_ranking, time_budget = topic_settings
+    state = StreamState(n_topics, engine, max_features, keyword_ranking, topic_budget=time_budget, profile=profile)
+    progress = st.progress(0.0, text="Streaming upload...")
+    live = st.empty()
+    try:
+        for chunk, _, fraction_read in stream_analyze_csv(
+            source, platform, cache=nlp_cache, dedupe=dedupe, profile=profile
+        ):
+            state.add(chunk)
+            aggregates = state.aggregates
+            progress.progress(fraction_read, text=f"Analyzed {aggregates.rows:,} comments ({fraction_read:.0%} of file)")
+            with live.container():
+                col_rows, col_score = st.columns(2)
+                col_rows.metric("Comments analyzed", f"{aggregates.rows:,}")
+                col_score.metric("Mean sentiment", f"{aggregates.mean_score:+.3f}")
+                st.bar_chart(aggregates.sentiment_counts)
+        state.finish()
+    except ValueError as e:
+        st.error(str(e))
+        return None
+    finally:
+        progress.empty()
+        live.empty()
+
+    # Keep only the most recent analyses in memory
+    while len(store) >= max_kept:
+        store.pop(next(iter(store)))
+    store[key] = state
+    return state
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def build_keyword_index(fingerprint, platform, _texts, _profile=None):
+    """Sparse keyword counts; cached on dataset fingerprint and platform."""
+    from keyword_index import KeywordIndex
+
+    with stage(_profile, "keywords", len(_texts)):
+        return KeywordIndex().add(_texts)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def model_topics(fingerprint, platform, n_topics, engine, max_features, keyword_ranking, dedupe, _texts,
+                 _duplicate_group=None, _profile=None):
+    """Topic modeling; cached on dataset fingerprint, platform, dedupe and the topic settings."""
+    return perform_topic_modeling(
+        _texts, n_topics=n_topics, engine=engine, max_features=max_features, keyword_ranking=keyword_ranking,
+        duplicate_group=_duplicate_group, profile=_profile,
+    )
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def build_trend_cube(fingerprint, platform, dedupe, topic_settings, _df, _profile=None):
+    """Hourly time x platform x sentiment x topic rollup; cached on dataset, platform, dedupe and topic settings."""
+    from trends import TrendCube
+
+    with stage(_profile, "trends", len(_df)):
+        return TrendCube.build(_df, freq="h")
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def build_comment_index(fingerprint, platform, dedupe, topic_settings, _df):
+    """Row positions per sentiment/topic and sort orders for the comment browser; cached like the trend cube."""
+    return CommentIndex(_df)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def choose_n_topics(fingerprint, platform, dedupe, time_budget, max_features, _texts, _profile=None):
+    """Automatic topic count search; cached on dataset fingerprint, platform and search settings."""
+    with stage(_profile, "topic selection", len(_texts)):
+        return select_n_topics(_texts, time_budget=time_budget, max_features=max_features)
+
+# ---------------------------
+# Comment Browser
+# ---------------------------
+def comment_browser(index, df, key, sentiment=None, topic=None):
+    """
+    Paginated, searchable and sortable comment table.
+
+    Filtering, search and sorting run on the server against the comment
+    index; only the rows of the visible page are sent to the browser.
+    """
+    col_search, col_sort, col_size = st.columns([3, 2, 1])
+    search = col_search.text_input("Search comments", key=f"{key}_search", placeholder="e.g. refund")
+    sort = col_sort.selectbox("Sort by", index.sort_options(), key=f"{key}_sort")
+    page_size = col_size.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_size")
+
+    positions = index.select(sentiment=sentiment, topic=topic, search=search, sort=sort)
+    n_pages = page_count(len(positions), page_size)
+    # Start from the first page whenever the query changes
+    query = (sentiment, topic, search, sort, page_size)
+    if st.session_state.get(f"{key}_query") != query or st.session_state.get(f"{key}_page", 1) > n_pages:
+        st.session_state[f"{key}_query"] = query
+        st.session_state[f"{key}_page"] = 1
+    page_number = st.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, key=f"{key}_page")
+
+    start = (page_number - 1) * page_size
+    st.write(
+        f"Showing {min(start + 1, len(positions)):,}-{min(start + page_size, len(positions)):,} "
+        f"of {len(positions):,} comments:"
+    )
+    st.dataframe(page(df, positions, page_number, page_size,
+                      ["comment_text", "sentiment_label", "sentiment_score", "likes", "platform"]))
+
 # ---------------------------
 # Sidebar: Data Input & Settings
 # ---------------------------
@@ -117,22 +327,45 @@ st.sidebar.header("Upload & Settings")
 # User chooses where the data comes from
 data_source = st.sidebar.radio(
     "Data Source",
-    ("Upload CSV", "Use Sample Data", "Fetch from YouTube")
+    ("Upload CSV", "Use Sample Data", "Fetch from YouTube", "Load Precomputed Results")
 )
 
 df = None
+data_fingerprint = None
+stream_source = None  # Set when a large upload is analyzed in streaming mode
+precomputed = None    # Summary of results produced by the headless batch job
 
 # Option 1: Upload a local CSV file
 if data_source == "Upload CSV":
     uploaded_file = st.sidebar.file_uploader("Upload comments CSV", type=["csv"])
     if uploaded_file is not None:
-        df = pd.read_csv(uploaded_file)
+        # Streamlit holds the whole upload in memory (up to server.maxUploadSize);
+        # getvalue() shares that buffer rather than copying it
+        file_bytes = uploaded_file.getvalue()
+        data_fingerprint = hashlib.blake2b(file_bytes, digest_size=16).hexdigest()
+        # Large uploads are parsed, cleaned and scored chunk by chunk with compact dtypes
+        streaming_mode = st.sidebar.checkbox(
+            "Streaming ingestion",
+            value=len(file_bytes) >= STREAMING_MIN_BYTES,
+            help="Reads only comment_text, platform, timestamp and likes, chunk by chunk, "
+                 "and shows results while the file is processed. Each chunk is folded into totals, "
+                 "keyword counts, trends and topics (updated chunk by chunk), then dropped: only a "
+                 "random sample of comments is kept for the comment tables, so memory stays flat "
+                 "however many comments the file holds."
+        )
+        if streaming_mode:
+            stream_source = file_bytes
+            # Streamed results keep a sample of the rows, not the full frame: memoize their views apart
+            data_fingerprint += ":stream"
+        else:
+            df = load_csv(data_fingerprint, file_bytes, profile)
 
 # Option 2: Use the provided synthetic sample data
 elif data_source == "Use Sample Data":
     sample_path = os.path.join(os.path.dirname(__file__), "data", "sample_comments.csv")
     if os.path.exists(sample_path):
-        df = pd.read_csv(sample_path)
+        data_fingerprint = f"{sample_path}:{os.path.getmtime(sample_path)}"
+        df = load_csv(data_fingerprint, sample_path, profile)
         st.sidebar.success("Loaded sample data!")
     else:
         st.sidebar.error("Sample data file not found.")
@@ -150,76 +383,102 @@ elif data_source == "Fetch from YouTube":
         # Fallback: Ask user to enter key manually
         api_key = st.sidebar.text_input("Enter YouTube API Key", type="password", help="Add your key to .streamlit/secrets.toml to avoid entering it here.")
     
-    # Input for YouTube Video URL
-    youtube_url = st.sidebar.text_input("YouTube Video URL", value="https://www.youtube.com/watch?v=aq5nS9HkCGY")
+    # Input for YouTube Video URLs (one per line, fetched concurrently)
+    youtube_urls = st.sidebar.text_area(
+        "YouTube Video URLs (one per line)",
+        value="https://www.youtube.com/watch?v=aq5nS9HkCGY"
+    )
+    max_comments = st.sidebar.number_input(
+        "Max comments to fetch",
+        min_value=100,
+        max_value=100_000,
+        value=500,
+        step=500,
+        help="Total cap across all videos. Interrupted fetches resume from the last saved page."
+    )
     
     if st.sidebar.button("Fetch Comments"):
+        # Extract Video IDs from the various YouTube URL formats
+        url_lines = [u for u in youtube_urls.splitlines() if u.strip()]
+        video_ids = [extract_video_id(u) for u in url_lines]
+        
         if not api_key:
             st.sidebar.error("Please enter an API Key.")
-        elif not youtube_url:
+        elif not url_lines:
             st.sidebar.error("Please enter a YouTube URL.")
+        elif None in video_ids:
+            st.sidebar.error("Could not extract Video ID. Please check the URL.")
         else:
-            # Logic to extract Video ID from various YouTube URL formats
-            video_id = None
-            if "v=" in youtube_url:
-                video_id = youtube_url.split("v=")[1].split("&")[0]
-            elif "youtu.be/" in youtube_url:
-                video_id = youtube_url.split("youtu.be/")[1].split("?")[0]
-            
-            if not video_id:
-                st.sidebar.error("Could not extract Video ID. Please check the URL.")
-            else:
-                try:
-                    from googleapiclient.discovery import build
+            state_dir = os.path.join(os.path.dirname(__file__), ".cache", "youtube")
+            progress = st.sidebar.progress(0.0, text=f"Fetching comments for {len(video_ids)} video(s)...")
+            live_counts = st.empty()
+            comments_data = []
+            running_counts = pd.Series(0, index=["Positive", "Neutral", "Negative"])
+            try:
+                # Pages stream in from a thread pool; each one is scored as it arrives
+                # (results land in the NLP cache, so the full analysis reuses them)
+                for _, rows in iter_comment_pages(
+                    lambda: build_youtube_client(api_key),
+                    video_ids,
+                    max_comments=int(max_comments),
+                    state_dir=state_dir,
+                ):
+                    comments_data.extend(rows)
+                    page_df = run_pipeline(pd.DataFrame(rows), cache=nlp_cache)
+                    running_counts = running_counts.add(
+                        page_df["sentiment_label"].value_counts(), fill_value=0
+                    )
+                    progress.progress(
+                        min(len(comments_data) / max_comments, 1.0),
+                        text=f"Fetched {len(comments_data):,} comments..."
+                    )
+                    live_counts.bar_chart(running_counts)
+            except QuotaExceededError:
+                st.sidebar.warning("YouTube API quota exhausted. Fetch again later to resume where it stopped.")
+            except Exception as api_error:
+                st.sidebar.error(f"YouTube API Error: {api_error}")
+            finally:
+                live_counts.empty()
                     
-                    with st.spinner(f"Fetching comments for Video ID: {video_id}..."):
-                        # Initialize YouTube API client
-                        youtube = build('youtube', 'v3', developerKey=api_key)
-                        
-                        comments_data = []
-                        try:
-                            # Request comments from the video
-                            request = youtube.commentThreads().list(
-                                part="snippet",
-                                videoId=video_id,
-                                maxResults=100, # Fetch up to 100 per page
-                                textFormat="plainText"
-                            )
-                            
-                            # Pagination loop to fetch up to 500 comments
-                            while request and len(comments_data) < 500: 
-                                response = request.execute()
-                                for item in response.get("items", []):
-                                    comment = item["snippet"]["topLevelComment"]["snippet"]
-                                    comments_data.append({
-                                        "comment_text": comment.get("textDisplay"),
-                                        "likes": comment.get("likeCount"),
-                                        "published_at": comment.get("publishedAt"),
-                                        "platform": "YouTube"
-                                    })
-                                
-                                # Check if there are more pages
-                                if "nextPageToken" in response:
-                                    request = youtube.commentThreads().list(
-                                        part="snippet",
-                                        videoId=video_id,
-                                        maxResults=100,
-                                        textFormat="plainText",
-                                        pageToken=response["nextPageToken"]
-                                    )
-                                else:
-                                    break
-                                    
-                            if comments_data:
-                                df = pd.DataFrame(comments_data)
-                                st.sidebar.success(f"Fetched {len(df)} comments!")
-                            else:
-                                st.sidebar.warning("No comments found or comments are disabled.")
-                        except Exception as api_error:
-                             st.sidebar.error(f"YouTube API Error: {api_error}")
-
-                except Exception as e:
-                    st.sidebar.error(f"Error: {e}")
+            if comments_data:
+                df = pd.DataFrame(comments_data)
+                data_fingerprint = dataset_fingerprint(df)
+                # Keep the fetched comments across reruns triggered by other widgets
+                st.session_state["youtube_data"] = (df, data_fingerprint)
+                st.sidebar.success(f"Fetched {len(df)} comments!")
+            else:
+                st.sidebar.warning("No comments found or comments are disabled.")
+
+    elif "youtube_data" in st.session_state:
+        df, data_fingerprint = st.session_state["youtube_data"]
+        st.sidebar.info(f"Using {len(df):,} previously fetched comments.")
+
+# Option 4: Open results written by `python -m brand_intel analyze`
+elif data_source == "Load Precomputed Results":
+    results_path = st.sidebar.text_input(
+        "Results file (.parquet) or store directory",
+        value="results.parquet",
+        help="Written by: python -m brand_intel analyze comments.csv --out results.parquet "
+             "(or --store results_store/)"
+    )
+    from brand_intel import summary_path
+    from results_store import store_fingerprint
+
+    if results_path and os.path.isdir(results_path):
+        data_fingerprint = store_fingerprint(results_path)
+        try:
+            df, precomputed = load_store(data_fingerprint, results_path, profile)
+            st.sidebar.success(
+                f"Loaded {precomputed['rows']:,} analyzed comments from {precomputed['batches']} batch(es)."
+            )
+        except FileNotFoundError:
+            st.sidebar.error("No results found in this directory.")
+    elif results_path and os.path.exists(results_path) and os.path.exists(summary_path(results_path)):
+        data_fingerprint = f"{os.path.abspath(results_path)}:{os.path.getmtime(results_path)}"
+        df, precomputed = load_precomputed(data_fingerprint, results_path, profile)
+        st.sidebar.success(f"Loaded {precomputed['rows']:,} analyzed comments ({precomputed['generated_at'][:10]}).")
+    elif results_path:
+        st.sidebar.error("Results file or its .summary.json not found.")
 
 # Additional Filters
 platform = st.sidebar.selectbox(
@@ -228,13 +487,70 @@ platform = st.sidebar.selectbox(
 )
 
 # Topic Modeling Parameter
+auto_topics = st.sidebar.checkbox(
+    "Choose the number of topics automatically",
+    help="Scores 2-10 topics on a sample of comments and keeps the best (silhouette)."
+)
 n_topics = st.sidebar.slider(
     "Number of topics (clusters)",
     min_value=2,
     max_value=10,
-    value=5
+    value=5,
+    disabled=auto_topics
+)
+if auto_topics:
+    topic_search_budget = st.sidebar.slider("Search time budget (seconds)", min_value=5, max_value=120, value=30)
+
+# Topic Modeling Engine
+# Mini-batch clustering keeps memory bounded, so it is pre-selected for large datasets.
+# A streamed upload is only analyzed further down, so streaming itself marks it as large.
+topic_engine_options = {
+    "K-Means (exact)": "kmeans",
+    "Mini-Batch K-Means (scalable)": "minibatch",
+}
+large_dataset = stream_source is not None or (df is not None and len(df) >= MINIBATCH_MIN_ROWS)
+topic_engine_label = st.sidebar.selectbox(
+    "Topic modeling engine",
+    list(topic_engine_options),
+    index=1 if large_dataset else 0,
+    help=f"Mini-batch mode is recommended above {MINIBATCH_MIN_ROWS:,} comments."
+)
+topic_engine = topic_engine_options[topic_engine_label]
+
+# Topic Vocabulary & Keyword Ranking
+topic_vocabulary = st.sidebar.select_slider(
+    "Topic vocabulary size",
+    options=[1_000, 5_000, 20_000, 50_000, 100_000],
+    value=TOPIC_VOCABULARY_SIZE,
+    format_func=lambda n: f"{n:,} terms",
+    help="Larger vocabularies capture rarer terms in topics."
+)
+keyword_ranking_options = {
+    "Highest weight": "weight",
+    "Most distinctive": "distinctive",
+}
+keyword_ranking = keyword_ranking_options[st.sidebar.selectbox(
+    "Topic keywords",
+    list(keyword_ranking_options),
+    help="'Most distinctive' favours terms that set a topic apart from the others."
+)]
+
+# Duplicate & Spam Collapsing
+dedupe = st.sidebar.checkbox(
+    "Collapse duplicate & spam comments",
+    help="Scores each group of identical or near-identical comments once and keeps copy-pasted "
+         "spam from forming its own topic. Every comment is still counted."
 )
 
+# Explicit invalidation of the memoized analysis stages
+if st.sidebar.button("♻️ Recompute analysis", help="Discard memoized results and rerun the NLP pipeline."):
+    analyze_comments.clear()
+    model_topics.clear()
+    choose_n_topics.clear()
+    build_trend_cube.clear()
+    build_comment_index.clear()
+    streamed_results().clear()
+
 st.sidebar.markdown("---")
 with st.sidebar.expander("ℹ️ About this Project"):
     st.markdown("""
@@ -254,60 +570,116 @@ with st.sidebar.expander("ℹ️ About this Project"):
 # Main App Logic
 # ---------------------------
 
+# Streaming mode: analysis happens during ingestion, with live aggregates; only bounded results are kept
+streamed = None
+if stream_source is not None:
+    stream_topic_settings = (
+        "auto" if auto_topics else n_topics, topic_engine, topic_vocabulary, keyword_ranking,
+        topic_search_budget if auto_topics else None,
+    )
+    streamed = stream_upload(data_fingerprint, platform, dedupe, stream_topic_settings, stream_source, profile=profile)
+    if streamed is not None:
+        df = streamed.sample
+
 if df is not None:
     # Validation: Ensure the dataset has the required column
     if "comment_text" not in df.columns:
         st.error("CSV must contain a 'comment_text' column.")
     else:
-        # Apply Platform Filter
-        if platform != "All" and "platform" in df.columns:
-            df = df[df["platform"].str.contains(platform.split()[0], case=False, na=False)]
-
-        st.subheader("Raw Data Preview")
-        st.dataframe(df.head())
+        raw_columns = [
+            c for c in df.columns
+            if c not in ("clean_text", "sentiment_score", "sentiment_label", "topic_cluster",
+                         "topic_keywords", "batch_id", "topic_model", "duplicate_group", "duplicate_count")
+        ]
 
         # ---------------------------
         # NLP Processing Pipeline
         # ---------------------------
-        with st.spinner("Processing Comments..."):
-            # 1. Clean Text
-            df["clean_text"] = df["comment_text"].apply(clean_text)
-
-            # 2. Sentiment Analysis
-            # Apply get_sentiment function to each comment
-            sentiments = df["clean_text"].apply(get_sentiment)
-            # Unpack results into two new columns
-            df["sentiment_score"] = [s[0] for s in sentiments]
-            df["sentiment_label"] = [s[1] for s in sentiments]
-
-            # 3. Topic Modeling
-            texts_for_topics = df["clean_text"].tolist()
-            # Filter out empty strings to avoid errors
-            texts_for_topics = [t for t in texts_for_topics if t.strip()]
-            
-            # Only run topic modeling if we have enough data
-            if len(texts_for_topics) > n_topics:
-                # Run the helper function
-                clusters, topic_keywords, kmeans_model = perform_topic_modeling(
-                    texts_for_topics, n_topics=n_topics
+        topic_selection = None  # Automatic topic count search result, if requested
+        if precomputed is not None:
+            # Results from the headless batch job: only visualize, nothing to recompute
+            df = filter_platform(df, platform)
+            keyword_index = build_keyword_index(data_fingerprint, platform, df["clean_text"], profile)
+            topic_keywords = precomputed["topic_keywords"]
+            clusters = df["topic_cluster"] if topic_keywords else None
+            if "batches" in precomputed:
+                source_note = f"Loaded from a results store ({precomputed['batches']} batches, {len(topic_keywords)} topics). "
+            else:
+                source_note = (
+                    f"Precomputed on {precomputed['generated_at'][:19]} UTC "
+                    f"({precomputed['engine']} engine, {precomputed['n_topics']} topics). "
                 )
+            st.caption(source_note + "The topic slider does not apply to precomputed results.")
+        elif streamed is not None:
+            # Streamed upload: topics, keywords, trends and engagement were folded in chunk by chunk
+            keyword_index = streamed.keyword_index
+            topic_keywords = streamed.topic_keywords
+            clusters = df["topic_cluster"] if topic_keywords else None
+            topic_selection = streamed.topic_selection
+            if streamed.topic_model is not None:
+                n_topics = streamed.topic_model.n_topics
+            st.caption(
+                f"Streamed {streamed.aggregates.rows:,} comments. Totals, trends, keywords and topic impact "
+                f"cover all of them; comment tables show a random sample of {len(df):,}."
+            )
+        else:
+            with st.spinner("Processing Comments..."):
+                # Platform filter + 1. Clean Text + 2. Sentiment Analysis
+                # Batched cleaning and lexicon scoring, sharded across CPU cores for large inputs.
+                # Comments already in the persistent cache are not recomputed.
+                df = analyze_comments(data_fingerprint, platform, dedupe, df, profile)
+                # Tokenize once into a sparse index; keyword queries reuse it
+                keyword_index = build_keyword_index(data_fingerprint, platform, df["clean_text"], profile)
+
+                # 3. Topic Modeling
+                # Count non-empty texts (clean_text is already stripped); empty ones are labelled -1
+                # With dedupe, topics are fitted on one comment per duplicate group
+                duplicate_group = df["duplicate_group"] if "duplicate_group" in df.columns else None
+                topic_texts = df["clean_text"]
+                if duplicate_group is not None:
+                    topic_texts = df["clean_text"][~duplicate_group.duplicated()]
+                n_texts = int(topic_texts.ne("").sum())
+
+                # Automatic topic count: score candidate k values on a sample, keep the best
+                if auto_topics and n_texts > 2:
+                    topic_selection = choose_n_topics(
+                        data_fingerprint, platform, dedupe, topic_search_budget, topic_vocabulary, topic_texts, profile
+                    )
+                    n_topics = topic_selection["n_topics"] or n_topics
+            
+                # Only run topic modeling if we have enough data
+                if n_texts > n_topics:
+                    # Single fit; clusters come back aligned to df's index
+                    clusters, topic_keywords, kmeans_model = model_topics(
+                        data_fingerprint, platform, n_topics, topic_engine, topic_vocabulary, keyword_ranking,
+                        dedupe, df["clean_text"], duplicate_group, profile
+                    )
                 
-                # Map clusters back to the original dataframe
-                # We create a temporary dataframe of valid texts to align the clusters
-                df_topics = df[df["clean_text"].str.strip() != ""].copy()
-                # Re-run on the subset to ensure alignment (fast enough for this scale)
-                clusters, topic_keywords, _ = perform_topic_modeling(df_topics["clean_text"].tolist(), n_topics=n_topics)
-                
-                if clusters is not None:
-                    df_topics["topic_cluster"] = clusters
-                    # Merge back to main df
-                    df["topic_cluster"] = df_topics["topic_cluster"]
-                    # Fill NaN for rows that were skipped (empty comments) with -1
-                    df["topic_cluster"] = df["topic_cluster"].fillna(-1).astype(int)
-            else:
-                clusters = None
-                topic_keywords = []
-                st.warning("Not enough data for topic modeling.")
+                    if clusters is not None:
+                        # assign() returns a new frame, leaving the memoized one untouched
+                        df = df.assign(topic_cluster=clusters)
+                else:
+                    clusters = None
+                    topic_keywords = []
+                    st.warning("Not enough data for topic modeling.")
+
+        # Totals over every comment (a streamed upload only keeps a sample of its rows)
+        if streamed is not None:
+            n_comments, sentiment_counts = streamed.aggregates.rows, streamed.aggregates.sentiment_counts
+            sample_note = f"A random sample of {len(df):,} of the {n_comments:,} streamed comments."
+        else:
+            n_comments, sentiment_counts = len(df), df["sentiment_label"].value_counts()
+        # Engagement-weighted sentiment per topic, from one grouped pass
+        impact = None
+        if clusters is not None:
+            impact = streamed.impact_table() if streamed is not None else impact_table(df)
+
+        st.subheader("Raw Data Preview")
+        st.dataframe(df[raw_columns].head())
+
+        # Positions per sentiment and topic, so comment tables only ever slice the visible page
+        topic_settings = (n_topics, topic_engine, topic_vocabulary) if clusters is not None else None
+        comment_index = build_comment_index(data_fingerprint, platform, dedupe, topic_settings, df)
 
         # ---------------------------
         # Visualization Tabs
@@ -319,24 +691,78 @@ if df is not None:
         # --- Tab 1: Overview ---
         with tab_overview:
             st.markdown("### Dataset Overview")
-            st.write(f"Total comments: **{len(df)}**")
-            if "timestamp" in df.columns:
+            st.write(f"Total comments: **{n_comments}**")
+            if streamed is not None:
+                if streamed.aggregates.first_timestamp is not None:
+                    st.write(f"Date range: **{streamed.aggregates.first_timestamp}** to "
+                             f"**{streamed.aggregates.last_timestamp}**")
+            elif "timestamp" in df.columns:
                 try:
                     st.write(f"Date range: **{df['timestamp'].min()}** to **{df['timestamp'].max()}**")
                 except:
                     pass
 
+            from dedup import duplicate_summary
+
+            dedup_stats = streamed.aggregates.duplicate_summary() if streamed is not None else duplicate_summary(df)
+            if dedup_stats is not None and dedup_stats["duplicates"]:
+                st.caption(
+                    f"Collapsed {dedup_stats['duplicates']:,} duplicate comments into "
+                    f"{dedup_stats['groups']:,} groups ({dedup_stats['saved_share']:.0%} less NLP work; "
+                    f"largest group: {dedup_stats['largest_group']:,} copies)."
+                )
+
             # Show simple bar chart of sentiment counts
-            sentiment_counts = df["sentiment_label"].value_counts()
             st.bar_chart(sentiment_counts)
 
+            # Sentiment & topic trends, all drawn from a pre-aggregated rollup (raw rows are scanned once)
+            if streamed is not None:
+                trend_cube = streamed.trend_cube
+            else:
+                trend_cube = build_trend_cube(data_fingerprint, platform, dedupe, topic_settings, df, profile)
+            if not trend_cube.cells.empty:
+                from trends import TREND_FREQUENCIES, detect_spikes, rolling, rolling_mean_score
+
+                st.markdown("### Trends")
+                col_freq, col_metric, col_window = st.columns(3)
+                trend_freq = TREND_FREQUENCIES[col_freq.selectbox("Granularity", list(TREND_FREQUENCIES), index=1)]
+                trend_metric = col_metric.selectbox(
+                    "Metric",
+                    ["Comments by sentiment", "Sentiment share", "Mean sentiment score"]
+                    + (["Comments by topic"] if clusters is not None else [])
+                )
+                trend_window = col_window.number_input("Rolling window (buckets)", min_value=1, max_value=168, value=1)
+
+                if trend_metric == "Mean sentiment score":
+                    trend_table = rolling_mean_score(trend_cube, trend_window, freq=trend_freq)
+                elif trend_metric == "Sentiment share":
+                    trend_table = rolling(trend_cube.series("count", freq=trend_freq), trend_window)
+                    trend_table = trend_table.div(trend_table.sum(axis=1).where(lambda t: t > 0), axis=0)
+                else:
+                    by = "topic_cluster" if trend_metric == "Comments by topic" else "sentiment_label"
+                    trend_table = rolling(trend_cube.series("count", by=by, freq=trend_freq), trend_window)
+                    if by == "topic_cluster":
+                        trend_table = trend_table.drop(columns="-1", errors="ignore")
+                        trend_table.columns = [f"Topic {c}" for c in trend_table.columns]
+                st.line_chart(trend_table)
+
+                # Spikes in negative comments against their trailing baseline
+                negative = trend_cube.series("count", freq=trend_freq)["Negative"]
+                spikes = detect_spikes(negative, window={"h": 48, "D": 14, "W-MON": 8}[trend_freq])
+                if not spikes.empty:
+                    st.warning(
+                        "Negative comment spikes: "
+                        + ", ".join(f"{bucket} ({int(row.value)} vs ~{row.baseline:.0f})"
+                                    for bucket, row in spikes.tail(5).iterrows())
+                    )
+
         # --- Tab 2: Sentiment Analysis ---
         with tab_sentiment:
             st.markdown("### Sentiment Breakdown")
             st.write("Distribution of comment sentiments.")
 
             # Ensure all categories are present for consistent plotting
-            sentiment_counts = df["sentiment_label"].value_counts().reindex(
+            sentiment_counts = sentiment_counts.reindex(
                 ["Positive", "Neutral", "Negative"]
             ).fillna(0)
 
@@ -348,43 +774,77 @@ if df is not None:
                 ["All", "Positive", "Neutral", "Negative"]
             )
 
-            if selected_sentiment != "All":
-                filtered = df[df["sentiment_label"] == selected_sentiment]
-            else:
-                filtered = df
-
-            st.write(f"Showing {len(filtered)} comments:")
-            st.dataframe(filtered[["comment_text", "sentiment_label", "sentiment_score"]])
+            if streamed is not None:
+                st.caption(sample_note)
+            comment_browser(
+                comment_index, df, "sentiment",
+                sentiment=None if selected_sentiment == "All" else selected_sentiment,
+            )
 
         # --- Tab 3: Topic Explorer ---
         with tab_topics:
             st.markdown("### Topic Clusters")
 
+            if topic_selection is not None and topic_selection["scores"]:
+                st.caption(
+                    f"Automatically chose {n_topics} topics ({topic_selection['criterion']} on "
+                    f"{topic_selection['sample_size']:,} sampled comments, {topic_selection['elapsed_seconds']:.1f}s"
+                    + (f"; budget skipped k={topic_selection['skipped']}" if topic_selection["skipped"] else "")
+                    + (f"; could not score k={topic_selection['degenerate']}"
+                       if topic_selection.get("degenerate") else "")
+                    + ")."
+                )
+                st.line_chart(
+                    pd.Series(topic_selection["scores"], name="score").rename_axis("topics"),
+                    x_label="Number of topics",
+                    y_label="Silhouette score",
+                )
+
             if clusters is None:
                 st.warning("Not enough data for topic modeling.")
             else:
                 # Display each topic with its keywords and sample comments
                 for i, keywords in enumerate(topic_keywords):
                     st.markdown(f"**Topic {i}:** {keywords}")
-                    # Get comments belonging to this topic
-                    topic_comments = df[df["topic_cluster"] == i]["comment_text"]
-                    sample_comments = topic_comments.head(5)
-                    with st.expander(f"View sample comments for Topic {i} ({len(topic_comments)} comments)"):
+                    # Row positions of this topic's comments come from the comment index
+                    topic_rows = comment_index.by_topic.get(i, [])
+                    sample_comments = df["comment_text"].iloc[topic_rows[:5]]
+                    topic_size = int(impact["comments"].get(i, 0))
+                    with st.expander(f"View sample comments for Topic {i} ({topic_size:,} comments)"):
                         for c in sample_comments:
                             st.write(f"- {c}")
 
+                # Every comment of one topic, page by page
+                st.markdown("#### Browse Topic Comments")
+                browse_topic = st.selectbox(
+                    "Topic", range(len(topic_keywords)), format_func=lambda i: f"Topic {i}: {topic_keywords[i]}"
+                )
+                if streamed is not None:
+                    st.caption(sample_note)
+                comment_browser(comment_index, df, "topic", topic=browse_topic)
+
         # --- Tab 4: Keyword Insights ---
         with tab_keywords:
             st.markdown("### Keyword Insights")
-            # Flatten all cleaned text into a single list of words
-            all_words = " ".join(df["clean_text"].astype(str).tolist()).split()
-            
-            # Simple stopword removal for visualization
-            from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
-            filtered_words = [w for w in all_words if w not in ENGLISH_STOP_WORDS and len(w) > 2]
+            # Counts come from the sparse keyword index built during the pipeline
+            keyword_scopes = ["All comments", "Positive", "Neutral", "Negative"]
+            if clusters is not None:
+                keyword_scopes += [f"Topic {i}" for i in range(len(topic_keywords))]
+            keyword_scope = st.selectbox("Show keywords for", keyword_scopes)
             
-            # Count frequency
-            freq = pd.Series(filtered_words).value_counts().head(20)
+            if keyword_scope == "All comments":
+                freq = keyword_index.top(20)
+            elif streamed is not None:
+                # A streamed upload's index keeps term totals per sentiment and topic, not per comment
+                if keyword_scope.startswith("Topic "):
+                    freq = keyword_index.top(20, group=("topic_cluster", int(keyword_scope.split()[1])))
+                else:
+                    freq = keyword_index.top(20, group=("sentiment_label", keyword_scope))
+            elif keyword_scope.startswith("Topic "):
+                topic_id = int(keyword_scope.split()[1])
+                freq = keyword_index.top(20, rows=df["topic_cluster"].to_numpy() == topic_id)
+            else:
+                freq = keyword_index.top(20, rows=(df["sentiment_label"] == keyword_scope).to_numpy())
             st.write("Top words in comments (excluding common stopwords):")
             st.bar_chart(freq) 
             st.dataframe(freq.to_frame("count"))
@@ -393,45 +853,57 @@ if df is not None:
         with tab_reco:
             st.markdown("### Suggested Communication Actions")
 
-            # Filter comments by sentiment
-            negative_comments = df[df["sentiment_label"] == "Negative"]
-            positive_comments = df[df["sentiment_label"] == "Positive"]
+            # Topics with the most negative / positive engagement (likes-weighted)
+            recommendations = topic_recommendations(df, topic_keywords, table=impact) if clusters is not None else None
+            if "likes" in df.columns:
+                st.caption("Topics are ranked by engagement: each comment counts once for its author plus once per like. "
+                           "Ranges are 95% confidence intervals; topics driven by a few viral comments get wide ranges.")
 
             st.write("#### 1. Pain Points to Address")
             # Identify which topics are most prevalent in negative comments
-            if clusters is not None and len(negative_comments) > 0:
-                if "topic_cluster" in negative_comments.columns:
-                    neg_cluster_counts = negative_comments["topic_cluster"].value_counts()
-                    # Remove the -1 cluster (noise/empty)
-                    neg_cluster_counts = neg_cluster_counts[neg_cluster_counts.index != -1]
-                    
-                    if not neg_cluster_counts.empty:
-                        for i in neg_cluster_counts.index[:3]:  # Top 3 negative topics
-                            if i < len(topic_keywords):
-                                st.write(f"- **Topic {i}** (keywords: *{topic_keywords[i]}*) has **{neg_cluster_counts[i]}** negative comments.")
-                                st.write("  → Consider addressing these issues in FAQs or dedicated posts.\n")
-                    else:
-                        st.write("No specific topic clusters found in negative comments.")
+            if recommendations is not None and recommendations["pain_points"]["comments"] > 0:
+                if recommendations["pain_points"]["topics"]:
+                    for item in recommendations["pain_points"]["topics"]:
+                        st.write(f"- **Topic {item['topic']}** (keywords: *{item['keywords']}*) has **{item['count']}** negative comments "
+                                 f"(engagement-weighted impact **{item['impact']:,.0f}**, "
+                                 f"95% CI {item['impact_low']:,.0f}-{item['impact_high']:,.0f}).")
+                        st.write("  → Consider addressing these issues in FAQs or dedicated posts.\n")
+                else:
+                    st.write("No specific topic clusters found in negative comments.")
             else:
                 st.write("No negative comments found or topic modeling failed.")
 
             st.write("#### 2. Messaging That Works Well")
             # Identify which topics are most prevalent in positive comments
-            if clusters is not None and len(positive_comments) > 0:
-                if "topic_cluster" in positive_comments.columns:
-                    pos_cluster_counts = positive_comments["topic_cluster"].value_counts()
-                    pos_cluster_counts = pos_cluster_counts[pos_cluster_counts.index != -1]
-                    
-                    if not pos_cluster_counts.empty:
-                        for i in pos_cluster_counts.index[:3]: # Top 3 positive topics
-                            if i < len(topic_keywords):
-                                st.write(f"- **Topic {i}** (keywords: *{topic_keywords[i]}*) has **{pos_cluster_counts[i]}** positive comments.")
-                                st.write("  → Reinforce these themes and wording in future campaigns.\n")
-                    else:
-                         st.write("No specific topic clusters found in positive comments.")
+            if recommendations is not None and recommendations["winning_themes"]["comments"] > 0:
+                if recommendations["winning_themes"]["topics"]:
+                    for item in recommendations["winning_themes"]["topics"]:
+                        st.write(f"- **Topic {item['topic']}** (keywords: *{item['keywords']}*) has **{item['count']}** positive comments "
+                                 f"(engagement-weighted impact **{item['impact']:,.0f}**, "
+                                 f"95% CI {item['impact_low']:,.0f}-{item['impact_high']:,.0f}).")
+                        st.write("  → Reinforce these themes and wording in future campaigns.\n")
+                else:
+                    st.write("No specific topic clusters found in positive comments.")
             else:
                 st.write("No positive comments found or topic modeling failed.")
 
+            if impact is not None:
+                with st.expander("Topic impact table"):
+                    impact_view = rank_impact(impact[impact.index != -1]).copy()
+                    impact_view.insert(0, "keywords", [topic_keywords[i] if 0 <= i < len(topic_keywords) else ""
+                                                       for i in impact_view.index])
+                    st.dataframe(
+                        impact_view[["keywords", "comments", "engagement", "negative_impact", "negative_share",
+                                     "negative_low", "negative_high", "positive_share", "mean_score",
+                                     "score_low", "score_high"]].style.format(
+                            {"engagement": "{:,.0f}", "negative_impact": "{:,.0f}", "negative_share": "{:.1%}",
+                             "negative_low": "{:.1%}", "negative_high": "{:.1%}", "positive_share": "{:.1%}",
+                             "mean_score": "{:.3f}", "score_low": "{:.3f}", "score_high": "{:.3f}"}
+                        )
+                    )
+                    st.caption("Shares and mean scores are weighted by engagement; _low/_high are the bounds "
+                               "of their 95% confidence intervals.")
+
             st.write("#### 3. General Recommendations")
             st.markdown(
                 """
@@ -442,5 +914,62 @@ if df is not None:
                 """
             )
 
+        # ---------------------------
+        # Performance Panel
+        # ---------------------------
+        with st.expander("⏱️ Performance"):
+            if profile.stages:
+                stage_table = profile.to_frame()
+                total_seconds = stage_table["seconds"].sum()
+                col_time, col_rows, col_memory = st.columns(3)
+                col_time.metric("Pipeline time", f"{total_seconds:.2f}s")
+                col_rows.metric("Comments", f"{n_comments:,}")
+                stage_peak = stage_table["peak_rss_mb"].max()
+                server_rss = max_rss_bytes()
+                col_memory.metric(
+                    "Peak RSS (stages)", "n/a" if pd.isna(stage_peak) else f"{stage_peak:,.0f} MB",
+                    help="Highest resident memory reached during the stages below. "
+                         + ("" if server_rss is None else
+                            f"Server all-time peak (every session and rerun): {server_rss / 2 ** 20:,.0f} MB."),
+                )
+                st.bar_chart(stage_table["seconds"])
+                st.dataframe(
+                    stage_table.drop(columns="peak_mb").style.format(
+                        {"seconds": "{:.3f}", "rows_per_second": "{:,.0f}", "peak_rss_mb": "{:,.1f}",
+                         "rss_growth_mb": "{:+,.1f}", "share": "{:.0%}"},
+                        na_rep="-",
+                    )
+                )
+                st.caption(
+                    "Times and throughput of the stages that ran on this rerun. Stages served from "
+                    "memoized results are not listed; use ♻️ Recompute analysis to profile a full run. "
+                    "peak_rss_mb is the server's highest resident memory during each stage, including "
+                    "temporary allocations; rss_growth_mb is how much it grew (negative when a stage freed "
+                    "memory). Work done in worker processes is not included."
+                )
+                profile_record = {"pipeline_version": PIPELINE_VERSION, "rows": n_comments, **profile.to_dict()}
+                st.download_button(
+                    "Download profile (JSON)", json.dumps(profile_record, indent=2),
+                    file_name="pipeline_profile.json", mime="application/json",
+                )
+            else:
+                st.write("Every stage was served from memoized results on this rerun.")
+
+        if PROFILE_LOG and profile.stages:
+            profile.write_json(PROFILE_LOG, pipeline_version=PIPELINE_VERSION, rows=n_comments, source=data_source)
+
 else:
     st.info("Please upload a CSV file with a 'comment_text' column or use the sample data to begin.")
+
+# ---------------------------
+# Sidebar: Cache Statistics
+# ---------------------------
+with st.sidebar.expander("🗄️ NLP Result Cache"):
+    cache_stats = nlp_cache.stats()
+    col_hits, col_misses = st.columns(2)
+    col_hits.metric("Hits", f"{cache_stats['hits']:,}")
+    col_misses.metric("Misses", f"{cache_stats['misses']:,}")
+    st.caption(f"{cache_stats['entries']:,} / {nlp_cache.max_entries:,} cached comments")
+    if st.button("Clear cache"):
+        nlp_cache.clear()
+        st.rerun()
@@ -0,0 +1,59 @@
+"""
+Benchmark: per-row clean_text() vs batch clean_texts().
+
+Builds a corpus by resampling the sample comments (with URLs, mentions and
+hashtags mixed in) and times both cleaning paths at several sizes.
+
+Usage:
+    python benchmarks/bench_clean_text.py
+    python benchmarks/bench_clean_text.py --sizes 10000 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from nlp_utils import clean_text, clean_texts
+
+NOISE = [
+    "", " https://example.com/promo?id=42", " @brand_support", " #ad #sponsored",
+    " www.shop.example.com", "!!!", " :)", " ...",
+]
+
+def build_corpus(n_rows, seed=0):
+    """Resamples the sample comments into a Series of n_rows raw comments."""
+    rng = np.random.default_rng(seed)
+    base = pd.read_csv(os.path.join(ROOT, "data", "sample_comments.csv"))["comment_text"].tolist()
+    texts = rng.choice(base, size=n_rows)
+    noise = rng.choice(NOISE, size=n_rows)
+    return pd.Series([t + s for t, s in zip(texts, noise)])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'clean_text (s)':>15} {'clean_texts (s)':>16} {'speedup':>8}")
+    for n_rows in args.sizes:
+        corpus = build_corpus(n_rows)
+
+        start = time.perf_counter()
+        expected = corpus.apply(clean_text)
+        t_row = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = clean_texts(corpus)
+        t_batch = time.perf_counter() - start
+
+        # The batch path must be a drop-in replacement
+        assert result.equals(expected), "clean_texts output differs from clean_text"
+        print(f"{n_rows:>10} {t_row:>15.3f} {t_batch:>16.3f} {t_row / t_batch:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: NLP pipeline with and without duplicate/spam collapsing.
+
+Builds a corpus of distinct comments (sample comments with random words),
+then mixes in spam campaigns: exact copies and near-copies (a varying word
+appended).
+Times run_pipeline() with and without dedupe, reports the share of rows
+whose scoring was skipped, and checks topic quality: how many topics are
+dominated by spam terms. Near-duplicate detection costs more per row than
+lexicon scoring, so the time saved grows with the spam share.
+
+Usage:
+    python benchmarks/bench_dedup.py
+    python benchmarks/bench_dedup.py --sizes 10000 100000 --spam-share 0.5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dedup import duplicate_summary
+from nlp_utils import perform_topic_modeling, run_pipeline
+
+SPAM = [
+    "Get FREE followers now, visit my profile link!!!",
+    "Win a free iPhone, click the link in my bio",
+    "Check out my channel for daily giveaways and free gift cards",
+]
+SPAM_TERMS = {"free", "followers", "profile", "link", "win", "iphone", "bio", "channel", "giveaways", "gift", "cards"}
+
+def build_spam_corpus(n_rows, spam_share, seed=0):
+    """n_rows comments of which spam_share are copies or near-copies of SPAM."""
+    rng = np.random.default_rng(seed)
+    base = pd.read_csv(os.path.join(ROOT, "data", "sample_comments.csv"))["comment_text"].tolist()
+    n_spam = int(n_rows * spam_share)
+    n_real = n_rows - n_spam
+
+    # Distinct comments: a sample comment followed by four random words from the sample vocabulary
+    vocabulary = sorted({word.strip(".,!?").lower() for text in base for word in text.split()} - {""})
+    words = rng.choice(vocabulary, size=(n_real, 4))
+    real = [f"{text} {' '.join(extra)}" for text, extra in zip(rng.choice(base, size=n_real), words)]
+
+    # Spam: half exact copies, half with one varying word appended
+    templates = rng.choice(SPAM, size=n_spam)
+    suffix = rng.choice(["now", "today", "asap", "guys", "lol", "omg"], size=n_spam)
+    near = rng.random(n_spam) < 0.5
+    spam = [f"{t} {s}" if n else t for t, s, n in zip(templates, suffix, near)]
+
+    texts = np.array(real + spam, dtype=object)
+    rng.shuffle(texts)
+    return pd.DataFrame({"comment_text": texts})
+
+def spam_topics(topic_keywords):
+    """Number of topics whose top three keywords are mostly spam terms."""
+    return sum(
+        sum(term in SPAM_TERMS for term in keywords.split(", ")[:3]) >= 2
+        for keywords in topic_keywords
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--spam-share", type=float, default=0.3, help="share of spam rows (default: 0.3)")
+    parser.add_argument("--n-topics", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'plain (s)':>10} {'dedupe (s)':>11} {'skipped':>8} {'groups':>8} "
+          f"{'spam topics (plain)':>20} {'spam topics (dedupe)':>21}")
+    for n_rows in args.sizes:
+        df = build_spam_corpus(n_rows, args.spam_share)
+
+        start = time.perf_counter()
+        plain = run_pipeline(df, workers=args.workers)
+        t_plain = time.perf_counter() - start
+
+        start = time.perf_counter()
+        deduped = run_pipeline(df, workers=args.workers, dedupe=True)
+        t_dedupe = time.perf_counter() - start
+
+        # Every row keeps a sentiment
+        assert deduped["sentiment_score"].notna().all()
+        stats = duplicate_summary(deduped)
+
+        _, plain_keywords, _ = perform_topic_modeling(plain["clean_text"], n_topics=args.n_topics)
+        _, dedupe_keywords, _ = perform_topic_modeling(
+            deduped["clean_text"], n_topics=args.n_topics, duplicate_group=deduped["duplicate_group"]
+        )
+        print(f"{n_rows:>10} {t_plain:>10.3f} {t_dedupe:>11.3f} {stats['saved_share']:>8.1%} "
+              f"{stats['groups']:>8} {spam_topics(plain_keywords):>20} {spam_topics(dedupe_keywords):>21}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Benchmark: run_pipeline() scaling with the number of worker processes.
+
+Usage:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --rows 1000000 --workers 1 8 16 32
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from nlp_utils import run_pipeline
+from bench_clean_text import build_corpus
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    # Suffix each comment so in-batch dedup does not hide the per-row cost
+    corpus = build_corpus(args.rows)
+    df = pd.DataFrame({"comment_text": [f"{t} row{i}" for i, t in enumerate(corpus)]})
+
+    baseline = None
+    print(f"{'workers':>8} {'seconds':>9} {'rows/s':>12} {'speedup':>8}")
+    for workers in args.workers:
+        start = time.perf_counter()
+        result = run_pipeline(df, workers=workers, min_parallel_rows=0)
+        elapsed = time.perf_counter() - start
+
+        if baseline is None:
+            baseline = (result, elapsed)
+        assert result.equals(baseline[0]), "parallel results differ from serial"
+        print(f"{workers:>8} {elapsed:>9.2f} {args.rows / elapsed:>12,.0f} {baseline[1] / elapsed:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark: per-row get_sentiment() (TextBlob) vs batch get_sentiments().
+
+Scores the same cleaned corpus with both paths, reports throughput and checks
+that every score agrees within SENTIMENT_TOLERANCE.
+
+Usage:
+    python benchmarks/bench_sentiment.py
+    python benchmarks/bench_sentiment.py --sizes 10000 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from nlp_utils import SENTIMENT_TOLERANCE, clean_texts, get_sentiment, get_sentiments
+from bench_clean_text import build_corpus
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--unique", action="store_true",
+                        help="make every comment distinct so in-batch dedup cannot help")
+    args = parser.parse_args()
+
+    # Warm the lexicon once so neither path pays the XML load inside the timing
+    get_sentiment("good")
+    get_sentiments(["good"])
+
+    print(f"{'rows':>10} {'TextBlob rows/s':>16} {'batch rows/s':>13} {'speedup':>8} {'max |diff|':>11}")
+    for n_rows in args.sizes:
+        texts = clean_texts(build_corpus(n_rows)).tolist()
+        if args.unique:
+            texts = [f"{t} row{i}" for i, t in enumerate(texts)]
+
+        start = time.perf_counter()
+        expected = np.array([get_sentiment(t)[0] for t in texts])
+        t_row = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scores, _ = get_sentiments(texts)
+        t_batch = time.perf_counter() - start
+
+        max_diff = float(np.max(np.abs(scores - expected))) if n_rows else 0.0
+        assert max_diff <= SENTIMENT_TOLERANCE, f"scores differ by {max_diff}"
+        print(f"{n_rows:>10} {n_rows / t_row:>16,.0f} {n_rows / t_batch:>13,.0f} "
+              f"{t_row / t_batch:>7.1f}x {max_diff:>11.2g}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: cold-start import time of the app and pipeline modules.
+
+Each target is imported in a fresh interpreter (so nothing is cached in
+sys.modules) and timed; the median over --repeat runs is reported, along
+with which heavy libraries the import pulled in. "app.py imports" are the
+top-level imports of app.py (read from its source), i.e. what every
+Streamlit process loads before the first page renders.
+
+With --warm, the time of nlp_utils.warm_up() (loading TextBlob and its
+lexicon, and scikit-learn) is measured too: the cost moved from import to
+the first analysis.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 7 --warm
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries whose import dominates start-up time
+HEAVY_MODULES = ("textblob", "nltk", "sklearn", "scipy", "pyarrow", "googleapiclient", "streamlit")
+
+MODULES = ("nlp_utils", "keyword_index", "topic_model", "brand_intel", "youtube_ingest")
+
+def app_imports():
+    """Modules imported at the top level of app.py."""
+    with open(os.path.join(ROOT, "app.py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.append(node.module)
+    return list(dict.fromkeys(names))
+
+def time_import(modules, warm=False):
+    """Seconds to import modules (and to warm up nlp_utils) in a fresh interpreter."""
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"for name in {list(modules)!r}: __import__(name)\n"
+        "seconds = time.perf_counter() - start\n"
+        f"loaded = [m for m in {list(HEAVY_MODULES)!r} if m in sys.modules]\n"
+        "warm = None\n"
+        f"if {warm!r}:\n"
+        "    import nlp_utils\n"
+        "    start = time.perf_counter(); nlp_utils.warm_up(); warm = time.perf_counter() - start\n"
+        "print(json.dumps([seconds, warm, loaded]))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per target; the median is kept")
+    parser.add_argument("--warm", action="store_true", help="also time nlp_utils.warm_up() after importing")
+    args = parser.parse_args()
+
+    targets = [(name, [name]) for name in MODULES] + [("app.py imports", app_imports())]
+    print(f"{'target':<18} {'import s':>9} {'warm-up s':>10}  heavy libraries loaded")
+    for label, modules in targets:
+        runs = [time_import(modules, args.warm and label == "nlp_utils") for _ in range(args.repeat)]
+        seconds = statistics.median(r[0] for r in runs)
+        warm = "-" if runs[0][1] is None else f"{statistics.median(r[1] for r in runs):.3f}"
+        print(f"{label:<18} {seconds:>9.3f} {warm:>10}  {', '.join(runs[0][2]) or '-'}")
+
+if __name__ == "__main__":
+    main()
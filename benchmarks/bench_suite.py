@@ -0,0 +1,195 @@
+"""
+Benchmark suite: pipeline throughput and memory on synthetic corpora, vs. a stored baseline.
+
+Generates corpora with the sample-data schema (see synthetic_corpus.py) at
+several sizes and times the functions the app runs on every dataset:
+clean_texts(), get_sentiments(), perform_topic_modeling() (with the engine
+the app would pick for that size) and the whole run_pipeline(). Each result
+records the best time over --repeat runs, rows/sec, peak traced memory (from
+a separate run, so tracing does not slow the timed runs) and a checksum of
+the output.
+
+Results are compared with benchmarks/baseline.json: a benchmark fails when
+it is more than --tolerance times slower than its baseline, or when its
+output checksum changed. The exit code is 1 if anything failed, so the
+suite can gate a release. Timings depend on the machine; the baseline
+records where it was measured, and --save-baseline re-records it.
+
+Usage:
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --sizes 10000 100000 1000000
+    python benchmarks/bench_suite.py --save-baseline
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from nlp_cache import PIPELINE_VERSION
+from nlp_utils import MINIBATCH_MIN_ROWS, clean_texts, get_sentiments, perform_topic_modeling, run_pipeline
+from profiling import PipelineProfile
+from synthetic_corpus import generate_corpus
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+def _digest(*parts):
+    h = hashlib.blake2b(digest_size=8)
+    for part in parts:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+def bench_clean_texts(corpus, _):
+    cleaned = clean_texts(corpus["comment_text"].tolist())
+    return _digest(*cleaned)
+
+def bench_get_sentiments(_, cleaned):
+    scores, labels = get_sentiments(cleaned)
+    counts = dict(zip(*np.unique(labels, return_counts=True)))
+    return _digest(round(float(scores.sum()), 6), sorted(counts.items()))
+
+def bench_topic_modeling(_, cleaned):
+    engine = "minibatch" if len(cleaned) >= MINIBATCH_MIN_ROWS else "kmeans"
+    clusters, keywords, _ = perform_topic_modeling(cleaned, n_topics=5, engine=engine)
+    sizes = sorted(np.bincount(np.asarray(clusters) + 1).tolist())
+    return _digest(sizes, keywords)
+
+def bench_run_pipeline(corpus, _):
+    out = run_pipeline(corpus)
+    return _digest(round(float(out["sentiment_score"].sum()), 6), out["sentiment_label"].value_counts().to_dict())
+
+# Benchmark name -> function(corpus, cleaned_texts) returning an output checksum
+BENCHMARKS = {
+    "clean_texts": bench_clean_texts,
+    "get_sentiments": bench_get_sentiments,
+    "perform_topic_modeling": bench_topic_modeling,
+    "run_pipeline": bench_run_pipeline,
+}
+
+def run_suite(sizes, repeat=3, trace_memory=True, names=None, seed=0):
+    """
+    Runs the benchmarks at every size.
+
+    Returns:
+        dict: {"<name>@<rows>": {"rows", "seconds", "rows_per_second",
+            "peak_mb", "checksum"}}.
+    """
+    results = {}
+    for n_rows in sizes:
+        corpus = generate_corpus(n_rows, seed)
+        cleaned = clean_texts(corpus["comment_text"].tolist())
+        get_sentiments(["warm up"])  # Load the lexicon outside the timings
+        for name in names or BENCHMARKS:
+            benchmark = BENCHMARKS[name]
+            timings, checksum = [], None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                checksum = benchmark(corpus, cleaned)
+                timings.append(time.perf_counter() - start)
+
+            peak_mb = None
+            if trace_memory:
+                profile = PipelineProfile(trace_memory=True)
+                with profile.stage(name, n_rows):
+                    benchmark(corpus, cleaned)
+                peak_mb = profile.to_frame().loc[name, "peak_mb"]
+
+            best = min(timings)
+            results[f"{name}@{n_rows}"] = {
+                "rows": n_rows,
+                "seconds": round(best, 4),
+                "rows_per_second": round(n_rows / best) if best else None,
+                "peak_mb": None if peak_mb is None else float(peak_mb),
+                "checksum": checksum,
+            }
+    return results
+
+def machine_info():
+    """Where the numbers were measured; timings are only comparable on similar machines."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "pipeline_version": PIPELINE_VERSION,
+    }
+
+def compare(results, baseline, tolerance):
+    """
+    Compares results with baseline results.
+
+    Returns:
+        dict: {key: (status, time_ratio)} where status is "ok", "faster",
+            "slower" (beyond tolerance), "changed" (different output) or "new".
+    """
+    report = {}
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            report[key] = ("new", None)
+            continue
+        ratio = result["seconds"] / base["seconds"] if base["seconds"] else None
+        if result["checksum"] != base["checksum"]:
+            status = "changed"
+        elif ratio is not None and ratio > tolerance:
+            status = "slower"
+        elif ratio is not None and ratio < 1 / tolerance:
+            status = "faster"
+        else:
+            status = "ok"
+        report[key] = (status, ratio)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=None)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark; the best is kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced run that measures peak memory")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="fail when a benchmark is this many times slower than its baseline (default: 1.5)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--json", default=None, help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.repeat, not args.no_memory, args.benchmarks)
+    record = {"machine": machine_info(), "results": results}
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["machine"] != record["machine"]:
+            print(f"note: baseline was measured on a different setup: {baseline['machine']}")
+    report = compare(results, baseline["results"], args.tolerance) if baseline else {}
+
+    print(f"{'benchmark':<32} {'seconds':>9} {'rows/s':>12} {'peak MB':>8} {'vs base':>8} {'status':>8}")
+    for key, result in results.items():
+        status, ratio = report.get(key, ("", None))
+        peak = "-" if result["peak_mb"] is None else f"{result['peak_mb']:.1f}"
+        versus = "-" if ratio is None else f"{ratio:.2f}x"
+        print(f"{key:<32} {result['seconds']:>9.3f} {result['rows_per_second'] or 0:>12,} "
+              f"{peak:>8} {versus:>8} {status:>8}")
+
+    for path in filter(None, [args.json, args.baseline if args.save_baseline else None]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2)
+        print(f"Wrote {path}")
+
+    failed = [key for key, (status, _) in report.items() if status in ("slower", "changed")]
+    if failed:
+        print(f"FAILED: {', '.join(failed)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+Synthetic comment corpora with the schema of data/sample_comments.csv.
+
+Columns: comment_id, user_id, timestamp, comment_text, likes, platform,
+post_id. Texts are generated from seeded distributions so the same
+(n_rows, seed) always gives the same corpus:
+
+- Length: log-normal word counts (median ~11 words, long tail, 1-250).
+- Vocabulary: function words, topic words (one topic per comment),
+  sentiment words (positive, negative or none per comment) and a long
+  Zipf-distributed tail of rare terms (names, slang, typos), so the TF-IDF
+  vocabulary keeps growing with the corpus like real comments do.
+- Noise: URLs, @mentions, #hashtags, emoji and repeated punctuation.
+- Users, posts and likes are heavy-tailed; timestamps follow a daily cycle.
+
+Usage:
+    python benchmarks/synthetic_corpus.py --rows 1000000 --out data/synthetic_1m.csv
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CORPUS_COLUMNS = ["comment_id", "user_id", "timestamp", "comment_text", "likes", "platform", "post_id"]
+
+FUNCTION_WORDS = (
+    "the i this it is was and to a my for so but not very really just of in with you "
+    "they have get would again on at be all me what when can too its are that"
+).split()
+
+TOPIC_WORDS = {
+    "delivery": "delivery shipping arrived late package courier tracking days weeks order".split(),
+    "price": "price expensive cheap cost worth money discount sale deal value".split(),
+    "quality": "quality material broke durable stitching fabric sturdy feel build warranty".split(),
+    "service": "support service staff refund return help response email chat waiting".split(),
+    "product": "color size fit design style blue look camera battery screen".split(),
+    "promo": "giveaway link code follow launch collab ad sponsored contest winner".split(),
+}
+
+SENTIMENT_WORDS = {
+    "positive": "love great amazing best perfect awesome happy recommend excellent nice good beautiful".split(),
+    "negative": "terrible worst bad awful disappointed broken horrible poor slow annoying hate useless".split(),
+}
+
+# (share of comments, text prefix of post ids)
+PLATFORMS = {
+    "Instagram": (0.40, "post"),
+    "YouTube": (0.35, "ad"),
+    "X (Twitter)": (0.20, "tweet"),
+    "Other": (0.05, "page"),
+}
+
+EMOJI = ["😍", "😡", "🔥", "👍", "😂", "🙄", ":)", ":("]
+PUNCTUATION = [".", ".", ".", "!", "!!!", "?", "", "..."]
+
+# Token mix: function words, topic words, sentiment words, long tail
+TOKEN_MIX = (0.45, 0.22, 0.10, 0.23)
+LONG_TAIL_SIZE = 50_000
+
+def generate_corpus(n_rows, seed=0, start="2024-01-01", days=30):
+    """
+    Generates n_rows synthetic comments.
+
+    Args:
+        n_rows (int): Number of comments.
+        seed (int): Random seed; the same seed gives the same corpus.
+        start (str): First possible timestamp.
+        days (int): Span of the timestamps in days.
+
+    Returns:
+        pd.DataFrame: CORPUS_COLUMNS, one row per comment.
+    """
+    rng = np.random.default_rng(seed)
+    texts = _comment_texts(n_rows, rng)
+
+    # Platforms, and posts per platform: a few posts draw most of the comments
+    names = list(PLATFORMS)
+    platform = rng.choice(len(names), size=n_rows, p=[PLATFORMS[n][0] for n in names])
+    post = _zipf_choice(rng, max(n_rows // 200, 5), n_rows, 1.1)
+    prefixes = np.array([PLATFORMS[n][1] for n in names], dtype=object)
+    post_id = [f"{prefixes[p]}_{k + 1:04d}" for p, k in zip(platform, post)]
+
+    # Power users: the most active users write a large share of the comments
+    n_users = max(n_rows // 5, 10)
+    user = rng.permutation(n_users)[_zipf_choice(rng, n_users, n_rows, 0.9)]
+    user_id = [f"user_{u:06d}" for u in user]
+
+    # Daily cycle: more comments in the evening than at night
+    hour_weights = 1.0 + np.sin((np.arange(24) - 9) / 24 * 2 * np.pi)
+    hours = rng.choice(24, size=n_rows, p=hour_weights / hour_weights.sum())
+    seconds = rng.integers(0, days, size=n_rows) * 86_400 + hours * 3_600 + rng.integers(0, 3_600, size=n_rows)
+    timestamp = pd.Timestamp(start) + pd.to_timedelta(np.sort(seconds), unit="s")
+
+    # Likes: most comments get none or a few, some get thousands
+    likes = np.minimum(rng.zipf(2.0, size=n_rows) - 1, 100_000)
+
+    return pd.DataFrame({
+        "comment_id": np.arange(1, n_rows + 1),
+        "user_id": user_id,
+        "timestamp": timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+        "comment_text": texts,
+        "likes": likes,
+        "platform": np.array(names, dtype=object)[platform],
+        "post_id": post_id,
+    })
+
+def _zipf_choice(rng, n_items, size, exponent):
+    """Draws item indices 0..n_items-1 with probability proportional to 1 / rank ** exponent."""
+    weights = 1.0 / np.arange(1, n_items + 1) ** exponent
+    return rng.choice(n_items, size=size, p=weights / weights.sum())
+
+def _long_tail(rng):
+    """Distinct pseudo-words for the rare end of the vocabulary (names, slang, typos)."""
+    syllables = "ka lo mi ra ve ti su no pe zu an el or is ub ex qua tre gro fli ba de".split()
+    base = len(syllables)
+    # Distinct three- and four-syllable codes, decoded digit by digit
+    codes = rng.choice(base ** 3 + base ** 4, size=LONG_TAIL_SIZE, replace=False)
+    words = []
+    for code in codes.tolist():
+        n_syllables, code = (3, code) if code < base ** 3 else (4, code - base ** 3)
+        parts = []
+        for _ in range(n_syllables):
+            code, digit = divmod(code, base)
+            parts.append(syllables[digit])
+        words.append("".join(parts))
+    return np.array(words, dtype=object)
+
+def _comment_texts(n_rows, rng):
+    lengths = np.clip(np.round(rng.lognormal(np.log(11), 0.75, size=n_rows)), 1, 250).astype(np.int64)
+    n_tokens = int(lengths.sum())
+    owner = np.repeat(np.arange(n_rows), lengths)  # Comment of each token
+
+    topic_names = list(TOPIC_WORDS)
+    topic = rng.integers(len(topic_names), size=n_rows)
+    # Sentiment per comment: 0 positive, 1 negative, 2 neutral (no opinion words)
+    polarity = rng.choice(3, size=n_rows, p=[0.45, 0.25, 0.30])
+
+    function = np.array(FUNCTION_WORDS, dtype=object)
+    topic_words = np.array([TOPIC_WORDS[t] for t in topic_names], dtype=object)
+    sentiment_words = np.array([SENTIMENT_WORDS["positive"], SENTIMENT_WORDS["negative"]], dtype=object)
+    long_tail = _long_tail(rng)
+
+    kind = rng.choice(4, size=n_tokens, p=TOKEN_MIX)
+    kind[(kind == 2) & (polarity[owner] == 2)] = 0  # Neutral comments use function words instead
+    tokens = np.empty(n_tokens, dtype=object)
+
+    pick = kind == 0
+    # Function words follow a Zipf law too: "the" and "i" are far more common than "its"
+    tokens[pick] = function[_zipf_choice(rng, len(function), pick.sum(), 1.0)]
+    pick = kind == 1
+    tokens[pick] = topic_words[topic[owner[pick]], rng.integers(topic_words.shape[1], size=pick.sum())]
+    pick = kind == 2
+    tokens[pick] = sentiment_words[polarity[owner[pick]], rng.integers(sentiment_words.shape[1], size=pick.sum())]
+    pick = kind == 3
+    tokens[pick] = long_tail[_zipf_choice(rng, LONG_TAIL_SIZE, pick.sum(), 1.0)]
+
+    # Noise appended to some comments
+    noise = np.full(n_rows, "", dtype=object)
+    for share, values in (
+        (0.03, [f" https://shop.example.com/p/{i}" for i in range(50)]),
+        (0.08, [f" @{name}" for name in ("brand_support", "friend", "bestie", "influencer")]),
+        (0.10, [f" #{tag}" for tag in ("ad", "sponsored", "ootd", "review", "unboxing")]),
+        (0.10, [f" {e}" for e in EMOJI]),
+    ):
+        hit = rng.random(n_rows) < share
+        noise[hit] = noise[hit] + np.array(values, dtype=object)[rng.integers(len(values), size=hit.sum())]
+    end = np.array(PUNCTUATION, dtype=object)[rng.integers(len(PUNCTUATION), size=n_rows)]
+
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    tokens = tokens.tolist()
+    return [
+        " ".join(tokens[bounds[i]:bounds[i + 1]]).capitalize() + end[i] + noise[i]
+        for i in range(n_rows)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True, help="CSV file to write")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.rows, args.seed)
+    if os.path.dirname(args.out):
+        os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    corpus.to_csv(args.out, index=False)
+    print(f"Wrote {len(corpus):,} comments to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+Headless batch analysis for scheduled, large-scale runs.
+
+Runs the same clean -> sentiment -> topics -> recommendations pipeline as the
+dashboard, without a browser session, and writes columnar results that the
+app can open directly ("Load Precomputed Results"): either a single Parquet
+file, or a batch appended to a partitioned results store (see results_store).
+The input is streamed: each analyzed chunk is written out and dropped, so
+memory does not grow with the file (see stream_state.StreamState).
+
+Usage:
+    python -m brand_intel analyze comments.csv --out results.parquet
+    python -m brand_intel analyze comments.csv --out results.parquet --workers 32 --n-topics 8
+    python -m brand_intel analyze todays_comments.csv --store results_store/
+    python -m brand_intel analyze todays_comments.csv --topic-model models/topics.pkl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from csv_ingest import stream_analyze_csv
+from nlp_cache import PIPELINE_VERSION, NLPCache
+from nlp_utils import KEYWORD_RANKINGS, TOPIC_ENGINES, TOPIC_VOCABULARY_SIZE, topic_recommendations
+from profiling import PipelineProfile
+from results_store import STORE_FORMATS, append_results
+from stream_state import StreamState
+from topic_model import TopicModel
+
+def summary_path(out_path):
+    """Path of the JSON summary written next to a results file."""
+    return os.path.splitext(out_path)[0] + ".summary.json"
+
+def analyze_file(input_path, n_topics=5, engine="auto", workers=None, chunk_size=100_000,
+                 platform="All", cache=None, extra_columns=(), topic_model=None, retrain=False,
+                 max_features=TOPIC_VOCABULARY_SIZE, keyword_ranking="weight", topic_budget=30.0,
+                 dedupe=False, out_path=None, store=None, store_format="ipc", trends_path=None,
+                 profile=None, log=None):
+    """
+    Analyzes a comments CSV end to end, writing results chunk by chunk.
+
+    Every analyzed chunk is labelled with topics, written to the outputs
+    and folded into a StreamState, then dropped. Topics are fitted on the
+    first comments and updated mini-batch style with every later chunk (see
+    StreamState), so rows written early are labelled by earlier centroids.
+
+    Args:
+        input_path (str): CSV with a 'comment_text' column.
+        n_topics (int or str): Number of topics (clusters) to discover, or
+            "auto" to pick it with nlp_utils.select_n_topics().
+        engine (str): "auto" or one of TOPIC_ENGINES. "auto" picks mini-batch
+            clustering when topics are fitted on at least MINIBATCH_MIN_ROWS
+            comments.
+        workers (int): Worker processes for cleaning and sentiment.
+        chunk_size (int): Rows read and analyzed per chunk.
+        platform (str): Platform filter ("All" keeps every row).
+        cache (NLPCache): Optional persistent result cache.
+        extra_columns (iterable): Additional CSV columns to keep (e.g. comment_id).
+        topic_model (str): Optional path of a saved TopicModel. When it exists,
+            comments are assigned to its topics (and folded into them) instead
+            of refitting, unless drift is detected or retrain is set; the
+            updated model is saved back. Otherwise a new model is fitted there.
+        retrain (bool): Force a full refit of an existing topic model (topic
+            ids are kept stable).
+        max_features (int): TF-IDF vocabulary size for newly fitted topics.
+        keyword_ranking (str): One of KEYWORD_RANKINGS.
+        topic_budget (float): Time budget in seconds for n_topics="auto".
+        dedupe (bool): Collapse duplicate and near-duplicate comments within
+            each chunk: each group is scored once and counts once for topics.
+        out_path (str): Optional Parquet file to write the rows to, with the
+            summary as JSON next to it (see summary_path()).
+        store (str): Optional results store directory to append the rows to
+            as one batch.
+        store_format (str): One of STORE_FORMATS.
+        trends_path (str): Optional Parquet file for the hourly TrendCube.
+        profile (PipelineProfile): Optional profile to record the stages
+            into; a new one is used by default. Its summary is stored in
+            summary["profile"].
+        log (callable): Optional progress callback taking a message string.
+
+    Returns:
+        tuple: (state, summary)
+            - state (StreamState): Aggregates, trend cube, topic model and a
+              sample of the analyzed rows.
+            - summary (dict): Topic keywords, recommendations and run
+              metadata (plus batch_id with store).
+    """
+    log = log or (lambda message: None)
+    profile = profile or PipelineProfile()
+    started = time.perf_counter()
+
+    model = None
+    if topic_model is not None and os.path.exists(topic_model):
+        model = TopicModel.load(topic_model)
+        model.keyword_ranking = keyword_ranking  # Cheap to change; the vocabulary is fixed at fit time
+        log(f"Checking topic model {topic_model} (k={model.n_topics}) against the first comments")
+    state = StreamState(n_topics, engine, max_features, keyword_ranking, topic_model=model, retrain=retrain,
+                        topic_budget=topic_budget, profile=profile)
+    writer = ParquetChunkWriter(out_path) if out_path else None
+    batch_id, parts = None, 0
+
+    def write(chunks):
+        nonlocal batch_id, parts
+        model_id = state.topic_model.model_id if topic_model is not None and state.topic_model else None
+        for chunk in chunks:
+            with profile.stage("output", len(chunk)):
+                if writer is not None:
+                    writer.write(chunk)
+                if store:
+                    batch_id = append_results(chunk, store, state.topic_keywords, batch_id=batch_id, part=parts,
+                                              file_format=store_format, topic_model=model_id)
+                    parts += 1
+
+    try:
+        for chunk, _, fraction_read in stream_analyze_csv(
+            input_path, platform, chunk_size, cache=cache, workers=workers, extra_columns=extra_columns,
+            dedupe=dedupe, profile=profile,
+        ):
+            write(state.add(chunk))
+            log(f"Analyzed {state.aggregates.rows:,} comments ({fraction_read:.0%} of input)")
+        write(state.finish())
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    if writer is not None:
+        with profile.stage("output"):
+            if not writer.rows:
+                writer.write(state.sample)  # No rows: an empty file with the result columns
+            writer.close()
+    if trends_path:
+        with profile.stage("output"):
+            state.trend_cube.save(trends_path)
+
+    model_report = None
+    if topic_model is not None and state.topic_model is not None:
+        state.topic_model.save(topic_model)
+        model_report = {"path": os.path.abspath(topic_model), "model_id": state.topic_model.model_id,
+                        **state.topic_report}
+        log(f"Topic model {topic_model}: {state.topic_report['action']} (k={state.topic_model.n_topics})")
+    n_topics, engine = state.n_topics, state.engine
+    if state.topic_model is not None:
+        n_topics, engine = state.topic_model.n_topics, state.topic_model.engine
+    if state.topic_selection is not None:
+        log(f"Chose {n_topics} topics ({state.topic_selection['criterion']}, "
+            f"{state.topic_selection['elapsed_seconds']:.1f}s)")
+
+    summary = {
+        "input": os.path.abspath(input_path),
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "pipeline_version": PIPELINE_VERSION,
+        "rows": state.aggregates.rows,
+        "platform": platform,
+        "n_topics": n_topics,
+        "engine": engine,
+        "sentiment_counts": {k: int(v) for k, v in state.aggregates.sentiment_counts.items()},
+        "topic_keywords": state.topic_keywords,
+        "recommendations": topic_recommendations(state.sample, state.topic_keywords, table=state.impact_table()),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+    if state.topic_selection is not None:
+        summary["topic_selection"] = state.topic_selection
+    if model_report is not None:
+        summary["topic_model"] = model_report
+    if dedupe:
+        summary["dedup"] = state.aggregates.duplicate_summary()
+    if batch_id is not None:
+        summary["batch_id"] = batch_id
+    summary["profile"] = profile.to_dict()
+    if out_path:
+        with open(summary_path(out_path), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    return state, summary
+
+class ParquetChunkWriter:
+    """
+    Writes analyzed chunks to one Parquet file as they arrive.
+
+    Rows go to a temporary file next to path, which replaces path on
+    close(), so a failed run never leaves a partial results file behind.
+    Every chunk is converted to the schema of the first one.
+    """
+
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.rows = 0
+        self._tmp_path = path + ".tmp"
+        self._writer = None
+
+    def write(self, chunk):
+        if self._writer is None:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            self._writer = pq.ParquetWriter(self._tmp_path, table.schema)
+        else:
+            table = pa.Table.from_pandas(chunk, schema=self._writer.schema, preserve_index=False)
+        self._writer.write_table(table)
+        self.rows += len(chunk)
+
+    def close(self):
+        """Finishes the file; at least one chunk must have been written."""
+        self._writer.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """Discards the rows written so far."""
+        if self._writer is not None:
+            self._writer.close()
+            os.remove(self._tmp_path)
+
+def load_results(out_path):
+    """
+    Loads results written by analyze_file(out_path=...).
+
+    Returns:
+        tuple: (df, summary)
+    """
+    df = pd.read_parquet(out_path)
+    with open(summary_path(out_path), encoding="utf-8") as f:
+        summary = json.load(f)
+    return df, summary
+
+def _topic_count(value):
+    """argparse type for --n-topics: a positive integer or 'auto'."""
+    if value == "auto":
+        return value
+    try:
+        count = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected an integer or 'auto', got {value!r}")
+    if count < 2:
+        raise argparse.ArgumentTypeError("need at least 2 topics")
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="brand_intel", description="Brand Intel headless batch analysis")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analyze = commands.add_parser("analyze", help="analyze a comments CSV and write Parquet results")
+    analyze.add_argument("input", help="CSV file with a comment_text column")
+    analyze.add_argument("--out", default=None, help="output Parquet file (summary JSON is written next to it)")
+    analyze.add_argument("--store", default=None,
+                         help="results store directory to append this batch to (partitioned by platform and date)")
+    analyze.add_argument("--trends", default=None,
+                         help="also write an hourly sentiment/topic rollup cube (Parquet) to this path")
+    analyze.add_argument("--store-format", choices=STORE_FORMATS, default="ipc",
+                         help="file format for --store (default: ipc, memory-mappable Arrow)")
+    analyze.add_argument("--n-topics", type=_topic_count, default=5,
+                         help="number of topics, or 'auto' to choose it (default: 5)")
+    analyze.add_argument("--topic-budget", type=float, default=30.0,
+                         help="time budget in seconds for --n-topics auto (default: 30)")
+    analyze.add_argument("--engine", choices=("auto",) + TOPIC_ENGINES, default="auto",
+                         help="topic modeling engine (default: auto)")
+    analyze.add_argument("--max-features", type=int, default=TOPIC_VOCABULARY_SIZE,
+                         help=f"TF-IDF vocabulary size for topics (default: {TOPIC_VOCABULARY_SIZE})")
+    analyze.add_argument("--keyword-ranking", choices=KEYWORD_RANKINGS, default="weight",
+                         help="rank topic keywords by centroid weight or by distinctiveness (default: weight)")
+    analyze.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    analyze.add_argument("--chunk-size", type=int, default=100_000, help="rows per chunk (default: 100000)")
+    analyze.add_argument("--platform", default="All", help="only analyze this platform (default: All)")
+    analyze.add_argument("--keep-columns", nargs="*", default=["comment_id"],
+                         help="extra CSV columns to carry into the output (default: comment_id)")
+    analyze.add_argument("--topic-model", default=None,
+                         help="saved topic model: assign new comments to its topics (fitted on first use)")
+    analyze.add_argument("--retrain", action="store_true",
+                         help="fully refit the --topic-model, keeping topic ids stable")
+    analyze.add_argument("--dedupe", action="store_true",
+                         help="collapse duplicate and near-duplicate comments (spam, copy-paste) before NLP")
+    analyze.add_argument("--cache", default=None, help="SQLite NLP result cache to reuse across runs")
+    analyze.add_argument("--profile-log", default=None,
+                         help="append per-stage timings and memory of this run to a JSON Lines file")
+    analyze.add_argument("--trace-memory", action="store_true",
+                         help="trace each stage's peak allocations (exact, but slows the run down)")
+    analyze.add_argument("--quiet", action="store_true", help="do not print progress")
+    args = parser.parse_args(argv)
+    if not args.out and not args.store and not args.trends:
+        parser.error("at least one of --out, --store or --trends is required")
+
+    log = None if args.quiet else (lambda message: print(message, file=sys.stderr))
+    cache = NLPCache(args.cache) if args.cache else None
+    profile = PipelineProfile(trace_memory=args.trace_memory)
+    try:
+        state, summary = analyze_file(
+            args.input,
+            n_topics=args.n_topics,
+            engine=args.engine,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            platform=args.platform,
+            cache=cache,
+            extra_columns=args.keep_columns,
+            topic_model=args.topic_model,
+            retrain=args.retrain,
+            max_features=args.max_features,
+            topic_budget=args.topic_budget,
+            keyword_ranking=args.keyword_ranking,
+            dedupe=args.dedupe,
+            out_path=args.out,
+            store=args.store,
+            store_format=args.store_format,
+            trends_path=args.trends,
+            profile=profile,
+            log=log,
+        )
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if cache is not None:
+            cache.close()
+
+    if log:
+        if args.out:
+            log(f"Wrote {summary['rows']:,} rows to {args.out} in {summary['elapsed_seconds']:.1f}s")
+        if args.trends:
+            log(f"Wrote {len(state.trend_cube.cells):,} trend cells to {args.trends}")
+        if args.store:
+            log(f"Appended {summary['rows']:,} rows to {args.store} as batch {summary.get('batch_id')}")
+    if args.profile_log:
+        profile.write_json(
+            args.profile_log, pipeline_version=PIPELINE_VERSION, input=summary["input"],
+            rows=summary["rows"], engine=summary["engine"], n_topics=summary["n_topics"],
+        )
+        if log:
+            log(f"Appended the run profile to {args.profile_log}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Sort keys accepted by CommentIndex.select(): label -> (column, descending)
+SORT_OPTIONS = {
+    "Original order": (None, False),
+    "Most positive": ("sentiment_score", True),
+    "Most negative": ("sentiment_score", False),
+    "Most liked": ("likes", True),
+}
+
+PAGE_SIZES = (25, 50, 100)
+
+class CommentIndex:
+    """
+    Row-position index for paging through analyzed comments without copying them.
+
+    Positions of every sentiment label and topic, and the sort orders, are
+    computed once. A query (sentiment, topic, text search, sort) then
+    yields an array of row positions, and only the rows of the visible page
+    are ever sliced out of the frame (see page()). Recent query results are
+    kept, so turning pages does not repeat a search. An index is shared by
+    every session through st.cache_resource, so the kept queries are
+    guarded by a lock; searches themselves run outside it.
+
+    Args:
+        df (pd.DataFrame): Analyzed comments with comment_text and
+            sentiment_label; sentiment_score, topic_cluster and likes are
+            used when present.
+        max_cached_queries (int): Query results kept for paging.
+    """
+
+    def __init__(self, df, max_cached_queries=16):
+        self.n_rows = len(df)
+        self.by_sentiment = _positions_by(df["sentiment_label"])
+        self.by_topic = _positions_by(df["topic_cluster"]) if "topic_cluster" in df.columns else {}
+        # Lowercased once, so each search is a plain substring scan
+        self._search_text = df["comment_text"].fillna("").astype(str).str.lower().to_numpy(dtype=object)
+        self._sort_values = {
+            column: pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+            for column in ("sentiment_score", "likes") if column in df.columns
+        }
+        self._ranks = {}  # (column, descending) -> rank of every row in that order
+        self._queries = OrderedDict()
+        self._lock = threading.Lock()  # Guards _queries and _ranks
+        self.max_cached_queries = max_cached_queries
+
+    def sort_options(self):
+        """SORT_OPTIONS labels that apply to this frame."""
+        return [label for label, (column, _) in SORT_OPTIONS.items()
+                if column is None or column in self._sort_values]
+
+    def select(self, sentiment=None, topic=None, search=None, sort=None):
+        """
+        Row positions of the comments matching a query, in display order.
+
+        Args:
+            sentiment (str): Optional sentiment label to keep.
+            topic (int): Optional topic id to keep.
+            search (str): Optional case-insensitive text to look for in
+                comment_text.
+            sort (str): Optional SORT_OPTIONS label.
+
+        Returns:
+            np.ndarray: Positions (for df.iloc) of the matching rows.
+        """
+        search = (search or "").strip().lower()
+        key = (sentiment, topic, search, sort)
+        with self._lock:
+            cached = self._queries.get(key)
+            if cached is not None:
+                self._queries.move_to_end(key)
+                return cached
+
+        positions = None
+        for groups, value in ((self.by_sentiment, sentiment), (self.by_topic, topic)):
+            if value is not None:
+                found = groups.get(value, np.zeros(0, dtype=np.int64))
+                positions = found if positions is None else np.intersect1d(positions, found, assume_unique=True)
+        if positions is None:
+            positions = np.arange(self.n_rows)
+
+        if search:
+            texts = self._search_text[positions]
+            hits = np.fromiter((search in text for text in texts), dtype=bool, count=len(texts))
+            positions = positions[hits]
+
+        column, descending = SORT_OPTIONS.get(sort, (None, False))
+        if column in self._sort_values:
+            rank = self._rank(column, descending)
+            # Sorting the candidates' global ranks keeps ties in their original order
+            positions = positions[np.argsort(rank[positions], kind="stable")]
+
+        with self._lock:
+            self._queries[key] = positions
+            self._queries.move_to_end(key)  # Another session may have stored the same query meanwhile
+            while len(self._queries) > self.max_cached_queries:
+                self._queries.popitem(last=False)
+        return positions
+
+    def _rank(self, column, descending):
+        with self._lock:
+            rank = self._ranks.get((column, descending))
+        if rank is None:
+            values = self._sort_values[column]
+            # Missing values sort last in both directions
+            order = np.argsort(-values if descending else values, kind="stable")
+            rank = np.empty(len(order), dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            with self._lock:
+                rank = self._ranks.setdefault((column, descending), rank)
+        return rank
+
+def page(df, positions, page_number, page_size, columns=None):
+    """
+    The rows of one page of a query result.
+
+    Args:
+        df (pd.DataFrame): The frame the index was built from.
+        positions (np.ndarray): Result of CommentIndex.select().
+        page_number (int): 1-based page number (clamped to the valid range).
+        page_size (int): Rows per page.
+        columns (list): Optional columns to keep (missing ones are skipped).
+
+    Returns:
+        pd.DataFrame: At most page_size rows.
+    """
+    n_pages = page_count(len(positions), page_size)
+    page_number = min(max(int(page_number), 1), n_pages)
+    start = (page_number - 1) * page_size
+    rows = df.iloc[positions[start:start + page_size]]
+    if columns is not None:
+        rows = rows[[c for c in columns if c in rows.columns]]
+    return rows
+
+def page_count(n_rows, page_size):
+    """Number of pages needed for n_rows (at least 1, so an empty result has one empty page)."""
+    return max(-(-n_rows // page_size), 1)
+
+def _positions_by(values):
+    """{value: sorted row positions} for every distinct value, from one stable sort."""
+    codes, uniques = pd.factorize(values, sort=True)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    groups = {}
+    for i, value in enumerate(uniques):
+        if bounds[i + 1] > bounds[i]:
+            key = value.item() if hasattr(value, "item") else value
+            groups[key] = order[bounds[i]:bounds[i + 1]]
+    return groups
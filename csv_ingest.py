@@ -0,0 +1,206 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from nlp_utils import filter_platform, run_pipeline, worker_pool
+from profiling import stage
+
+# Only these columns are read; everything else in the upload is skipped at parse time
+INGEST_COLUMNS = ("comment_text", "platform", "timestamp", "likes")
+
+# Uploads at least this large default to streaming ingestion in the app
+STREAMING_MIN_BYTES = 50 * 1024 * 1024
+
+class StreamAggregates:
+    """
+    Running aggregates over analyzed chunks, cheap enough to redraw after every chunk.
+
+    Attributes:
+        rows (int): Comments analyzed so far.
+        sentiment_counts (pd.Series): Count per sentiment label.
+        platform_counts (pd.Series): Count per platform (if the column exists).
+        score_sum (float): Sum of sentiment scores (see mean_score).
+        likes_sum (int): Sum of likes (if the column exists).
+        first_timestamp, last_timestamp: Date range seen so far (if the column exists).
+        duplicate_groups (int): Duplicate groups scored (with dedupe; see duplicate_summary()).
+        largest_group (int): Most copies in one duplicate group.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.sentiment_counts = pd.Series(0, index=["Positive", "Neutral", "Negative"], dtype=np.int64)
+        self.platform_counts = pd.Series(dtype=np.int64)
+        self.score_sum = 0.0
+        self.likes_sum = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.duplicate_groups = None
+        self.largest_group = 0
+
+    @property
+    def mean_score(self):
+        return self.score_sum / self.rows if self.rows else 0.0
+
+    def duplicate_summary(self):
+        """
+        dedup.duplicate_summary() of the streamed comments, or None without dedupe.
+
+        Duplicates are only collapsed within each chunk, so copies that fall
+        in different chunks count as separate groups.
+        """
+        if self.duplicate_groups is None:
+            return None
+        return {
+            "rows": self.rows,
+            "groups": self.duplicate_groups,
+            "duplicates": self.rows - self.duplicate_groups,
+            "saved_share": (self.rows - self.duplicate_groups) / self.rows if self.rows else 0.0,
+            "largest_group": self.largest_group,
+        }
+
+    def update(self, chunk):
+        """Folds one analyzed chunk into the aggregates."""
+        self.rows += len(chunk)
+        counts = chunk["sentiment_label"].value_counts()
+        self.sentiment_counts = self.sentiment_counts.add(counts, fill_value=0).astype(np.int64)
+        self.score_sum += float(chunk["sentiment_score"].sum())
+        if "platform" in chunk.columns:
+            counts = chunk["platform"].value_counts()
+            counts = counts[counts > 0]  # Categorical value_counts lists unused categories
+            self.platform_counts = self.platform_counts.add(counts, fill_value=0).astype(np.int64)
+        if "likes" in chunk.columns:
+            self.likes_sum += int(chunk["likes"].sum())
+        if "timestamp" in chunk.columns and chunk["timestamp"].notna().any():
+            lo, hi = chunk["timestamp"].min(), chunk["timestamp"].max()
+            self.first_timestamp = lo if self.first_timestamp is None else min(self.first_timestamp, lo)
+            self.last_timestamp = hi if self.last_timestamp is None else max(self.last_timestamp, hi)
+        if "duplicate_group" in chunk.columns:
+            self.duplicate_groups = (self.duplicate_groups or 0) + int(chunk["duplicate_group"].nunique())
+            if len(chunk):
+                self.largest_group = max(self.largest_group, int(chunk["duplicate_count"].max()))
+
+def read_csv_chunks(source, chunk_size=100_000, extra_columns=()):
+    """
+    Reads a comments CSV chunk by chunk with compact dtypes.
+
+    Only INGEST_COLUMNS (plus any extra_columns) are parsed: platform becomes
+    categorical, timestamp is parsed to datetime64 and likes to int32 (missing
+    likes count as 0). Extra columns are read as strings, so every chunk
+    gets the same types (e.g. for writing them to one Parquet file).
+
+    Args:
+        source (str or bytes): CSV file path or raw file contents.
+        chunk_size (int): Rows per chunk.
+        extra_columns (iterable): Additional columns to keep (e.g. comment_id).
+
+    Yields:
+        tuple: (chunk, fraction_read) where fraction_read is the approximate
+            share of the file consumed so far (0.0-1.0).
+
+    Raises:
+        ValueError: If the CSV has no 'comment_text' column.
+    """
+    handle = io.BytesIO(source) if isinstance(source, bytes) else open(source, "rb")
+    try:
+        total_bytes = max(handle.seek(0, io.SEEK_END), 1)
+        handle.seek(0)
+        header = pd.read_csv(handle, nrows=0).columns
+        if "comment_text" not in header:
+            raise ValueError("CSV must contain a 'comment_text' column.")
+        handle.seek(0)
+
+        wanted = list(INGEST_COLUMNS) + [c for c in extra_columns if c not in INGEST_COLUMNS]
+        usecols = [c for c in wanted if c in header]
+        dtypes = {column: object for column in usecols if column not in INGEST_COLUMNS}
+        dtypes["comment_text"] = object
+        if "platform" in usecols:
+            dtypes["platform"] = "category"
+        reader = pd.read_csv(handle, usecols=usecols, dtype=dtypes, chunksize=chunk_size)
+        for chunk in reader:
+            if "timestamp" in chunk.columns:
+                chunk["timestamp"] = pd.to_datetime(chunk["timestamp"], errors="coerce")
+            if "likes" in chunk.columns:
+                chunk["likes"] = pd.to_numeric(chunk["likes"], errors="coerce").fillna(0).astype(np.int32)
+            yield chunk, min(handle.tell() / total_bytes, 1.0)
+    finally:
+        handle.close()
+
+def stream_analyze_csv(source, platform="All", chunk_size=100_000, cache=None, workers=None,
+                       extra_columns=(), dedupe=False, profile=None, executor=None):
+    """
+    Streams a CSV through platform filtering, cleaning and sentiment scoring.
+
+    Only one raw chunk is parsed at a time, and analyzed chunks keep compact
+    dtypes (categorical platform and sentiment label). Memory stays bounded
+    as long as the caller drops each chunk once it is used: the app and
+    brand_intel fold it into a stream_state.StreamState (and write it out)
+    rather than keeping it.
+
+    Args:
+        source (str or bytes): CSV file path or raw file contents.
+        platform (str): Platform filter, as in nlp_utils.filter_platform().
+        chunk_size (int): Rows per chunk.
+        cache (NLPCache): Optional persistent result cache.
+        workers (int): Worker processes for run_pipeline().
+        extra_columns (iterable): Additional CSV columns to carry through.
+        dedupe (bool): Collapse duplicate comments within each chunk (see
+            run_pipeline()). Group ids are offset so they stay unique across
+            chunks; duplicates that fall in different chunks are not grouped
+            (dedup.regroup_duplicates() does that for a concatenated frame).
+        profile (PipelineProfile): Optional profile; CSV parsing is recorded
+            as the "ingestion" stage, the rest as in run_pipeline().
+        executor (ProcessPoolExecutor): Optional worker pool shared by every
+            chunk. Without one, a pool is started for the whole file when
+            more than one worker is used, and shut down when the stream ends.
+
+    Yields:
+        tuple: (analyzed_chunk, aggregates, fraction_read) where aggregates is
+            a StreamAggregates updated with every chunk so far.
+    """
+    if executor is None and (workers or os.cpu_count() or 1) > 1:
+        # One pool for the whole file rather than one per chunk
+        with worker_pool(workers or os.cpu_count()) as pool:
+            yield from stream_analyze_csv(source, platform, chunk_size, cache, workers, extra_columns,
+                                          dedupe, profile, executor=pool)
+        return
+
+    aggregates = StreamAggregates()
+    groups_so_far = 0
+    chunks = read_csv_chunks(source, chunk_size, extra_columns)
+    while True:
+        with stage(profile, "ingestion") as run:
+            item = next(chunks, None)
+            run["rows"] = 0 if item is None else len(item[0])
+        if item is None:
+            break
+        chunk, fraction_read = item
+        chunk = filter_platform(chunk, platform)
+        analyzed = run_pipeline(chunk, workers=workers, cache=cache, dedupe=dedupe, profile=profile,
+                                executor=executor)
+        if dedupe and len(analyzed):
+            analyzed["duplicate_group"] += groups_so_far
+            groups_so_far = int(analyzed["duplicate_group"].max()) + 1
+        analyzed["sentiment_label"] = pd.Categorical(
+            analyzed["sentiment_label"], categories=["Positive", "Neutral", "Negative"]
+        )
+        aggregates.update(analyzed)
+        yield analyzed, aggregates, fraction_read
+
+def concat_chunks(chunks):
+    """
+    Concatenates analyzed chunks, unifying categorical columns so they stay compact.
+
+    pd.concat falls back to object dtype when chunks have different categories,
+    so every categorical column is first given the union of all categories.
+    """
+    chunks = [c for c in chunks if len(c)]
+    if not chunks:
+        return pd.DataFrame(columns=list(INGEST_COLUMNS) + ["clean_text", "sentiment_score", "sentiment_label"])
+    for column in chunks[0].columns:
+        if isinstance(chunks[0][column].dtype, pd.CategoricalDtype):
+            categories = pd.api.types.union_categoricals([c[column] for c in chunks]).categories
+            for c in chunks:
+                c[column] = c[column].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
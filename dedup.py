@@ -0,0 +1,177 @@
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+# Estimated Jaccard similarity (of word-bigram shingles) above which comments are near-duplicates
+DEDUP_THRESHOLD = 0.8
+
+# MinHash signature length and LSH banding (num_perm = bands x rows per band).
+# 16 bands of 4 rows make pairs above ~0.5 similarity candidates; candidates
+# are then verified against DEDUP_THRESHOLD on the full signature.
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+
+def find_duplicate_groups(texts, threshold=DEDUP_THRESHOLD, num_perm=MINHASH_PERMUTATIONS,
+                          bands=LSH_BANDS, seed=42):
+    """
+    Groups exact and near-duplicate texts.
+
+    Exact duplicates are found by hashing; near-duplicates with MinHash
+    signatures over word bigrams and locality-sensitive hashing, so only
+    texts that share a band bucket are compared. Groups are transitive
+    (A~B and B~C puts A, B and C together).
+
+    Args:
+        texts (iterable): Cleaned texts.
+        threshold (float): Minimum estimated Jaccard similarity of
+            near-duplicates; None only groups exact duplicates.
+        num_perm (int): MinHash signature length (a multiple of bands).
+        bands (int): LSH bands.
+        seed (int): Seed of the MinHash permutations.
+
+    Returns:
+        tuple: (group, representatives)
+            - group (np.ndarray): Group id per text, numbered in order of
+              first appearance.
+            - representatives (np.ndarray): Position of each group's first
+              text (the text that stands in for the group).
+    """
+    values = pd.Series(list(texts), dtype=object).fillna("")
+    codes, uniques = pd.factorize(values)
+
+    if threshold is None or len(uniques) < 2:
+        components = np.arange(len(uniques))
+    else:
+        components = _lsh_components(list(uniques), num_perm, bands, threshold, seed)
+
+    row_component = components[codes]
+    # Renumber groups by first appearance; the first row of a group represents it
+    _, representatives, group = np.unique(row_component, return_index=True, return_inverse=True)
+    order = np.argsort(representatives, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[group].astype(np.int64), representatives[order]
+
+def fan_out(group_values, group):
+    """Expands one value per group (in group id order) back to one value per row."""
+    return np.asarray(group_values)[group]
+
+def regroup_duplicates(df, threshold=DEDUP_THRESHOLD):
+    """
+    Recomputes duplicate_group and duplicate_count over a whole frame.
+
+    Streaming ingestion only collapses duplicates within a chunk; this groups
+    its concatenated output again (from clean_text) so copies spread over
+    several chunks share a group, e.g. before topic modeling. Sentiment
+    columns are left as they are.
+
+    Returns:
+        pd.DataFrame: A copy of df with the two columns replaced.
+    """
+    group, _ = find_duplicate_groups(df["clean_text"], threshold=threshold)
+    return df.assign(
+        duplicate_group=group.astype(np.int32),
+        duplicate_count=np.bincount(group)[group].astype(np.int32),
+    )
+
+def duplicate_summary(df):
+    """
+    Work saved by duplicate collapsing, from run_pipeline(dedupe=True) output.
+
+    Returns:
+        dict: rows, groups, duplicates (rows - groups), saved_share (share of
+            rows not scored) and largest_group; None if df was not deduplicated.
+    """
+    if "duplicate_group" not in df.columns:
+        return None
+    rows = len(df)
+    groups = int(df["duplicate_group"].nunique())
+    return {
+        "rows": rows,
+        "groups": groups,
+        "duplicates": rows - groups,
+        "saved_share": (rows - groups) / rows if rows else 0.0,
+        "largest_group": int(df["duplicate_count"].max()) if rows else 0,
+    }
+
+# ---------------------------
+# MinHash / LSH
+# ---------------------------
+def _minhash(texts, num_perm, seed):
+    """
+    MinHash signatures over word bigrams (the word itself for one-word texts).
+
+    Returns:
+        tuple: (signatures, has_words) where signatures is a (num_perm x
+            n_texts_with_words) uint32 array, one column per text that has words.
+    """
+    tokens = [t.split() for t in texts]
+    n_words = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+    words = np.array(list(chain.from_iterable(tokens)), dtype=object)
+    word_hash = pd.util.hash_array(words) if len(words) else np.zeros(0, dtype=np.uint64)
+
+    # Bigram hash at each word position, from this word's and the next word's hash
+    is_last = np.zeros(len(words), dtype=bool)
+    is_last[np.cumsum(n_words)[n_words > 0] - 1] = True
+    bigram_hash = word_hash.copy()
+    bigram_hash[:-1] = (word_hash[:-1] * np.uint64(0x9E3779B97F4A7C15)) ^ word_hash[1:]
+    single_word = np.repeat(n_words == 1, n_words)
+    shingles = np.where(is_last, word_hash, bigram_hash)[~is_last | single_word] >> np.uint64(32)
+    n_shingles = np.where(n_words == 1, 1, np.maximum(n_words - 1, 0))
+
+    # Multiply-shift hashing: the high 32 bits of (a * x + b) mod 2**64
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    has_words = n_shingles > 0
+    starts = (np.cumsum(n_shingles) - n_shingles)[has_words]
+    signatures = np.empty((num_perm, len(starts)), dtype=np.uint32)
+    if len(starts):
+        for j in range(num_perm):
+            permuted = (a[j] * shingles + b[j]) >> np.uint64(32)
+            signatures[j] = np.minimum.reduceat(permuted, starts)
+    return signatures, has_words
+
+def _lsh_components(texts, num_perm, bands, threshold, seed):
+    """Connected components of verified near-duplicate pairs found through LSH buckets."""
+    n = len(texts)
+    signatures, has_words = _minhash(texts, num_perm, seed)
+    rows_per_band = num_perm // bands
+    m = signatures.shape[1]
+
+    # Candidate pairs: every text and the first text of each of its band buckets
+    candidates, partners = [], []
+    for band in range(bands):
+        # Combine the band's rows into one bucket key (FNV-style; collisions are filtered below)
+        key = np.full(m, 14695981039346656037, dtype=np.uint64)
+        for row in signatures[band * rows_per_band:(band + 1) * rows_per_band]:
+            key = (key ^ row) * np.uint64(1099511628211)
+        bucket, uniques = pd.factorize(key)
+        first = np.flatnonzero(~pd.Series(bucket).duplicated().to_numpy())
+        leader = np.empty(len(uniques), dtype=np.int64)
+        leader[bucket[first]] = first
+        linked = np.flatnonzero(leader[bucket] != np.arange(m))
+        candidates.append(linked)
+        partners.append(leader[bucket[linked]])
+
+    components = np.arange(n)
+    pairs = np.unique(np.concatenate(candidates) * m + np.concatenate(partners)) if m else np.zeros(0, np.int64)
+    if not len(pairs):
+        return components
+    candidates, partners = pairs // m, pairs % m
+    # Verify each pair once: the share of equal minima estimates Jaccard similarity
+    similarity = (signatures[:, candidates] == signatures[:, partners]).mean(axis=0)
+    similar = similarity >= threshold
+    # Imported here: scipy.sparse is slow to import and nlp_utils imports this module at start-up
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    graph = coo_matrix(
+        (np.ones(int(similar.sum()), dtype=np.int8), (candidates[similar], partners[similar])), shape=(m, m)
+    )
+    labels = connected_components(graph, directed=False)[1]
+    # Texts without words keep their own component; the others are offset past them
+    components[has_words] = n + labels
+    return components
@@ -0,0 +1,141 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# Columns of impact_table(), per group
+IMPACT_COLUMNS = (
+    "comments", "negative", "positive", "engagement", "effective_n",
+    "negative_share", "negative_low", "negative_high",
+    "positive_share", "positive_low", "positive_high",
+    "mean_score", "score_low", "score_high",
+    "negative_impact", "negative_impact_low", "negative_impact_high",
+    "positive_impact", "positive_impact_low", "positive_impact_high",
+)
+
+# Additive per-group sums behind impact_table(): sums of separate batches can be added up
+IMPACT_SUMS = (
+    "comments", "negative", "positive", "engagement", "squared_weights",
+    "weighted_negative", "weighted_positive", "weighted_scores", "weighted_squares",
+)
+
+def engagement_weights(df):
+    """
+    Weight of each comment: its author plus everyone who liked it (1 + likes).
+
+    Comments without a likes column, or with missing / negative likes,
+    weigh 1, so every aggregate falls back to plain comment counts.
+    """
+    if "likes" not in df.columns:
+        return np.ones(len(df))
+    likes = pd.to_numeric(df["likes"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    return 1.0 + np.clip(likes, 0, None)
+
+def impact_table(df, by="topic_cluster", confidence=0.95):
+    """
+    Engagement-weighted sentiment and impact per group, in one grouped pass.
+
+    Every comment is weighted by engagement_weights(), so a complaint liked
+    by 200 people counts for 201 voices. Per group this gives the weighted
+    share of negative and positive comments, the weighted mean sentiment
+    score, and the impact: the weighted number of negative (or positive)
+    voices. Intervals treat the group as a weighted sample of size
+    effective_n (Kish: engagement² / sum of squared weights), so a group
+    carried by one viral comment gets a wide interval instead of a
+    confident share: Wilson intervals for the shares, normal intervals for
+    the mean score. Impact intervals are engagement times the share bounds.
+
+    Args:
+        df (pd.DataFrame): Analyzed comments with sentiment_label and
+            sentiment_score, the by column and optionally likes.
+        by (str): Column to group by, or None for a single "all" group.
+        confidence (float): Confidence level of the intervals.
+
+    Returns:
+        pd.DataFrame: IMPACT_COLUMNS, one row per group (sorted by group
+            key), indexed by the group values.
+    """
+    return impact_from_sums(impact_sums(df, by), confidence)
+
+def impact_sums(df, by="topic_cluster"):
+    """
+    The additive per-group sums impact_table() is computed from (IMPACT_SUMS).
+
+    Sums of separate chunks of comments can be combined with
+    a.add(b, fill_value=0) and turned into an impact table with
+    impact_from_sums(), so streamed comments need not be kept.
+    """
+    if by is None:
+        codes, groups = np.zeros(len(df), dtype=np.int64), pd.Index(["all"])
+    else:
+        codes, groups = pd.factorize(df[by], sort=True)
+        groups = pd.Index(groups, name=by)
+    keep = codes >= 0  # Missing group values are left out
+    codes = codes[keep]
+    weights = engagement_weights(df)[keep]
+    labels = df["sentiment_label"].to_numpy()[keep]
+    scores = pd.to_numeric(df["sentiment_score"], errors="coerce").fillna(0).to_numpy(dtype=float)[keep]
+    negative = labels == "Negative"
+    positive = labels == "Positive"
+
+    def total(values=None):
+        return np.bincount(codes, weights=values, minlength=len(groups))
+
+    return pd.DataFrame({
+        "comments": total().astype(np.int64),
+        "negative": total(negative.astype(float)).astype(np.int64),
+        "positive": total(positive.astype(float)).astype(np.int64),
+        "engagement": total(weights),
+        "squared_weights": total(weights ** 2),
+        "weighted_negative": total(weights * negative),
+        "weighted_positive": total(weights * positive),
+        "weighted_scores": total(weights * scores),
+        "weighted_squares": total(weights * scores ** 2),
+    }, index=groups)
+
+def impact_from_sums(sums, confidence=0.95):
+    """impact_table() from impact_sums(), possibly added up over several chunks."""
+    table = sums[["comments", "negative", "positive", "engagement"]].astype(
+        {"comments": np.int64, "negative": np.int64, "positive": np.int64, "engagement": float}
+    )
+    squared_weights = sums["squared_weights"].to_numpy()
+    weighted_scores = sums["weighted_scores"].to_numpy()
+    weighted_squares = sums["weighted_squares"].to_numpy()
+
+    engagement = table["engagement"].to_numpy()
+    table["effective_n"] = engagement ** 2 / np.where(squared_weights > 0, squared_weights, 1.0)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    for name in ("negative", "positive"):
+        share = sums[f"weighted_{name}"].to_numpy() / np.where(engagement > 0, engagement, 1.0)
+        low, high = _wilson(share, table["effective_n"].to_numpy(), z)
+        table[f"{name}_share"], table[f"{name}_low"], table[f"{name}_high"] = share, low, high
+
+    mean = weighted_scores / np.where(engagement > 0, engagement, 1.0)
+    variance = np.clip(weighted_squares / np.where(engagement > 0, engagement, 1.0) - mean ** 2, 0, None)
+    margin = z * np.sqrt(variance / np.maximum(table["effective_n"].to_numpy(), 1.0))
+    table["mean_score"], table["score_low"], table["score_high"] = mean, mean - margin, mean + margin
+
+    for name in ("negative", "positive"):
+        table[f"{name}_impact"] = engagement * table[f"{name}_share"]
+        table[f"{name}_impact_low"] = engagement * table[f"{name}_low"]
+        table[f"{name}_impact_high"] = engagement * table[f"{name}_high"]
+    return table[list(IMPACT_COLUMNS)]
+
+def rank_impact(table, sentiment="negative", top_n=None):
+    """
+    Groups of an impact_table() ranked by negative or positive impact, largest first.
+
+    Ties are broken by the lower interval bound, then by group key.
+    """
+    ranked = table.sort_values(
+        [f"{sentiment}_impact", f"{sentiment}_impact_low"], ascending=False, kind="stable"
+    )
+    return ranked if top_n is None else ranked.head(top_n)
+
+def _wilson(share, n, z):
+    """Wilson score interval of a proportion observed in a sample of (effective) size n."""
+    n = np.maximum(n, 1e-12)
+    denominator = 1 + z ** 2 / n
+    center = (share + z ** 2 / (2 * n)) / denominator
+    margin = z * np.sqrt(share * (1 - share) / n + z ** 2 / (4 * n ** 2)) / denominator
+    return np.clip(center - margin, 0, 1), np.clip(center + margin, 0, 1)
@@ -0,0 +1,201 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+class KeywordIndex:
+    """
+    Sparse document-term count index over cleaned comments.
+
+    Texts are tokenized once, when they are added. Keyword queries (overall,
+    per sentiment, per topic or any other row subset) are then answered with
+    sparse row sums instead of re-joining and re-splitting all text.
+
+    Tokens follow the Keyword Insights rules: whitespace-split words of at
+    least min_length characters that are not English stop words.
+
+    With keep_documents=False only term totals are kept: overall, and per
+    label of the groups passed to add() (e.g. per sentiment and per topic).
+    Memory then depends on the vocabulary, not on the number of documents,
+    which suits comments streamed chunk by chunk; queries over arbitrary
+    row subsets are not available.
+
+    Args:
+        min_length (int): Minimum token length.
+        stop_words (iterable): Words to ignore. Defaults to sklearn's English list.
+        keep_documents (bool): Keep the per-document count matrix.
+    """
+
+    def __init__(self, min_length=3, stop_words=None, keep_documents=True):
+        self.min_length = min_length
+        if stop_words is None:
+            # Imported here: scikit-learn is slow to import and only its word list is needed
+            from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+            stop_words = ENGLISH_STOP_WORDS
+        self.stop_words = frozenset(stop_words)
+        self.keep_documents = keep_documents
+        self.vocabulary = {}  # {term: column}
+        self.terms = []       # column -> term
+        self.n_docs = 0
+        self._blocks = []     # CSR blocks appended by add(), merged lazily
+        self._totals = np.zeros(0, dtype=np.int64)
+        self._group_totals = {}  # {(grouping, label): counts} from add(groups=...)
+
+    def _column(self, term):
+        column = self.vocabulary.get(term)
+        if column is None:
+            column = self.vocabulary[term] = len(self.terms)
+            self.terms.append(term)
+        return column
+
+    def add(self, texts, groups=None):
+        """
+        Tokenizes and indexes new documents; they get the next row numbers.
+
+        Args:
+            texts (iterable): Cleaned text strings (non-strings count as empty).
+            groups (dict): Optional {grouping: label per text}, e.g.
+                {"sentiment_label": labels}; term totals are kept per
+                (grouping, label) for top(group=...). Missing labels are skipped.
+
+        Returns:
+            KeywordIndex: self, to allow chaining.
+        """
+        vocabulary = self.vocabulary
+        stop_words = self.stop_words
+        min_length = self.min_length
+        indptr = [0]
+        indices = []
+        for text in texts:
+            if isinstance(text, str):
+                for word in text.split():
+                    if len(word) >= min_length and word not in stop_words:
+                        column = vocabulary.get(word)
+                        indices.append(self._column(word) if column is None else column)
+            indptr.append(len(indices))
+
+        n_new = len(indptr) - 1
+        indices = np.asarray(indices, dtype=np.int32)
+        # Counted before building the block: sum_duplicates() sorts and merges indices in place
+        term_counts = np.bincount(indices, minlength=len(self.terms))
+        block = sp.csr_matrix(
+            (np.ones(len(indices), dtype=np.int32), indices, np.asarray(indptr, dtype=np.int64)),
+            shape=(n_new, len(self.terms)),
+        )
+        block.sum_duplicates()
+        if self.keep_documents:
+            self._blocks.append(block)
+
+        self._totals = self._widen(self._totals) + term_counts
+        for grouping, labels in (groups or {}).items():
+            for label, counts in _group_counts(block, labels).items():
+                key = (grouping, label)
+                self._group_totals[key] = self._widen(self._group_totals.get(key)) + counts
+        self.n_docs += n_new
+        return self
+
+    def _widen(self, counts):
+        """counts padded with zeros for terms added since it was computed."""
+        widened = np.zeros(len(self.terms), dtype=np.int64)
+        if counts is not None:
+            widened[:len(counts)] = counts
+        return widened
+
+    @property
+    def matrix(self):
+        """The (n_docs x n_terms) CSR count matrix."""
+        if not self.keep_documents:
+            raise ValueError("This index keeps term totals only (keep_documents=False)")
+        n_terms = len(self.terms)
+        if len(self._blocks) != 1 or self._blocks[0].shape[1] != n_terms:
+            # Older blocks were built with fewer terms; widen them before stacking
+            blocks = [sp.csr_matrix((b.data, b.indices, b.indptr), shape=(b.shape[0], n_terms))
+                      for b in self._blocks]
+            merged = sp.vstack(blocks, format="csr") if blocks else sp.csr_matrix((0, n_terms), dtype=np.int32)
+            self._blocks = [merged]
+        return self._blocks[0]
+
+    def counts(self, rows=None, group=None):
+        """
+        Term counts over all documents or a subset.
+
+        Args:
+            rows (array-like): Optional boolean mask or integer positions of documents.
+            group (tuple): Optional (grouping, label) passed to add(), e.g.
+                ("topic_cluster", 3).
+
+        Returns:
+            np.ndarray: Count per term column.
+        """
+        if group is not None:
+            return self._widen(self._group_totals.get(group))
+        if rows is None:
+            return self._totals
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        return np.asarray(self.matrix[rows].sum(axis=0)).ravel()
+
+    def top(self, n=20, rows=None, group=None):
+        """
+        Most frequent keywords over all documents, a subset or a group (see counts()).
+
+        Returns:
+            pd.Series: Counts indexed by term, highest first (terms with 0 omitted).
+        """
+        return self._top_from_counts(self.counts(rows, group), n)
+
+    def top_by_group(self, groups, n=20):
+        """
+        Most frequent keywords per group, computed in one sparse product.
+
+        Args:
+            groups (array-like): A group label per document (e.g. sentiment
+                labels or topic clusters).
+            n (int): Keywords per group.
+
+        Returns:
+            dict: {group: pd.Series of top keyword counts}.
+        """
+        return {group: self._top_from_counts(counts, n) for group, counts in _group_counts(self.matrix, groups).items()}
+
+    def _top_from_counts(self, counts, n):
+        n = min(n, int(np.count_nonzero(counts)))
+        if n <= 0:
+            return pd.Series(dtype=np.int64, name="count")
+        top = top_indices(counts, n)
+        return pd.Series(counts[top], index=[self.terms[i] for i in top], name="count")
+
+def _group_counts(matrix, labels):
+    """{label: term counts summed over that label's rows}, in one sparse product."""
+    codes, uniques = pd.factorize(pd.Series(labels), use_na_sentinel=True)
+    keep = codes >= 0
+    indicator = sp.csr_matrix(
+        (np.ones(keep.sum(), dtype=np.int64), (codes[keep], np.flatnonzero(keep))),
+        shape=(len(uniques), matrix.shape[0]),
+    )
+    group_counts = (indicator @ matrix).toarray()
+    return {label: group_counts[i] for i, label in enumerate(uniques)}
+
+def top_indices(values, n):
+    """
+    Indices of the n largest values, largest first.
+
+    Uses a partial selection of the n largest, then sorts only those. Ties
+    (at the cut-off and within the result) go to the lowest index, so
+    results are deterministic.
+
+    Args:
+        values (np.ndarray): 1-D array of scores or counts.
+        n (int): Number of indices to return (at most len(values)).
+
+    Returns:
+        np.ndarray: Up to n indices into values.
+    """
+    n = min(n, len(values))
+    if n <= 0:
+        return np.array([], dtype=np.intp)
+    threshold = np.partition(values, -n)[-n]
+    above = np.flatnonzero(values > threshold)
+    tied = np.flatnonzero(values == threshold)[:n - len(above)]
+    top = np.concatenate([above, tied])
+    return top[np.lexsort((top, -values[top]))]
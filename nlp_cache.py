@@ -0,0 +1,139 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# Bump when clean_text / sentiment rules change so stale results are never reused
+PIPELINE_VERSION = "1"
+
+# SQLite limits the number of "?" parameters per statement
+_QUERY_BATCH = 500
+
+class NLPCache:
+    """
+    Persistent, content-addressed cache for per-comment NLP results.
+
+    Each entry is keyed by a hash of the raw comment text and PIPELINE_VERSION
+    and stores the cleaned text, sentiment score and sentiment label. Entries
+    are kept in SQLite; once the cache grows past max_entries the least
+    recently used entries are evicted.
+
+    Args:
+        path (str): SQLite database file. Parent directories are created.
+        max_entries (int): Size cap; LRU entries beyond it are evicted.
+    """
+
+    def __init__(self, path, max_entries=1_000_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Streamlit reruns the script on different threads; access is serialised by _lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key BLOB PRIMARY KEY,
+                clean_text TEXT NOT NULL,
+                sentiment_score REAL NOT NULL,
+                sentiment_label TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON results (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text):
+        """Returns the cache key (16-byte digest) for a raw comment text."""
+        payload = f"{PIPELINE_VERSION}\x00{text}".encode("utf-8", "surrogatepass")
+        return hashlib.blake2b(payload, digest_size=16).digest()
+
+    def get_many(self, keys):
+        """
+        Looks up many keys at once and marks the found entries as recently used.
+
+        Args:
+            keys (list): Keys from make_key().
+
+        Returns:
+            dict: {key: (clean_text, sentiment_score, sentiment_label)} for hits.
+        """
+        unique = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for start in range(0, len(unique), _QUERY_BATCH):
+                batch = unique[start:start + _QUERY_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    "SELECT key, clean_text, sentiment_score, sentiment_label "
+                    f"FROM results WHERE key IN ({placeholders})",
+                    batch,
+                )
+                for key, clean, score, label in rows:
+                    found[key] = (clean, score, label)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE results SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, items):
+        """
+        Stores results and evicts least recently used entries beyond max_entries.
+
+        Args:
+            items (dict): {key: (clean_text, sentiment_score, sentiment_label)}.
+        """
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                [(key, clean, float(score), label, now) for key, (clean, score, label) in items.items()],
+            )
+            overflow = self._count() - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM results WHERE key IN "
+                    "(SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                    (overflow,),
+                )
+            self._conn.commit()
+
+    def stats(self):
+        """Returns a dict with hit/miss counters and the current number of entries."""
+        with self._lock:
+            entries = self._count()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def clear(self):
+        """Deletes every entry and resets the counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        """Closes the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
@@ -1,10 +1,63 @@
 import pandas as pd
 import numpy as np
+import hashlib
+import importlib
+import multiprocessing
+import os
 import re
 import string
-from textblob import TextBlob
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from threadpoolctl import threadpool_limits
+from dedup import DEDUP_THRESHOLD, fan_out, find_duplicate_groups
+from engagement import impact_table, rank_impact
+from profiling import stage
+
+# ---------------------------
+# Deferred heavy imports
+# ---------------------------
+# TextBlob (which pulls in NLTK and scipy.stats) and scikit-learn take seconds
+# to import, so they are imported inside the functions that use them: a
+# process that has not analyzed anything yet has not paid for them.
+_HEAVY_MODULES = (
+    "sklearn.feature_extraction.text",
+    "sklearn.cluster",
+    "sklearn.metrics",
+)
+
+def warm_up():
+    """
+    Loads TextBlob, its sentiment lexicon and scikit-learn ahead of the first analysis.
+
+    Imported modules and the lexicon index are kept for the life of the
+    process, so later calls (from any session or thread) return at once.
+    Worker processes do not inherit them: they are started by the forkserver
+    (see worker_pool()), which imports nlp_utils and TextBlob itself, and
+    each worker loads the lexicon on its first chunk. Warming up only speeds
+    up analysis and topic modeling in this process.
+    """
+    _load_sentiment_index()
+    for name in _HEAVY_MODULES:
+        importlib.import_module(name)
+
+# ---------------------------
+# Batch cleaning rules
+# ---------------------------
+# The rules below reproduce clean_text() in a single compiled pass.
+# Mentions and hashtags stop before any position where a URL would start, so the
+# combined alternation removes exactly what the sequential re.sub calls remove.
+_NOISE_PATTERN = re.compile(
+    r"http\S+|www\S+"                     # URLs
+    r"|@(?:(?!http\S|www\S)\w)+"          # @mentions
+    r"|#(?:(?!http\S|www\S)\w)+"          # hashtags
+)
+_PUNCT_TABLE = str.maketrans("", "", string.punctuation)
+
+# Record separator used to glue a chunk of comments into one string.
+# It is whitespace, so no URL/mention/hashtag match can cross it.
+_RECORD_SEP = "\x1e"
 
 def clean_text(text):
     """
@@ -34,6 +87,49 @@ def clean_text(text):
     text = re.sub(r"\s+", " ", text).strip()    # remove extra whitespace
     return text
 
+def clean_texts(texts, chunk_size=100_000):
+    """
+    Cleans many comments at once. Output matches clean_text() exactly.
+
+    Each chunk of comments is joined into one string so lowercasing, the
+    URL/mention/hashtag rules and punctuation removal run once per chunk
+    instead of once per comment.
+
+    Args:
+        texts (pd.Series or iterable): Raw comment texts.
+        chunk_size (int): Number of comments processed per pass.
+
+    Returns:
+        pd.Series or list: Cleaned texts. A Series (with the same index) is
+            returned when a Series is given, otherwise a list.
+    """
+    is_series = isinstance(texts, pd.Series)
+    values = texts.tolist() if is_series else list(texts)
+
+    cleaned = []
+    for start in range(0, len(values), chunk_size):
+        cleaned.extend(_clean_chunk(values[start:start + chunk_size]))
+
+    if is_series:
+        return pd.Series(cleaned, index=texts.index)
+    return cleaned
+
+def _clean_chunk(values):
+    """Cleans one chunk of raw values for clean_texts()."""
+    if not values:
+        return []
+    strings = ["" if pd.isna(v) else str(v) for v in values]
+    joined = _RECORD_SEP.join(strings)
+    # Fall back to the per-row path if a comment contains the separator itself
+    if joined.count(_RECORD_SEP) != len(strings) - 1:
+        return [clean_text(v) for v in values]
+
+    joined = joined.lower()
+    joined = _NOISE_PATTERN.sub(" ", joined)
+    joined = joined.translate(_PUNCT_TABLE)
+    # str.split() uses the same whitespace definition as \s in re
+    return [" ".join(part.split()) for part in joined.split(_RECORD_SEP)]
+
 def get_sentiment(text):
     """
     Analyzes the sentiment of a given text using TextBlob.
@@ -50,6 +146,8 @@ def get_sentiment(text):
         return 0.0, "Neutral"
     
     # TextBlob provides a simple API for common NLP tasks
+    from textblob import TextBlob
+
     blob = TextBlob(text)
     score = blob.sentiment.polarity
     
@@ -62,46 +160,765 @@ def get_sentiment(text):
         label = "Neutral"
     return score, label
 
-def perform_topic_modeling(texts, n_topics=5):
+# ---------------------------
+# Batch sentiment engine
+# ---------------------------
+# Texts containing any of these characters go through TextBlob's own tokenizer
+# (contractions, sentence punctuation, unicode quotes). Output of clean_text()
+# never contains them, so cleaned comments always take the fast path.
+_SENTIMENT_FALLBACK_PATTERN = re.compile(
+    "[" + re.escape(string.punctuation + "\u201c\u201d\u2018\u2019\n") + "]"
+)
+
+# Largest difference between get_sentiments() and TextBlob polarity.
+# The fast path performs the same float operations in the same order, so in
+# practice the scores are identical; the tolerance is what we guarantee.
+SENTIMENT_TOLERANCE = 1e-9
+
+_sentiment_index = None
+
+def _load_sentiment_index():
+    """
+    Builds (once per process) a flat index over the pattern lexicon used by TextBlob.
+
+    Returns:
+        dict: {
+            "words": {word: (polarity, intensity, is_modifier)},
+            "negations": frozenset of negation words,
+            "emoticons": {emoticon: polarity},
+            "punctuation": str of tokenizer punctuation,
+        }
+    """
+    global _sentiment_index
+    if _sentiment_index is None:
+        from textblob.en import sentiment as lexicon
+        from textblob._text import EMOTICONS, PUNCTUATION
+
+        # Any lookup triggers the lazy XML load (including the derived "-ly" adverbs)
+        "good" in lexicon
+        words = {}
+        for word, senses in dict.items(lexicon):
+            polarity, _, intensity = senses[None]
+            is_modifier = any(pos in senses for pos in lexicon.modifiers)
+            words[word] = (polarity, intensity, is_modifier)
+
+        emoticons = {}
+        for (_, polarity), faces in EMOTICONS.items():
+            for face in faces:
+                emoticons.setdefault(face.lower(), polarity)
+
+        _sentiment_index = {
+            "words": words,
+            "negations": frozenset(lexicon.negations),
+            "emoticons": emoticons,
+            "punctuation": PUNCTUATION,
+        }
+    return _sentiment_index
+
+def _score_tokens(tokens, index):
+    """
+    Polarity of a token list, following pattern's Sentiment.assessments() rules:
+    modifiers ("very good") scale the next word, negations ("not good") flip and
+    halve it, and unknown words are skipped.
+    """
+    words = index["words"]
+    negations = index["negations"]
+    emoticons = index["emoticons"]
+    punctuation = index["punctuation"]
+
+    assessments = []  # [polarity, intensity, negated]
+    modifier = None   # Preceding modifier word
+    negation = None   # Preceding negation word
+    for w in tokens:
+        entry = words.get(w)
+        if entry is not None:
+            p, i, is_modifier = entry
+            if modifier is None:
+                assessments.append([p, i, False])
+            else:
+                last = assessments[-1]
+                last[0] = max(-1.0, min(p * last[1], +1.0))
+                last[1] = i
+            if negation is not None:
+                assessments[-1][1] = 1.0 / assessments[-1][1]
+                assessments[-1][2] = True
+            modifier = w if is_modifier else None
+            negation = w if w in negations else None
+        else:
+            # Unknown word may be a negation; small words keep a pending negation alive
+            if w in negations:
+                negation = w
+            elif negation and len(w.strip("'")) > 1:
+                negation = None
+            # Negation after an "-ly" modifier ("really not good")
+            if negation is not None and modifier is not None and modifier.endswith("ly"):
+                assessments[-1][2] = True
+                negation = None
+            elif modifier and len(w) > 2:
+                modifier = None
+            if not w.isalpha() and len(w) <= 5 and w not in punctuation:
+                p = emoticons.get(w)
+                if p is not None:
+                    assessments.append([p, 1.0, False])
+
+    # Accumulate in order so the result matches TextBlob's average exactly
+    total = 0
+    for p, _, negated in assessments:
+        total += p * -0.5 if negated else p
+    return total / float(len(assessments) or 1)
+
+def label_sentiments(scores):
+    """
+    Maps polarity scores to labels using the same thresholds as get_sentiment().
+
+    Args:
+        scores (array-like): Polarity scores.
+
+    Returns:
+        np.ndarray: 'Positive', 'Negative', or 'Neutral' for each score.
+    """
+    scores = np.asarray(scores, dtype=float)
+    return np.select([scores > 0.1, scores < -0.1], ["Positive", "Negative"], "Neutral")
+
+def get_sentiments(texts):
+    """
+    Scores many cleaned texts at once without creating a TextBlob per comment.
+
+    The pattern lexicon is loaded into a flat index once per process, and
+    repeated texts within the batch are only scored once. Scores agree with
+    get_sentiment() within SENTIMENT_TOLERANCE.
+
+    Args:
+        texts (iterable): Cleaned text strings (e.g. a pd.Series or list).
+
+    Returns:
+        tuple: (scores, labels)
+            - scores (np.ndarray): float64 polarity scores.
+            - labels (np.ndarray): 'Positive', 'Negative', or 'Neutral' labels.
+    """
+    index = _load_sentiment_index()
+    values = texts.tolist() if isinstance(texts, pd.Series) else list(texts)
+
+    scores = np.zeros(len(values), dtype=np.float64)
+    seen = {}
+    for row, text in enumerate(values):
+        if not isinstance(text, str) or not text:
+            continue
+        score = seen.get(text)
+        if score is None:
+            if _SENTIMENT_FALLBACK_PATTERN.search(text):
+                score = get_sentiment(text)[0]
+            else:
+                score = _score_tokens(text.lower().split(), index)
+            seen[text] = score
+        scores[row] = score
+    return scores, label_sentiments(scores)
+
+def filter_platform(df, platform):
+    """
+    Keeps the rows of a given platform, as selected in the app's sidebar.
+
+    Args:
+        df (pd.DataFrame): Comments, optionally with a 'platform' column.
+        platform (str): "All" or a platform name such as "X (Twitter)"; rows whose
+            platform contains its first word (case-insensitive) are kept.
+
+    Returns:
+        pd.DataFrame: The filtered rows (df itself for "All" or no 'platform' column).
+    """
+    if platform == "All" or "platform" not in df.columns:
+        return df
+    return df[df["platform"].str.contains(platform.split()[0], case=False, na=False)]
+
+def dataset_fingerprint(df):
+    """
+    Returns a stable hex digest of a DataFrame's contents, index and columns.
+
+    Used to key memoized pipeline stages: equal frames give equal fingerprints.
+
+    Args:
+        df (pd.DataFrame): Any DataFrame.
+
+    Returns:
+        str: 32-character hex digest.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(list(df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+# ---------------------------
+# Parallel cleaning + sentiment pipeline
+# ---------------------------
+# Below this many rows, starting worker processes costs more than it saves.
+PARALLEL_MIN_ROWS = 20_000
+
+def worker_pool(workers):
+    """
+    A process pool for the cleaning and sentiment workers.
+
+    Workers are started by a forkserver (spawn where that is unavailable)
+    instead of forking the caller: the app runs in a multi-threaded server
+    (the warm-up thread, the SQLite cache behind a lock), and a forked child
+    can inherit a lock held by another thread and hang. The forkserver
+    imports nlp_utils and TextBlob once, so each worker only loads the
+    sentiment lexicon.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["nlp_utils", "textblob.en"])
+    else:
+        context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+def _analyze_chunk(values, precleaned=False):
+    """
+    Cleans and scores one chunk of raw comments (runs inside a worker process).
+
+    With precleaned=True the values are already cleaned and only scored.
+
+    Returns:
+        tuple: (cleaned, scores, labels, (cleaning_seconds, sentiment_seconds))
+    """
+    start = time.perf_counter()
+    cleaned = values if precleaned else clean_texts(values)
+    cleaned_at = time.perf_counter()
+    scores, labels = get_sentiments(cleaned)
+    return cleaned, scores, labels, (cleaned_at - start, time.perf_counter() - cleaned_at)
+
+def _analyze_values(values, workers, chunk_size, min_parallel_rows, profile=None, cleaned=None, executor=None):
+    """
+    Cleans and scores raw values, in-process or across a process pool.
+
+    When cleaned (the values' cleaned texts) is given, cleaning is skipped
+    and only sentiment is computed. The pool is executor when given (and
+    left running), otherwise one is started for this call.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    precleaned = cleaned is not None
+
+    if workers <= 1 or len(values) < min_parallel_rows:
+        if not precleaned:
+            with stage(profile, "cleaning", len(values)):
+                cleaned = clean_texts(values)
+        with stage(profile, "sentiment", len(values)):
+            scores, labels = get_sentiments(cleaned)
+        return cleaned, scores, labels
+
+    if chunk_size is None:
+        chunk_size = -(-len(values) // (workers * 4))  # ceil division
+    inputs = cleaned if precleaned else values
+    chunks = [inputs[i:i + chunk_size] for i in range(0, len(inputs), chunk_size)]
+    start = time.perf_counter()
+    with nullcontext({}) if profile is None else profile.measure_rss() as memory:
+        with nullcontext(executor) if executor is not None else worker_pool(workers) as pool:
+            # map() yields results in submission order, preserving row order
+            results = list(pool.map(partial(_analyze_chunk, precleaned=precleaned), chunks))
+
+    if profile is not None:
+        # Stages overlap across workers: split the wall time by their share of worker time
+        wall = time.perf_counter() - start
+        cleaning, sentiment = np.sum([timings for *_, timings in results], axis=0)
+        cleaning_share = cleaning / (cleaning + sentiment) if cleaning + sentiment else 0.5
+        # Both stages' results arrive together: their memory is recorded once, on sentiment
+        if not precleaned:
+            profile.add("cleaning", wall * cleaning_share, len(values))
+        profile.add("sentiment", wall * (1 - cleaning_share), len(values), **memory)
+
+    cleaned = [text for chunk_cleaned, *_ in results for text in chunk_cleaned]
+    scores = np.concatenate([scores for _, scores, _, _ in results])
+    labels = np.concatenate([labels for _, _, labels, _ in results])
+    return cleaned, scores, labels
+
+def run_pipeline(df, workers=None, chunk_size=None, min_parallel_rows=PARALLEL_MIN_ROWS,
+                 cache=None, dedupe=False, dedupe_threshold=DEDUP_THRESHOLD, profile=None, executor=None):
+    """
+    Runs cleaning and sentiment scoring over a DataFrame, sharded across processes.
+
+    The 'comment_text' column is split into contiguous chunks which are sent to a
+    process pool; results are reassembled in the original row order, so the
+    output is identical to the serial path. Small inputs run serially.
+
+    When a cache is given, results for previously seen comments are read from
+    it and only the cache misses (deduplicated) are computed and stored.
+
+    With dedupe=True, comments are cleaned first and grouped into exact and
+    near-duplicates (see dedup.find_duplicate_groups); only the first comment
+    of each group is scored (from the text already cleaned, so nothing is
+    cleaned twice), and its sentiment is copied to the rest of the group.
+    Every row keeps its own clean_text. Cache keys stay on the raw text.
+
+    Args:
+        df (pd.DataFrame): Must contain a 'comment_text' column.
+        workers (int): Number of worker processes. Defaults to os.cpu_count().
+        chunk_size (int): Rows per task. Defaults to ~4 tasks per worker.
+        min_parallel_rows (int): Inputs smaller than this run in-process.
+        cache (NLPCache): Optional persistent result cache (see nlp_cache.py).
+        dedupe (bool): Collapse duplicate and near-duplicate comments.
+        dedupe_threshold (float): Near-duplicate similarity threshold (None
+            collapses exact duplicates only).
+        profile (PipelineProfile): Optional profile to record the cleaning,
+            deduplication, cache and sentiment stages into.
+        executor (ProcessPoolExecutor): Optional pool (see worker_pool()) to
+            reuse across calls, e.g. one per streamed file; by default a pool
+            is started and shut down by each call that runs in parallel.
+
+    Returns:
+        pd.DataFrame: A copy of df with 'clean_text', 'sentiment_score' and
+            'sentiment_label' columns added, plus 'duplicate_group' (group id,
+            numbered by first appearance) and 'duplicate_count' (group size)
+            when dedupe is set.
+    """
+    values = df["comment_text"].tolist()
+    cleaned_values = None  # Cleaned texts of values, when they are already known
+    if dedupe:
+        with stage(profile, "cleaning", len(values)):
+            all_cleaned = clean_texts(values)
+        with stage(profile, "deduplication", len(values)):
+            group, representatives = find_duplicate_groups(all_cleaned, threshold=dedupe_threshold)
+        values = [values[i] for i in representatives]
+        cleaned_values = [all_cleaned[i] for i in representatives]
+
+    if cache is None:
+        cleaned, scores, labels = _analyze_values(
+            values, workers, chunk_size, min_parallel_rows, profile, cleaned=cleaned_values, executor=executor
+        )
+    else:
+        # NaN and "" clean to the same result, so they share a key
+        with stage(profile, "cache", len(values)):
+            raw = ["" if pd.isna(v) else str(v) for v in values]
+            keys = [cache.make_key(text) for text in raw]
+            found = cache.get_many(keys)
+
+        # Compute each missing comment once, even if it repeats in this batch
+        missing = {}  # key -> position of its first comment
+        for i, key in enumerate(keys):
+            if key not in found and key not in missing:
+                missing[key] = i
+        if missing:
+            rows = list(missing.values())
+            m_cleaned, m_scores, m_labels = _analyze_values(
+                [raw[i] for i in rows], workers, chunk_size, min_parallel_rows, profile,
+                cleaned=None if cleaned_values is None else [cleaned_values[i] for i in rows],
+                executor=executor,
+            )
+            computed = {
+                key: (clean, float(score), str(label))
+                for key, clean, score, label in zip(missing, m_cleaned, m_scores, m_labels)
+            }
+            with stage(profile, "cache"):
+                cache.put_many(computed)
+            found.update(computed)
+
+        with stage(profile, "cache"):
+            cleaned = [found[key][0] for key in keys]
+            scores = np.array([found[key][1] for key in keys], dtype=np.float64)
+            labels = label_sentiments(scores)
+
+    out = df.copy()
+    if dedupe:
+        # Fan the representatives' results back out to their groups
+        out["clean_text"] = all_cleaned
+        out["sentiment_score"] = fan_out(scores, group)
+        out["sentiment_label"] = fan_out(labels, group)
+        out["duplicate_group"] = group.astype(np.int32)
+        out["duplicate_count"] = np.bincount(group)[group].astype(np.int32)
+        return out
+    out["clean_text"] = cleaned
+    out["sentiment_score"] = scores
+    out["sentiment_label"] = labels
+    return out
+
+# ---------------------------
+# Topic modeling
+# ---------------------------
+# "kmeans": exact full-batch K-Means (default).
+# "minibatch": Mini-Batch K-Means over streamed TF-IDF chunks, for large datasets.
+TOPIC_ENGINES = ("kmeans", "minibatch")
+
+# Datasets with at least this many comments default to the mini-batch engine in the app
+MINIBATCH_MIN_ROWS = 100_000
+
+# Default TF-IDF vocabulary size (terms kept by document frequency); None keeps every term
+TOPIC_VOCABULARY_SIZE = 1000
+
+# How topic keywords are ranked:
+# "weight": highest TF-IDF weight in the topic centroid (default).
+# "distinctive": weight in the topic minus its mean weight in the other topics,
+#                so terms common to every topic drop out.
+KEYWORD_RANKINGS = ("weight", "distinctive")
+
+def perform_topic_modeling(texts, n_topics=5, engine="kmeans", chunk_size=10_000,
+                           vocab_sample_size=100_000, max_features=TOPIC_VOCABULARY_SIZE,
+                           keyword_ranking="weight", duplicate_group=None, profile=None):
     """
     Performs unsupervised topic modeling using TF-IDF and K-Means clustering.
+
+    Empty texts are left out of the fit and labelled -1, so the returned
+    clusters line up row for row with the input from a single fit.
+
+    With engine="minibatch" the TF-IDF vocabulary is learned from a sample of
+    texts, and the clustering model is trained chunk by chunk with
+    MiniBatchKMeans.partial_fit, so only one chunk's TF-IDF matrix is held in
+    memory at a time.
     
     Args:
-        texts (list): List of cleaned text strings.
+        texts (pd.Series or list): Cleaned text strings (may include empty rows).
         n_topics (int): Number of topics (clusters) to discover.
+        engine (str): One of TOPIC_ENGINES.
+        chunk_size (int): Rows vectorized per chunk ("minibatch" engine only).
+        vocab_sample_size (int): Max rows used to learn the vocabulary
+            ("minibatch" engine only).
+        max_features (int): TF-IDF vocabulary size (None keeps every term).
+        keyword_ranking (str): One of KEYWORD_RANKINGS.
+        duplicate_group (array-like): Optional group id per text (e.g. the
+            'duplicate_group' column from run_pipeline(dedupe=True)). Only the
+            first text of each group is clustered, so copy-pasted spam does
+            not dominate the topics, and its topic is copied to the group.
+        profile (PipelineProfile): Optional profile to record the
+            vectorization, clustering and keywords stages into.
         
     Returns:
         tuple: (clusters, topic_keywords, kmeans_model)
-            - clusters (array): Cluster labels for each input text.
+            - clusters (array or pd.Series): Cluster label for each input text,
+              -1 for empty texts. A Series with the input's index is returned
+              when a Series is given.
             - topic_keywords (list): List of top keywords for each cluster.
-            - kmeans_model (KMeans): The fitted KMeans model object.
+            - kmeans_model (KMeans or MiniBatchKMeans): The fitted clustering model.
     """
+    if engine not in TOPIC_ENGINES:
+        raise ValueError(f"Unknown topic engine {engine!r}; expected one of {TOPIC_ENGINES}")
+    if keyword_ranking not in KEYWORD_RANKINGS:
+        raise ValueError(f"Unknown keyword ranking {keyword_ranking!r}; expected one of {KEYWORD_RANKINGS}")
     if len(texts) == 0:
         return None, None, None
 
+    is_series = isinstance(texts, pd.Series)
+    values = texts.tolist() if is_series else list(texts)
+    if duplicate_group is not None:
+        _, first, group = np.unique(np.asarray(duplicate_group), return_index=True, return_inverse=True)
+        clusters, topic_keywords, model = perform_topic_modeling(
+            [values[i] for i in first], n_topics, engine, chunk_size, vocab_sample_size,
+            max_features, keyword_ranking, profile=profile,
+        )
+        if clusters is not None:
+            clusters = fan_out(clusters, group)
+            if is_series:
+                clusters = pd.Series(clusters, index=texts.index)
+        return clusters, topic_keywords, model
+
+    # Only non-empty texts are clustered; the rest are labelled -1 below
+    has_text = text_mask(values)
+    if not has_text.any():
+        return None, None, None
+    docs = [t for t, keep in zip(values, has_text) if keep]
+
+    try:
+        labels, model, vectorizer = fit_topic_model(
+            docs, n_topics, engine, chunk_size, vocab_sample_size, max_features, profile
+        )
+    except ValueError:
+        # Handle case where stop words removed everything
+        return None, None, None
+
+    # Align labels with the input rows, -1 for rows that were not clustered
+    clusters = np.full(len(values), -1, dtype=int)
+    clusters[has_text] = labels
+    if is_series:
+        clusters = pd.Series(clusters, index=texts.index)
+
+    # Extract top keywords for each topic to help identify what the topic is about
+    with stage(profile, "keywords", n_topics):
+        topic_keywords = centroid_keywords(
+            model.cluster_centers_, vectorizer.get_feature_names_out(), ranking=keyword_ranking
+        )
+    return clusters, topic_keywords, model
+
+def text_mask(values):
+    """Boolean mask of the texts that can be clustered (non-empty strings)."""
+    return np.array([isinstance(t, str) and t.strip() != "" for t in values], dtype=bool)
+
+def fit_topic_model(docs, n_topics=5, engine="kmeans", chunk_size=10_000, vocab_sample_size=100_000,
+                    max_features=TOPIC_VOCABULARY_SIZE, profile=None):
+    """
+    Fits TF-IDF and a clustering model on non-empty documents.
+
+    Args:
+        docs (list): Non-empty cleaned texts.
+        n_topics, engine, chunk_size, vocab_sample_size, max_features, profile:
+            As in perform_topic_modeling().
+
+    Returns:
+        tuple: (labels, model, vectorizer) with one label per document.
+
+    Raises:
+        ValueError: If the engine is unknown or no vocabulary is left after
+            stop word removal.
+    """
+    if engine not in TOPIC_ENGINES:
+        raise ValueError(f"Unknown topic engine {engine!r}; expected one of {TOPIC_ENGINES}")
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
     # TF-IDF Vectorization: Converts text to numerical vectors based on word importance
-    # max_features=1000: Only keep top 1000 words to save memory/time
+    # max_features: Only keep the most frequent words (1000 by default) to save memory/time
     # stop_words='english': Remove common English words (the, is, at, etc.)
-    vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
+    vectorizer = TfidfVectorizer(max_features=max_features, stop_words='english')
+    if engine == "minibatch":
+        labels, model = _fit_minibatch(docs, vectorizer, n_topics, chunk_size, vocab_sample_size,
+                                       profile=profile)
+    else:
+        labels, model = _fit_kmeans(docs, vectorizer, n_topics, profile)
+    return labels, model, vectorizer
+
+def centroid_keywords(centers, terms, n_terms=10, ranking="weight"):
+    """
+    Describes each cluster by its top-ranked terms.
+
+    Only the n_terms best terms of each centroid are selected (top_indices(),
+    linear in the vocabulary size) and then sorted, so large vocabularies
+    stay cheap. Ties go to the earliest vocabulary term, so keywords are
+    deterministic. Terms with zero weight in a cluster are never its keywords.
+
+    Args:
+        centers (np.ndarray): (n_topics x n_terms) cluster centroids.
+        terms (array-like): Term for each centroid column.
+        n_terms (int): Keywords per cluster.
+        ranking (str): One of KEYWORD_RANKINGS.
+
+    Returns:
+        list: One comma-separated keyword string per cluster.
+    """
+    if ranking not in KEYWORD_RANKINGS:
+        raise ValueError(f"Unknown keyword ranking {ranking!r}; expected one of {KEYWORD_RANKINGS}")
+    scores = np.asarray(centers, dtype=float)
+    if ranking == "distinctive" and len(scores) > 1:
+        # Mean weight of each term in the other clusters
+        others = (scores.sum(axis=0) - scores) / (len(scores) - 1)
+        scores = scores - others
+    # Terms absent from a cluster rank last and are dropped below
+    scores = np.where(np.asarray(centers) > 0, scores, -np.inf)
+    from keyword_index import top_indices  # Imported here: keyword_index loads scipy.sparse
+
+    topic_keywords = []
+    for row in scores:
+        top = top_indices(row, n_terms)
+        top = top[np.isfinite(row[top])]
+        topic_keywords.append(", ".join(terms[i] for i in top))
+    return topic_keywords
+
+# ---------------------------
+# Automatic topic count
+# ---------------------------
+# "silhouette": mean silhouette on a subsample (exact, O(n^2) in the scoring sample).
+# "simplified": centroid-based silhouette, (b - a) / max(a, b) with a/b the distance to
+#               the own/nearest other centroid; O(n * k) and works directly on sparse TF-IDF.
+TOPIC_SELECTION_CRITERIA = ("silhouette", "simplified")
+
+def select_n_topics(texts, k_values=range(2, 11), criterion="silhouette", sample_size=5_000,
+                    time_budget=30.0, workers=None, max_features=TOPIC_VOCABULARY_SIZE):
+    """
+    Picks the number of topics by scoring several k values on a subsample.
+
+    One TF-IDF matrix is built from the subsample and shared by every
+    candidate; candidates are clustered in parallel threads, each limited to
+    one OpenMP thread. Candidates are started coarse to fine (the ends of the
+    range, then midpoints), and no new candidate starts once time_budget
+    has elapsed, so a truncated search still spans the range. The best
+    score wins (smallest k on ties).
+
+    Args:
+        texts (iterable): Cleaned texts (empty ones are ignored).
+        k_values (iterable): Candidate numbers of topics.
+        criterion (str): One of TOPIC_SELECTION_CRITERIA.
+        sample_size (int): Max texts used for the search.
+        time_budget (float): Seconds after which no new candidate is started.
+        workers (int): Parallel candidates (default: CPU count).
+        max_features (int): TF-IDF vocabulary size.
+
+    Returns:
+        dict: n_topics (None if nothing could be scored), criterion,
+            scores ({k: score} for every evaluated k, in k order), skipped
+            (k values left out by the budget), degenerate (k values whose
+            clustering could not be scored, e.g. fewer than two distinct
+            clusters), sample_size and elapsed_seconds.
+    """
+    if criterion not in TOPIC_SELECTION_CRITERIA:
+        raise ValueError(f"Unknown criterion {criterion!r}; expected one of {TOPIC_SELECTION_CRITERIA}")
+    started = time.perf_counter()
+    deadline = started + time_budget
+
+    values = texts.tolist() if isinstance(texts, pd.Series) else list(texts)
+    docs = [t for t, keep in zip(values, text_mask(values)) if keep]
+    rng = np.random.default_rng(42)
+    if len(docs) > sample_size:
+        docs = [docs[i] for i in np.sort(rng.choice(len(docs), size=sample_size, replace=False))]
+    # Each candidate needs at least one more document than clusters to be scored
+    k_values = sorted(k for k in set(k_values) if 2 <= k < len(docs))
+
+    result = {"n_topics": None, "criterion": criterion, "scores": {}, "skipped": [], "degenerate": [],
+              "sample_size": len(docs), "elapsed_seconds": 0.0}
+    from sklearn.cluster import KMeans
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics import silhouette_score
     try:
-        X = vectorizer.fit_transform(texts)
+        X = TfidfVectorizer(max_features=max_features, stop_words='english').fit_transform(docs)
     except ValueError:
-        # Handle case where texts might be empty or stop words removed everything
-        return None, None, None
+        # Stop words removed everything
+        k_values = []
+
+    def evaluate(k):
+        """(status, score) of one candidate; status is "scored", "skipped" or "degenerate"."""
+        if time.perf_counter() > deadline:
+            return "skipped", None
+        # One OpenMP thread per candidate when candidates already run in parallel.
+        # OpenMP limits are per calling thread, so other threads (e.g. other
+        # Streamlit sessions) keep theirs; KMeans limits BLAS itself.
+        with threadpool_limits(limits=1, user_api="openmp") if workers > 1 else nullcontext():
+            model = KMeans(n_clusters=k, random_state=42, n_init=3).fit(X)
+            if len(np.unique(model.labels_)) < 2:
+                return "degenerate", None
+            if criterion == "silhouette":
+                return "scored", float(
+                    silhouette_score(X, model.labels_, sample_size=min(X.shape[0], 2_000), random_state=42)
+                )
+            distances = model.transform(X)
+        own = distances[np.arange(X.shape[0]), model.labels_]
+        distances[np.arange(X.shape[0]), model.labels_] = np.inf
+        other = distances.min(axis=1)
+        return "scored", float(np.mean((other - own) / np.maximum(np.maximum(own, other), 1e-12)))
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(k_values) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        order = _coarse_to_fine(k_values)
+        outcomes = dict(zip(order, pool.map(evaluate, order)))
+
+    result["scores"] = {k: outcomes[k][1] for k in k_values if outcomes[k][0] == "scored"}
+    result["skipped"] = [k for k in k_values if outcomes[k][0] == "skipped"]
+    result["degenerate"] = [k for k in k_values if outcomes[k][0] == "degenerate"]
+    if result["scores"]:
+        result["n_topics"] = max(result["scores"], key=lambda k: (result["scores"][k], -k))
+    result["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+def _coarse_to_fine(k_values):
+    """Orders sorted k values as the two ends, then recursive midpoints."""
+    if len(k_values) <= 2:
+        return list(k_values)
+    order = [k_values[0], k_values[-1]]
+    spans = [(0, len(k_values) - 1)]
+    while spans:
+        next_spans = []
+        for lo, hi in spans:
+            if hi - lo > 1:
+                mid = (lo + hi) // 2
+                order.append(k_values[mid])
+                next_spans += [(lo, mid), (mid, hi)]
+        spans = next_spans
+    return order
+
+def _fit_kmeans(docs, vectorizer, n_topics, profile=None):
+    """Full-batch engine: vectorizes all docs at once and fits KMeans."""
+    from sklearn.cluster import KMeans
+
+    with stage(profile, "vectorization", len(docs)):
+        X = vectorizer.fit_transform(docs)
 
     # K-Means Clustering: Groups similar vectors (comments) together
-    kmeans = KMeans(n_clusters=n_topics, random_state=42, n_init=10)
-    kmeans.fit(X)
+    with stage(profile, "clustering", len(docs)):
+        kmeans = KMeans(n_clusters=n_topics, random_state=42, n_init=10)
+        kmeans.fit(X)
+    return kmeans.labels_, kmeans
 
-    clusters = kmeans.labels_
-    terms = vectorizer.get_feature_names_out()
+def _fit_minibatch(docs, vectorizer, n_topics, chunk_size, vocab_sample_size, n_passes=1, profile=None):
+    """Mini-batch engine: streams TF-IDF chunks through MiniBatchKMeans.partial_fit."""
+    from sklearn.cluster import MiniBatchKMeans
 
-    # Extract top keywords for each topic to help identify what the topic is about
-    topic_keywords = []
-    order_centroids = kmeans.cluster_centers_.argsort()[:, ::-1]
-    for i in range(n_topics):
-        # Get top 10 words for this cluster
-        top_terms = [terms[ind] for ind in order_centroids[i, :10]]
-        topic_keywords.append(", ".join(top_terms))
+    # Learn vocabulary and IDF weights from a fixed random sample of documents
+    rng = np.random.default_rng(42)
+    with stage(profile, "vectorization", min(len(docs), vocab_sample_size)):
+        if len(docs) > vocab_sample_size:
+            sample = np.sort(rng.choice(len(docs), size=vocab_sample_size, replace=False))
+            vectorizer.fit([docs[i] for i in sample])
+        else:
+            vectorizer.fit(docs)
+
+    def transform(start):
+        batch = docs[start:start + chunk_size]
+        with stage(profile, "vectorization", len(batch)):
+            return vectorizer.transform(batch)
+
+    # The first partial_fit call initialises centroids, so it needs >= n_topics rows
+    chunk_size = max(chunk_size, n_topics)
+    starts = np.arange(0, len(docs), chunk_size)
+    model = MiniBatchKMeans(n_clusters=n_topics, random_state=42, batch_size=chunk_size, n_init=3)
+    for _ in range(n_passes):
+        for start in rng.permutation(starts):
+            # Skip a short trailing chunk on the very first call
+            if not hasattr(model, "cluster_centers_") and len(docs) - start < n_topics:
+                continue
+            X = transform(start)
+            with stage(profile, "clustering", X.shape[0]):
+                model.partial_fit(X)
+
+    # Second pass over the chunks to assign final labels
+    labels = []
+    for start in starts:
+        X = transform(start)
+        with stage(profile, "clustering", X.shape[0]):
+            labels.append(model.predict(X))
+    return np.concatenate(labels), model
+
+# ---------------------------
+# Recommendations
+# ---------------------------
+def topic_recommendations(df, topic_keywords, top_n=3, confidence=0.95, table=None):
+    """
+    Finds the topics with the most negative and the most positive engagement.
+
+    Topics are ranked by impact: the number of negative (or positive)
+    comments weighted by engagement (1 + likes, see engagement.impact_table),
+    so a complaint that 500 people liked outranks 20 unliked ones. Without a
+    likes column this is the plain comment count.
+
+    Args:
+        df (pd.DataFrame): Analyzed comments with 'sentiment_label',
+            'sentiment_score' and 'topic_cluster' columns (-1 marks comments
+            without a topic), optionally 'likes'.
+        topic_keywords (list): Keyword string for each topic.
+        top_n (int): Number of topics to return per sentiment.
+        confidence (float): Confidence level of the intervals.
+        table (pd.DataFrame): Optional impact_table() of df by topic_cluster,
+            when the caller already has it.
+
+    Returns:
+        dict: {"pain_points": ..., "winning_themes": ...}, each a dict with
+            "comments" (number of Negative / Positive comments) and "topics",
+            a list of {"topic", "keywords", "count", "impact", "impact_low",
+            "impact_high", "share", "share_low", "share_high"} dicts, highest
+            impact first. count is the number of Negative / Positive comments
+            in the topic, share the engagement-weighted share of them.
+    """
+    has_topics = "topic_cluster" in df.columns
+    if table is None:
+        table = impact_table(df, by="topic_cluster" if has_topics else None, confidence=confidence)
+    # Topic -1 (noise/empty) counts towards the totals but is never recommended
+    topics_table = table[(table.index != -1) & (table.index < len(topic_keywords))] if has_topics else table.iloc[:0]
 
-    return clusters, topic_keywords, kmeans
+    result = {}
+    for key, sentiment in (("pain_points", "negative"), ("winning_themes", "positive")):
+        ranked = rank_impact(topics_table[topics_table[sentiment] > 0], sentiment, top_n)
+        topics = [
+            {
+                "topic": int(i), "keywords": topic_keywords[i], "count": int(row[sentiment]),
+                "impact": round(float(row[f"{sentiment}_impact"]), 1),
+                "impact_low": round(float(row[f"{sentiment}_impact_low"]), 1),
+                "impact_high": round(float(row[f"{sentiment}_impact_high"]), 1),
+                "share": round(float(row[f"{sentiment}_share"]), 4),
+                "share_low": round(float(row[f"{sentiment}_low"]), 4),
+                "share_high": round(float(row[f"{sentiment}_high"]), 4),
+            }
+            for i, row in ranked.iterrows()
+        ]
+        result[key] = {"comments": int(table[sentiment].sum()), "topics": topics}
+    return result
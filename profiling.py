@@ -0,0 +1,264 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+import pandas as pd
+
+try:
+    import resource  # Unix only; process peak RSS is omitted elsewhere
+except ImportError:
+    resource = None
+
+# Pipeline stages in display order; other stage names are listed after these
+PROFILE_STAGES = (
+    "ingestion", "cleaning", "deduplication", "cache", "sentiment", "vectorization", "clustering", "keywords",
+    "output",
+)
+
+class PipelineProfile:
+    """
+    Per-stage timing, throughput and memory of one pipeline run.
+
+    Pipeline functions take an optional profile and record their stages into
+    it (see stage()). A stage that runs several times (e.g. once per
+    streamed chunk) accumulates: seconds, rows and RSS growth are summed,
+    peaks are the largest seen.
+
+    Memory is always reported per stage as the peak resident memory (RSS)
+    reached during the stage, including memory allocated and freed before it
+    ended, and the RSS growth (resident memory at the end minus at the
+    start, which can be negative). Both are read from /proc (Linux only):
+    the kernel's RSS high-water mark is reset when a stage starts (see
+    reset_peak_rss()). The high-water mark belongs to the whole process, so
+    stages running at the same time in other threads (e.g. other Streamlit
+    sessions) can reset it under each other and under-report their peaks.
+
+    With trace_memory=True, each stage's own peak allocation (Python objects
+    and NumPy arrays, on top of what was allocated when it started) is
+    traced with tracemalloc as well; this is exact but slows pure-Python
+    stages several times over. All of these only cover the current process:
+    work done in worker processes is timed only.
+
+    Attributes:
+        stages (dict): {name: {"seconds", "rows", "calls", "peak_bytes", "peak_rss_bytes",
+            "rss_growth_bytes"}}.
+        trace_memory (bool): Whether per-stage allocations are traced.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.started = time.perf_counter()
+        self._open_peaks = []      # Highest traced memory seen so far by each open stage
+        self._open_rss_peaks = []  # Highest RSS seen so far by each open stage
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """
+        Times the body of a with block as one run of the named stage.
+
+        The block receives a dict whose "rows" entry can be set when the row
+        count is only known at the end (e.g. after reading a chunk).
+
+        Args:
+            name (str): Stage name, preferably one of PROFILE_STAGES.
+            rows (int): Rows processed by this run (for rows/sec).
+        """
+        run = {"rows": rows}
+        tracing = self.trace_memory
+        started_tracing = tracing and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if tracing:
+            # reset_peak() below would hide the peak so far from enclosing stages: hand it to them first
+            self._raise_open_peaks(tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            self._open_peaks.append(baseline)
+        start = time.perf_counter()
+        try:
+            with self.measure_rss() as memory:
+                yield run
+        finally:
+            seconds = time.perf_counter() - start
+            peak = None
+            if tracing:
+                stage_peak = max(tracemalloc.get_traced_memory()[1], self._open_peaks.pop())
+                self._raise_open_peaks(stage_peak)
+                peak = stage_peak - baseline
+                if started_tracing:
+                    tracemalloc.stop()
+            self.add(name, seconds, run["rows"], peak, memory["rss_growth_bytes"], memory["peak_rss_bytes"])
+
+    @contextmanager
+    def measure_rss(self):
+        """
+        Measures the resident memory of the body of a with block.
+
+        The block receives a dict whose "peak_rss_bytes" (RSS high-water mark
+        during the block) and "rss_growth_bytes" entries are filled in on
+        exit; either is None where it cannot be measured. Used by stage(),
+        and directly where stage times are split after the fact (see
+        nlp_utils._analyze_values()).
+        """
+        memory = {"peak_rss_bytes": None, "rss_growth_bytes": None}
+        # Resetting the high-water mark would hide the peak so far from enclosing stages: hand it to them first
+        peak_so_far = peak_rss_bytes()
+        if peak_so_far is not None:
+            self._open_rss_peaks[:] = [max(p, peak_so_far) for p in self._open_rss_peaks]
+        resettable = reset_peak_rss()
+        rss_start = rss_bytes()
+        self._open_rss_peaks.append(rss_start or 0)
+        try:
+            yield memory
+        finally:
+            rss_end = rss_bytes()
+            peak = max(peak_rss_bytes() or 0, self._open_rss_peaks.pop())
+            self._open_rss_peaks[:] = [max(p, peak) for p in self._open_rss_peaks]
+            if resettable:
+                memory["peak_rss_bytes"] = peak
+            if rss_start is not None and rss_end is not None:
+                memory["rss_growth_bytes"] = rss_end - rss_start
+
+    def _raise_open_peaks(self, peak):
+        self._open_peaks[:] = [max(p, peak) for p in self._open_peaks]
+
+    def add(self, name, seconds, rows=None, peak_bytes=None, rss_growth_bytes=None, peak_rss_bytes=None):
+        """Records one run of a stage measured elsewhere (e.g. in a worker process)."""
+        entry = self.stages.setdefault(name, {
+            "seconds": 0.0, "rows": None, "calls": 0, "peak_bytes": None, "peak_rss_bytes": None,
+            "rss_growth_bytes": None,
+        })
+        entry["seconds"] += seconds
+        entry["calls"] += 1
+        if rows is not None:
+            entry["rows"] = (entry["rows"] or 0) + int(rows)
+        for key, value in (("peak_bytes", peak_bytes), ("peak_rss_bytes", peak_rss_bytes)):
+            if value is not None:
+                entry[key] = max(entry[key] or 0, int(value))
+        if rss_growth_bytes is not None:
+            entry["rss_growth_bytes"] = (entry["rss_growth_bytes"] or 0) + int(rss_growth_bytes)
+
+    def to_frame(self):
+        """
+        One row per stage with seconds, rows, calls, rows_per_second, peak_mb
+        (traced; NaN unless trace_memory), peak_rss_mb and rss_growth_mb (NaN
+        where they cannot be measured) and share (of the total stage time),
+        in PROFILE_STAGES order.
+        """
+        names = sorted(self.stages, key=lambda n: (PROFILE_STAGES.index(n) if n in PROFILE_STAGES
+                                                   else len(PROFILE_STAGES), n))
+        frame = pd.DataFrame(
+            [self.stages[n] for n in names], index=pd.Index(names, name="stage"),
+            columns=["seconds", "rows", "calls", "peak_bytes", "peak_rss_bytes", "rss_growth_bytes"],
+        )
+        frame["rows"] = frame["rows"].astype("Int64")
+        frame["rows_per_second"] = (frame["rows"] / frame["seconds"].where(frame["seconds"] > 0)).round(0)
+        frame["peak_mb"] = (frame["peak_bytes"].astype(float) / 2 ** 20).round(1)
+        frame["peak_rss_mb"] = (frame["peak_rss_bytes"].astype(float) / 2 ** 20).round(1)
+        frame["rss_growth_mb"] = (frame["rss_growth_bytes"].astype(float) / 2 ** 20).round(1)
+        total = frame["seconds"].sum()
+        frame["share"] = frame["seconds"] / total if total else 0.0
+        return frame.drop(columns=["peak_bytes", "peak_rss_bytes", "rss_growth_bytes"])
+
+    def to_dict(self):
+        """
+        JSON-serializable summary: stages, total stage and wall seconds, and
+        max_rss_mb, the process's all-time peak RSS (for a long-running server,
+        not specific to this run).
+        """
+        stages = {}
+        for name, row in self.to_frame().iterrows():
+            stages[name] = {
+                "seconds": round(float(row["seconds"]), 4),
+                "rows": None if pd.isna(row["rows"]) else int(row["rows"]),
+                "calls": int(row["calls"]),
+                "rows_per_second": None if pd.isna(row["rows_per_second"]) else float(row["rows_per_second"]),
+                "peak_mb": None if pd.isna(row["peak_mb"]) else float(row["peak_mb"]),
+                "peak_rss_mb": None if pd.isna(row["peak_rss_mb"]) else float(row["peak_rss_mb"]),
+                "rss_growth_mb": None if pd.isna(row["rss_growth_mb"]) else float(row["rss_growth_mb"]),
+            }
+        return {
+            "stages": stages,
+            "stage_seconds": round(sum(s["seconds"] for s in self.stages.values()), 4),
+            "wall_seconds": round(time.perf_counter() - self.started, 4),
+            "max_rss_mb": None if max_rss_bytes() is None else round(max_rss_bytes() / 2 ** 20, 1),
+        }
+
+    def write_json(self, path, **metadata):
+        """
+        Appends this profile as one JSON line to path (a JSON Lines log).
+
+        One line per run makes the log easy to compare across releases, e.g.
+        with pd.read_json(path, lines=True). Extra keyword arguments (such as
+        pipeline_version or rows) are stored alongside the profile.
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        record = {"recorded_at": datetime.now(timezone.utc).isoformat(), **metadata, **self.to_dict()}
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+def stage(profile, name, rows=None):
+    """profile.stage(name, rows), or a no-op context when profile is None."""
+    return nullcontext({"rows": rows}) if profile is None else profile.stage(name, rows)
+
+def rss_bytes():
+    """Current resident memory of this process in bytes, or None where unavailable (non-Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def peak_rss_bytes():
+    """This process's RSS high-water mark since the last reset_peak_rss(), or None where unavailable."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+# Highest RSS high-water mark seen before a reset: resets also lower ru_maxrss
+_peak_before_resets = 0
+_reset_lock = threading.Lock()
+
+def reset_peak_rss():
+    """
+    Resets this process's RSS high-water mark to its current RSS (Linux >= 4.0).
+
+    Writes 5 to /proc/self/clear_refs. The peak reached so far is kept for
+    max_rss_bytes().
+
+    Returns:
+        bool: Whether the high-water mark could be reset.
+    """
+    global _peak_before_resets
+    with _reset_lock:
+        peak = peak_rss_bytes()
+        if peak is None:
+            return False
+        _peak_before_resets = max(_peak_before_resets, peak)
+        try:
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
+        except OSError:
+            return False
+    return True
+
+def max_rss_bytes():
+    """Peak resident memory of this process so far in bytes, or None where unavailable."""
+    peaks = [_peak_before_resets, peak_rss_bytes() or 0]
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        peaks.append(peak if sys.platform == "darwin" else peak * 1024)
+    return max(peaks) or None
@@ -0,0 +1,206 @@
+import hashlib
+import os
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+# Hive-style partition keys: <root>/platform=<platform>/date=<YYYY-MM-DD>/batch-<id>-<n>.arrow
+PARTITION_COLUMNS = ("platform", "date")
+
+# Every batch is written with this schema (missing columns are null), so files
+# from different sources and runs can be read as one dataset
+_LABELS = pa.dictionary(pa.int8(), pa.string())
+STORE_SCHEMA = pa.schema([
+    ("comment_id", pa.string()),
+    ("comment_text", pa.string()),
+    ("clean_text", pa.string()),
+    ("sentiment_score", pa.float64()),
+    ("sentiment_label", _LABELS),
+    ("topic_cluster", pa.int32()),
+    ("topic_keywords", pa.dictionary(pa.int32(), pa.string())),
+    ("likes", pa.int64()),
+    ("timestamp", pa.timestamp("us")),
+    ("batch_id", _LABELS),
+    ("topic_model", pa.dictionary(pa.int32(), pa.string())),
+])
+
+# Schema of rows as read back, with the partition keys as columns
+_TABLE_SCHEMA = STORE_SCHEMA.append(pa.field("platform", pa.string())).append(pa.field("date", pa.string()))
+
+# Arrow IPC files are stored uncompressed so they can be memory-mapped and read zero-copy
+STORE_FORMATS = ("ipc", "parquet")
+
+def _partitioning():
+    schema = pa.schema([_TABLE_SCHEMA.field(c) for c in PARTITION_COLUMNS])
+    return ds.partitioning(schema, flavor="hive")
+
+def append_results(df, root, topic_keywords, batch_id=None, file_format="ipc", topic_model=None, part=None):
+    """
+    Appends an analyzed batch to a columnar results store partitioned by platform and date.
+
+    Every call writes new files named after its batch id, so existing
+    partitions are never rewritten. Topic ids are only meaningful within a
+    batch, unless the batch was labelled by a persisted TopicModel, so each
+    row also stores its batch id, the id of that model and its topic's
+    keywords.
+
+    Args:
+        df (pd.DataFrame): Analyzed comments (clean_text, sentiment_score,
+            sentiment_label, topic_cluster; platform and timestamp/published_at
+            are used for partitioning when present).
+        root (str): Store directory (created if needed).
+        topic_keywords (list): Keyword string for each topic of this batch.
+        batch_id (str): Optional batch id; a timestamped unique id by default.
+        file_format (str): One of STORE_FORMATS.
+        topic_model (str): Optional TopicModel.model_id that labelled the
+            batch; batches with the same model_id share topic ids.
+        part (int): Part number when one batch is appended in several calls
+            (e.g. chunk by chunk, passing the returned batch id back in);
+            each part writes its own files.
+
+    Returns:
+        str: The batch id.
+    """
+    if file_format not in STORE_FORMATS:
+        raise ValueError(f"Unknown store format {file_format!r}; expected one of {STORE_FORMATS}")
+    if batch_id is None:
+        batch_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:8]
+
+    out = pd.DataFrame(index=df.index)
+    for column in ("comment_id", "comment_text", "clean_text", "sentiment_score", "sentiment_label", "likes"):
+        out[column] = df[column] if column in df.columns else None
+    out["comment_id"] = out["comment_id"].astype(object).where(out["comment_id"].notna(), None).map(
+        lambda value: value if value is None else str(value)
+    )
+    out["topic_cluster"] = df["topic_cluster"].astype(np.int32) if "topic_cluster" in df.columns else np.int32(-1)
+
+    # YouTube comments carry an ISO published_at (UTC); store it as a naive UTC timestamp
+    if "timestamp" in df.columns:
+        timestamps = pd.to_datetime(df["timestamp"], errors="coerce")
+    elif "published_at" in df.columns:
+        timestamps = pd.to_datetime(df["published_at"], errors="coerce", utc=True).dt.tz_localize(None)
+    else:
+        timestamps = pd.Series(pd.NaT, index=df.index, dtype="datetime64[us]")
+    out["timestamp"] = timestamps
+
+    # Keywords per row, dictionary-encoded so each distinct string is stored once per file
+    keywords = np.array(list(topic_keywords or []) + [""], dtype=object)
+    clusters = out["topic_cluster"].to_numpy()
+    out["topic_keywords"] = pd.Categorical(keywords[np.where(clusters >= 0, clusters, len(keywords) - 1)])
+    out["batch_id"] = batch_id
+    out["topic_model"] = topic_model
+
+    # Partition keys
+    platform = df["platform"] if "platform" in df.columns else pd.Series("Unknown", index=df.index)
+    out["platform"] = platform.astype(object).fillna("Unknown").astype(str).to_numpy()
+    out["date"] = timestamps.dt.strftime("%Y-%m-%d").fillna("unknown").to_numpy()
+
+    table = pa.Table.from_pandas(out, schema=_TABLE_SCHEMA, preserve_index=False)
+    extension = "arrow" if file_format == "ipc" else "parquet"
+    file_options = None
+    if file_format == "ipc":
+        file_options = ds.IpcFileFormat().make_write_options(compression=None)
+    ds.write_dataset(
+        table,
+        root,
+        format=file_format,
+        partitioning=_partitioning(),
+        basename_template=f"batch-{batch_id}-{{i}}.{extension}" if part is None
+        else f"batch-{batch_id}-{part}-{{i}}.{extension}",
+        existing_data_behavior="overwrite_or_ignore",
+        file_options=file_options,
+    )
+    return batch_id
+
+def open_results(root, platform=None, start_date=None, end_date=None, columns=None):
+    """
+    Opens the store as an Arrow table, memory-mapped where possible.
+
+    Uncompressed Arrow IPC files are memory-mapped, so numeric columns are
+    read zero-copy; partition filters skip whole directories.
+
+    Args:
+        root (str): Store directory.
+        platform (str): Optional exact platform partition to read.
+        start_date, end_date (str): Optional inclusive YYYY-MM-DD bounds.
+        columns (list): Optional subset of columns to read.
+
+    Returns:
+        pa.Table: The matching rows.
+    """
+    filesystem = pafs.LocalFileSystem(use_mmap=True)
+    datasets = []
+    for file_format, extension in (("ipc", ".arrow"), ("parquet", ".parquet")):
+        paths = [
+            os.path.join(dirpath, name)
+            for dirpath, _, names in os.walk(root)
+            for name in names if name.endswith(extension)
+        ]
+        if paths:
+            datasets.append(ds.dataset(
+                paths, schema=_TABLE_SCHEMA, format=file_format, partitioning=_partitioning(),
+                partition_base_dir=root, filesystem=filesystem,
+            ))
+    if not datasets:
+        raise FileNotFoundError(f"No results found in {root}")
+    dataset = datasets[0] if len(datasets) == 1 else ds.dataset(datasets)
+
+    condition = None
+    for expression in (
+        ds.field("platform") == platform if platform else None,
+        ds.field("date") >= start_date if start_date else None,
+        ds.field("date") <= end_date if end_date else None,
+    ):
+        if expression is not None:
+            condition = expression if condition is None else condition & expression
+    return dataset.to_table(columns=columns, filter=condition)
+
+def store_fingerprint(root):
+    """Cheap fingerprint of a store's files (names, sizes, mtimes); changes when a batch is appended."""
+    h = hashlib.blake2b(digest_size=16)
+    for dirpath, _, names in sorted(os.walk(root)):
+        for name in sorted(names):
+            stat = os.stat(os.path.join(dirpath, name))
+            h.update(f"{dirpath}/{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return h.hexdigest()
+
+def load_results_frame(root, **kwargs):
+    """
+    Loads the store into a DataFrame ready for the dashboard.
+
+    Topic ids are renumbered globally over (topic model, topic_cluster)
+    pairs, so topics from different models never collide. Batches labelled
+    by the same persisted TopicModel keep sharing their topics (described
+    by the keywords of the latest such batch); any other batch counts as a
+    model of its own.
+
+    Accepts the same keyword arguments as open_results().
+
+    Returns:
+        tuple: (df, topic_keywords, n_batches) where topic_keywords[i]
+            describes the renumbered topic i.
+    """
+    df = open_results(root, **kwargs).to_pandas()
+    has_topic = df["topic_cluster"].to_numpy() >= 0
+
+    topic_ids = np.full(len(df), -1, dtype=np.int32)
+    topic_keywords = []
+    if has_topic.any():
+        topics = df.loc[has_topic, ["batch_id", "topic_model", "topic_cluster", "topic_keywords"]]
+        batch = topics["batch_id"].astype(str)
+        model = topics["topic_model"].astype(object).where(topics["topic_model"].notna(), "batch:" + batch)
+        group_ids = pd.DataFrame({"model": model, "topic": topics["topic_cluster"]}).groupby(
+            ["model", "topic"], sort=True
+        ).ngroup().to_numpy()
+        topic_ids[has_topic] = group_ids
+        # Batch ids start with their UTC time, so the largest one is the latest batch
+        latest = pd.DataFrame({"group": group_ids, "batch": batch.to_numpy(),
+                               "keywords": topics["topic_keywords"].astype(str).to_numpy()})
+        topic_keywords = latest.sort_values("batch", kind="stable").groupby("group")["keywords"].last().tolist()
+    df["topic_cluster"] = topic_ids
+    return df, topic_keywords, int(df["batch_id"].nunique())
@@ -0,0 +1,228 @@
+import numpy as np
+
+from csv_ingest import StreamAggregates, concat_chunks
+from dedup import fan_out
+from engagement import impact_from_sums, impact_sums
+from keyword_index import KeywordIndex
+from nlp_utils import MINIBATCH_MIN_ROWS, TOPIC_VOCABULARY_SIZE, select_n_topics, text_mask
+from profiling import stage
+from topic_model import TopicModel
+from trends import TrendCube
+
+# Rows of a streamed file kept for the comment tables (a uniform random sample)
+STREAM_SAMPLE_SIZE = 50_000
+
+# Comments buffered at the start of a stream to fit its topics (or check a saved model for drift)
+TOPIC_FIT_ROWS = 100_000
+
+class StreamState:
+    """
+    Bounded results of a streamed analysis, folded in chunk by chunk.
+
+    add() folds each analyzed chunk (see csv_ingest.stream_analyze_csv())
+    into running aggregates, a keyword index of term totals (overall, per
+    sentiment and per topic), an hourly trend cube, engagement sums per
+    topic and a uniform random sample of rows for the comment tables; the
+    chunk can then be dropped. Memory depends on the vocabulary, the time
+    span, the number of topics and sample_size, not on the number of
+    comments.
+
+    Topics are learned mini-batch style: the first fit_rows comments are
+    buffered to fit a TopicModel (or, given a fitted one, to check it for
+    drift and retrain it if needed), and every later chunk is labelled and
+    folded into the centroids with TopicModel.update(). Early comments are
+    therefore labelled by earlier centroids than later ones. With dedupe,
+    topics see one comment per duplicate group of each chunk.
+
+    Args:
+        n_topics (int or str): Topics of a newly fitted model, or "auto" to
+            choose them with nlp_utils.select_n_topics() on the fit buffer
+            (5 if none can be scored). Replaced by the chosen number once
+            topics are fitted, as is an "auto" engine.
+        engine (str): "auto" or one of nlp_utils.TOPIC_ENGINES; "auto" picks
+            mini-batch clustering when the fit buffer has at least
+            MINIBATCH_MIN_ROWS comments.
+        max_features (int): TF-IDF vocabulary size of a newly fitted model.
+        keyword_ranking (str): One of nlp_utils.KEYWORD_RANKINGS.
+        topic_model (TopicModel): Optional fitted model to continue from.
+        retrain (bool): Retrain topic_model on the fit buffer even without drift.
+        topic_budget (float): Time budget in seconds for n_topics="auto".
+        sample_size (int): Rows kept in sample.
+        fit_rows (int): Comments buffered before topics are fitted.
+        seed (int): Seed of the row sample.
+        profile (PipelineProfile): Optional profile to record the stages into.
+
+    Attributes:
+        aggregates (StreamAggregates): Counts, sums and date range.
+        keyword_index (KeywordIndex): Term totals, grouped by
+            "sentiment_label" and "topic_cluster" (keep_documents=False).
+        trend_cube (TrendCube): Hourly rollup (None until a chunk is folded in).
+        impact_sums (pd.DataFrame): engagement.impact_sums() by topic.
+        sample (pd.DataFrame): At most sample_size analyzed rows, in file order.
+        topic_model (TopicModel): The topic model, or None while buffering and
+            when there were too few comments to fit one.
+        topic_selection (dict): select_n_topics() result for n_topics="auto".
+        topic_report (dict): How topics were obtained: action ("fitted",
+            "assigned" or "retrained") and drift (TopicModel.drift(), for a
+            given model).
+    """
+
+    def __init__(self, n_topics=5, engine="auto", max_features=TOPIC_VOCABULARY_SIZE, keyword_ranking="weight",
+                 topic_model=None, retrain=False, topic_budget=30.0, sample_size=STREAM_SAMPLE_SIZE,
+                 fit_rows=TOPIC_FIT_ROWS, seed=42, profile=None):
+        self.n_topics = n_topics
+        self.engine = engine
+        self.max_features = max_features
+        self.keyword_ranking = keyword_ranking
+        self.retrain = retrain
+        self.topic_budget = topic_budget
+        self.sample_size = sample_size
+        self.fit_rows = fit_rows
+        self.profile = profile
+        self.aggregates = StreamAggregates()
+        self.keyword_index = KeywordIndex(keep_documents=False)
+        self.trend_cube = None
+        self.impact_sums = None
+        self.sample = None
+        self.topic_model = topic_model
+        self.topic_selection = None
+        self.topic_report = None
+        self._rng = np.random.default_rng(seed)
+        self._sample_keys = np.zeros(0)
+        self._pending = []  # Chunks buffered until topics are fitted
+        self._topics_started = False
+
+    @property
+    def topic_keywords(self):
+        return self.topic_model.topic_keywords if self.topic_model is not None else []
+
+    def add(self, chunk):
+        """
+        Folds one analyzed chunk in.
+
+        Returns:
+            list: The chunks folded in by this call, labelled with
+                topic_cluster (-1 = no topic); empty while chunks are
+                buffered for the topic fit.
+        """
+        self.aggregates.update(chunk)
+        if self._topics_started:
+            return [self._fold(chunk, self._label(chunk))]
+        self._pending.append(chunk)
+        if sum(len(c) for c in self._pending) < self.fit_rows:
+            return []
+        return self.finish()
+
+    def finish(self):
+        """
+        Fits topics on whatever is still buffered (a stream shorter than
+        fit_rows) and folds it in. Call once the stream has ended.
+
+        Returns:
+            list: Chunks folded in by this call, as add().
+        """
+        if self._topics_started:
+            return []
+        self._topics_started = True
+        # Folded even when empty, so every result exists once the stream has ended
+        buffered = concat_chunks(self._pending)
+        self._pending = []
+        folded = self._fold(buffered, self._start_topics(buffered))
+        return [folded] if len(folded) else []
+
+    def impact_table(self, confidence=0.95):
+        """engagement.impact_table() by topic over every comment folded in."""
+        return impact_from_sums(self.impact_sums, confidence)
+
+    # ---------------------------
+    # Topics
+    # ---------------------------
+    def _start_topics(self, buffered):
+        """Fits (or checks and updates) the topic model on the fit buffer; returns its labels."""
+        texts, group = _topic_texts(buffered)
+        model = self.topic_model
+        if model is not None:
+            with stage(self.profile, "clustering", len(texts)):
+                drift = model.drift(texts)
+                if self.retrain or drift["needs_retrain"]:
+                    labels, action = model.retrain(texts), "retrained"
+                else:
+                    labels, action = model.update(texts), "assigned"
+            self.topic_report = {"action": action, "drift": drift}
+            return _fan_out(labels, group)
+
+        n_texts = int(text_mask(texts).sum())
+        n_topics = self.n_topics
+        if n_topics == "auto":
+            n_topics = 5
+            if n_texts > 2:
+                with stage(self.profile, "topic selection", len(texts)):
+                    self.topic_selection = select_n_topics(
+                        texts, time_budget=self.topic_budget, max_features=self.max_features
+                    )
+                n_topics = self.topic_selection["n_topics"] or n_topics
+        engine = self.engine
+        if engine == "auto":
+            engine = "minibatch" if len(texts) >= MINIBATCH_MIN_ROWS else "kmeans"
+        self.n_topics, self.engine = n_topics, engine
+        if n_texts <= n_topics:
+            return np.full(len(buffered), -1, dtype=np.int32)
+
+        model = TopicModel(n_topics, engine, self.max_features, self.keyword_ranking)
+        try:
+            with stage(self.profile, "clustering", len(texts)):
+                labels = model.fit(texts)
+        except ValueError:
+            # Stop word removal left no vocabulary
+            return np.full(len(buffered), -1, dtype=np.int32)
+        self.topic_model = model
+        self.topic_report = {"action": "fitted", "drift": None}
+        return _fan_out(labels, group)
+
+    def _label(self, chunk):
+        """Labels a chunk with the current topics and folds it into their centroids."""
+        if self.topic_model is None:
+            return np.full(len(chunk), -1, dtype=np.int32)
+        texts, group = _topic_texts(chunk)
+        with stage(self.profile, "clustering", len(texts)):
+            return _fan_out(self.topic_model.update(texts), group)
+
+    # ---------------------------
+    # Folding
+    # ---------------------------
+    def _fold(self, chunk, topics):
+        chunk = chunk.assign(topic_cluster=np.asarray(topics, dtype=np.int32))
+        with stage(self.profile, "keywords", len(chunk)):
+            self.keyword_index.add(chunk["clean_text"], groups={
+                "sentiment_label": chunk["sentiment_label"], "topic_cluster": chunk["topic_cluster"],
+            })
+        with stage(self.profile, "trends", len(chunk)):
+            cube = TrendCube.build(chunk, freq="h")
+            self.trend_cube = cube if self.trend_cube is None else self.trend_cube.merge(cube)
+        sums = impact_sums(chunk, "topic_cluster")
+        self.impact_sums = sums if self.impact_sums is None else self.impact_sums.add(sums, fill_value=0)
+        self._fold_sample(chunk)
+        return chunk
+
+    def _fold_sample(self, chunk):
+        """
+        Keeps the sample_size rows with the smallest random keys seen so far:
+        a uniform sample of the stream, without knowing its length up front.
+        """
+        keys = np.concatenate([self._sample_keys, self._rng.random(len(chunk))])
+        rows = concat_chunks([self.sample, chunk]) if self.sample is not None else chunk.reset_index(drop=True)
+        if len(rows) > self.sample_size:
+            keep = keys < np.partition(keys, self.sample_size)[self.sample_size]
+            rows, keys = rows[keep].reset_index(drop=True), keys[keep]
+        self.sample, self._sample_keys = rows, keys
+
+def _topic_texts(chunk):
+    """Texts to cluster and the group of every row: with dedupe, one text per duplicate group."""
+    if "duplicate_group" not in chunk.columns:
+        return chunk["clean_text"], None
+    _, first, group = np.unique(chunk["duplicate_group"].to_numpy(), return_index=True, return_inverse=True)
+    return chunk["clean_text"].iloc[first].reset_index(drop=True), group
+
+def _fan_out(labels, group):
+    labels = np.asarray(labels, dtype=np.int32)
+    return labels if group is None else fan_out(labels, group)
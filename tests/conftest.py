@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the app's modules from the repository root, like the benchmarks do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope="session")
+def corpus():
+    """2,000 synthetic comments with the columns of data/sample_comments.csv (treat as read-only)."""
+    from benchmarks.synthetic_corpus import generate_corpus
+
+    return generate_corpus(2_000, seed=7)
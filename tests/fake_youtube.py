@@ -0,0 +1,82 @@
+"""
+Local fake of the YouTube Data API comment endpoint, for tests.
+
+Implements the commentThreads().list(...).execute() chain used by
+youtube_ingest, with deterministic comments, page tokens, a daily quota and
+injectable HTTP errors shaped like googleapiclient's HttpError.
+"""
+import json
+import threading
+from types import SimpleNamespace
+
+class FakeHttpError(Exception):
+    """Mimics googleapiclient.errors.HttpError: resp.status plus a JSON error body."""
+
+    def __init__(self, status, reason=""):
+        super().__init__(f"HTTP {status} {reason}".strip())
+        self.resp = SimpleNamespace(status=status)
+        self.content = json.dumps({"error": {"code": status, "errors": [{"reason": reason}]}}).encode("utf-8")
+
+class FakeYouTube:
+    """
+    In-memory commentThreads API over a fixed set of videos.
+
+    Args:
+        comments (dict): {video_id: number of top-level comments}.
+        quota (int): Successful list() calls allowed before every call fails
+            with 403 quotaExceeded; None for no limit. Can be changed later
+            (e.g. to simulate the quota resetting).
+        failures (dict): {(video_id, page_number): [exception, ...]} raised,
+            in order, by the first executions of that page before it succeeds.
+
+    Attributes:
+        calls (list): (video_id, page_number) of every execution, failed or not.
+    """
+
+    def __init__(self, comments, quota=None, failures=None):
+        self.comments = dict(comments)
+        self.quota = quota
+        self.failures = {key: list(errors) for key, errors in (failures or {}).items()}
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        """Acts as the client factory: every worker thread gets this client."""
+        return self
+
+    def commentThreads(self):
+        return self
+
+    def list(self, part, videoId, maxResults=20, pageToken=None, textFormat="html"):
+        offset = int(pageToken) if pageToken else 0
+        return SimpleNamespace(execute=lambda: self._execute(videoId, offset, maxResults))
+
+    def _execute(self, video_id, offset, page_size):
+        page_number = offset // page_size
+        with self._lock:
+            self.calls.append((video_id, page_number))
+            pending = self.failures.get((video_id, page_number))
+            if pending:
+                raise pending.pop(0)
+            if self.quota is not None:
+                if self.quota <= 0:
+                    raise FakeHttpError(403, "quotaExceeded")
+                self.quota -= 1
+
+        total = self.comments[video_id]
+        end = min(offset + page_size, total)
+        response = {"items": [self._item(video_id, i) for i in range(offset, end)]}
+        if end < total:
+            response["nextPageToken"] = str(end)
+        return response
+
+    @staticmethod
+    def _item(video_id, i):
+        return {
+            "id": f"{video_id}-{i:05d}",
+            "snippet": {"topLevelComment": {"snippet": {
+                "textDisplay": f"Comment {i} on {video_id}",
+                "likeCount": i % 7,
+                "publishedAt": f"2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z",
+            }}},
+        }
@@ -0,0 +1,53 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from comment_view import CommentIndex
+
+def make_frame(n=2_000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "comment_text": [f"comment {i} {'great' if i % 3 else 'bad'}" for i in range(n)],
+        "sentiment_label": rng.choice(["Positive", "Neutral", "Negative"], size=n),
+        "sentiment_score": rng.uniform(-1, 1, size=n),
+        "likes": rng.integers(0, 50, size=n),
+    })
+
+def test_select_filters_searches_and_sorts():
+    df = make_frame()
+    index = CommentIndex(df)
+
+    positions = index.select(sentiment="Negative", search="BAD", sort="Most liked")
+
+    expected = df[(df["sentiment_label"] == "Negative") & df["comment_text"].str.contains("bad")]
+    expected = expected.sort_values("likes", ascending=False, kind="stable")
+    assert positions.tolist() == expected.index.tolist()
+
+def test_query_cache_is_safe_across_threads():
+    # One index is shared by every session; concurrent queries must not corrupt its LRU cache
+    df = make_frame()
+    index = CommentIndex(df, max_cached_queries=4)
+    queries = [(sentiment, search, sort)
+               for sentiment in (None, "Positive", "Negative")
+               for search in ("", "great", "bad", "1")
+               for sort in ("Original order", "Most positive", "Most liked")]
+    expected = {q: index.select(sentiment=q[0], search=q[1], sort=q[2]).tolist() for q in queries}
+    errors = []
+
+    def run(offset):
+        try:
+            for i in range(300):
+                q = queries[(i * 7 + offset) % len(queries)]
+                assert index.select(sentiment=q[0], search=q[1], sort=q[2]).tolist() == expected[q]
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run, args=(t,)) for t in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(index._queries) <= 4
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from dedup import duplicate_summary, fan_out, find_duplicate_groups, regroup_duplicates
+from nlp_utils import run_pipeline
+
+BASE = ("the delivery took three weeks and the package arrived damaged with the box open and nothing inside it "
+        "so i called support twice and waited an hour each time before anyone answered and they still have not sent a refund")
+NEAR = BASE.replace("three", "four")            # One word of forty changed
+OTHER = "love the new camera the colors are amazing and the battery lasts all day long without charging"
+
+def test_exact_duplicates_are_grouped_by_first_appearance():
+    group, representatives = find_duplicate_groups(["b", "a", "b", "c", "a", "b"], threshold=None)
+
+    assert group.tolist() == [0, 1, 0, 2, 1, 0]
+    assert representatives.tolist() == [0, 1, 3]
+
+def test_near_duplicates_are_grouped_and_unrelated_texts_are_not():
+    texts = [OTHER, BASE, "great", NEAR, BASE]
+
+    group, representatives = find_duplicate_groups(texts)
+
+    assert group.tolist() == [0, 1, 2, 1, 1]
+    assert representatives.tolist() == [0, 1, 2]
+    # Without a threshold only exact copies are grouped
+    assert find_duplicate_groups(texts, threshold=None)[0].tolist() == [0, 1, 2, 3, 1]
+
+def test_missing_and_empty_texts_form_one_group():
+    group, _ = find_duplicate_groups([None, "", np.nan, "text"])
+
+    assert group.tolist() == [0, 0, 0, 1]
+
+def test_fan_out_copies_group_values_to_rows():
+    assert fan_out(["x", "y"], np.array([1, 0, 1])).tolist() == ["y", "x", "y"]
+
+def test_run_pipeline_scores_one_comment_per_group():
+    df = pd.DataFrame({"comment_text": [OTHER, BASE, NEAR.upper() + "!!", BASE]})
+
+    out = run_pipeline(df, workers=1, dedupe=True)
+
+    assert out["duplicate_group"].tolist() == [0, 1, 1, 1]
+    assert out["duplicate_count"].tolist() == [1, 3, 3, 3]
+    # Rows keep their own cleaned text but share their representative's sentiment
+    assert out.loc[2, "clean_text"] == NEAR
+    assert out["sentiment_score"].iloc[1:].nunique() == 1
+    assert duplicate_summary(out) == {
+        "rows": 4, "groups": 2, "duplicates": 2, "saved_share": 0.5, "largest_group": 3,
+    }
+    assert duplicate_summary(df) is None
+
+def test_regroup_duplicates_groups_copies_across_chunks():
+    chunks = [run_pipeline(pd.DataFrame({"comment_text": texts}), workers=1, dedupe=True)
+              for texts in ([BASE, OTHER], [OTHER, NEAR])]
+    df = pd.concat(chunks, ignore_index=True)
+
+    regrouped = regroup_duplicates(df)
+
+    assert regrouped["duplicate_group"].tolist() == [0, 1, 1, 0]
+    assert regrouped["duplicate_count"].tolist() == [2, 2, 2, 2]
+    pd.testing.assert_series_equal(regrouped["sentiment_score"], df["sentiment_score"])
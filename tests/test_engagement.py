@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engagement import IMPACT_COLUMNS, engagement_weights, impact_table, rank_impact
+
+def comments(labels, topic=0, likes=None, scores=None):
+    """Analyzed comments of one topic, scored -0.5 / 0 / 0.5 by label unless given."""
+    default = {"Negative": -0.5, "Neutral": 0.0, "Positive": 0.5}
+    frame = pd.DataFrame({
+        "topic_cluster": topic,
+        "sentiment_label": labels,
+        "sentiment_score": [default[label] for label in labels] if scores is None else scores,
+    })
+    return frame if likes is None else frame.assign(likes=likes)
+
+def test_without_likes_shares_are_plain_proportions_with_wilson_intervals():
+    df = comments(["Negative"] * 2 + ["Positive"] * 3 + ["Neutral"] * 5)
+
+    row = impact_table(df).loc[0]
+
+    assert list(impact_table(df).columns) == list(IMPACT_COLUMNS)
+    assert (row["comments"], row["negative"], row["positive"]) == (10, 2, 3)
+    assert row["engagement"] == row["effective_n"] == 10
+    assert row["negative_share"] == pytest.approx(0.2)
+    # Wilson 95% interval of 2 successes in 10 trials
+    assert row["negative_low"] == pytest.approx(0.0567, abs=1e-4)
+    assert row["negative_high"] == pytest.approx(0.5098, abs=1e-4)
+    assert row["negative_impact"] == pytest.approx(2)
+    assert row["negative_impact_low"] == pytest.approx(10 * row["negative_low"])
+    assert row["negative_impact_high"] == pytest.approx(10 * row["negative_high"])
+
+def test_mean_score_interval_is_normal_around_the_mean():
+    scores = [-0.4, -0.2, 0.0, 0.2, 0.6]
+    df = comments(["Neutral"] * 5, scores=scores)
+
+    row = impact_table(df, confidence=0.9).loc[0]
+
+    margin = 1.6449 * np.std(scores) / np.sqrt(5)
+    assert row["mean_score"] == pytest.approx(0.04)
+    assert row["score_low"] == pytest.approx(0.04 - margin, abs=1e-4)
+    assert row["score_high"] == pytest.approx(0.04 + margin, abs=1e-4)
+
+def test_one_viral_comment_widens_the_interval():
+    labels = ["Negative"] + ["Neutral"] * 9
+    spread = impact_table(comments(labels, likes=[0] * 10)).loc[0]
+    viral = impact_table(comments(labels, likes=[200] + [0] * 9)).loc[0]
+
+    assert viral["engagement"] == 210
+    assert viral["negative_share"] == pytest.approx(201 / 210)
+    assert viral["negative_impact"] == pytest.approx(201)
+    # Kish effective size: 210² / (201² + 9), barely more than one comment
+    assert viral["effective_n"] == pytest.approx(210 ** 2 / (201 ** 2 + 9))
+    assert viral["negative_high"] - viral["negative_low"] > 2 * (spread["negative_high"] - spread["negative_low"])
+
+@pytest.mark.parametrize("likes", [None, [0, 5, 50, 1, 0, 3, 0, 12]])
+def test_intervals_contain_the_share(likes):
+    df = comments(["Negative", "Positive", "Negative", "Neutral", "Positive", "Positive", "Neutral", "Negative"],
+                  likes=likes)
+
+    table = impact_table(df, by=None)
+
+    assert table.index.tolist() == ["all"]
+    for name in ("negative", "positive"):
+        assert (table[f"{name}_low"] <= table[f"{name}_share"]).all()
+        assert (table[f"{name}_share"] <= table[f"{name}_high"]).all()
+        assert ((0 <= table[f"{name}_low"]) & (table[f"{name}_high"] <= 1)).all()
+    assert (table["score_low"] <= table["mean_score"]).all() and (table["mean_score"] <= table["score_high"]).all()
+
+def test_missing_or_negative_likes_weigh_one():
+    df = comments(["Neutral"] * 4, likes=[np.nan, -3, "n/a", 4])
+
+    assert engagement_weights(df).tolist() == [1, 1, 1, 5]
+
+def test_groups_are_ranked_by_impact():
+    df = pd.concat([
+        comments(["Negative"] * 3 + ["Neutral"] * 7, topic=0),
+        comments(["Negative"] * 3, topic=1),
+        comments(["Negative"] + ["Neutral"] * 2, topic=2, likes=[10, 0, 0]),
+        comments(["Neutral"], topic=np.nan),
+    ], ignore_index=True)
+
+    table = impact_table(df)
+
+    assert table.index.tolist() == [0, 1, 2]  # Missing topics are left out
+    assert table["negative_impact"].tolist() == pytest.approx([3, 3, 11])
+    # Equal impact: 3 of 3 negative has the higher lower bound, so it ranks before 3 of 10
+    assert rank_impact(table).index.tolist() == [2, 1, 0]
+    assert rank_impact(table, top_n=1).index.tolist() == [2]
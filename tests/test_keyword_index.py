@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from keyword_index import KeywordIndex
+
+TEXTS = ["refund refund delay", "great battery", "battery delay delay", None, "refund great great"]
+SENTIMENT = ["Negative", "Positive", "Negative", "Neutral", "Positive"]
+
+def totals(index, counts):
+    return {term: int(counts[column]) for term, column in index.vocabulary.items() if counts[column]}
+
+def test_totals_count_repeated_words_in_one_comment():
+    index = KeywordIndex().add(TEXTS)
+
+    assert totals(index, index.counts()) == {"refund": 3, "delay": 3, "great": 3, "battery": 2}
+    assert np.array_equal(index.counts(), np.asarray(index.matrix.sum(axis=0)).ravel())
+
+@pytest.mark.parametrize("keep_documents", [True, False])
+def test_group_totals_added_in_chunks_match_row_subsets(keep_documents):
+    index = KeywordIndex(keep_documents=keep_documents)
+    for start in (0, 2, 4):  # Later chunks bring new terms
+        index.add(TEXTS[start:start + 2], groups={"sentiment_label": SENTIMENT[start:start + 2]})
+
+    full = KeywordIndex().add(TEXTS)
+    assert totals(index, index.counts()) == totals(full, full.counts())
+    for label in ("Negative", "Positive"):
+        rows = np.asarray(SENTIMENT) == label
+        expected = totals(full, full.counts(rows))
+        assert totals(index, index.counts(group=("sentiment_label", label))) == expected
+    assert index.top(2, group=("sentiment_label", "Negative")).to_dict() == {"delay": 3, "refund": 2}
+    assert index.top(group=("sentiment_label", "Neutral")).empty
+
+def test_totals_only_index_has_no_matrix():
+    index = KeywordIndex(keep_documents=False).add(TEXTS)
+
+    assert index.n_docs == len(TEXTS)
+    with pytest.raises(ValueError):
+        index.matrix
@@ -0,0 +1,124 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nlp_cache import NLPCache
+from nlp_utils import (
+    SENTIMENT_TOLERANCE, clean_text, clean_texts, get_sentiment, get_sentiments, run_pipeline, select_n_topics,
+    worker_pool,
+)
+
+EDGE_CASES = [
+    None, np.nan, "", "   ", 5, "Héllo WORLD!!", "İstanbul", "@a#b", "#tag@user", "http://x@y #tag www.z.com end",
+    "a@b.com", "visit https://t.co/x?y=1,great", "😍 love it!!!", "tab\there\nnew  line", "sep\x1einside",
+]
+
+# ---------------------------
+# Batch cleaning
+# ---------------------------
+
+def test_clean_texts_matches_clean_text(corpus):
+    texts = corpus["comment_text"]
+
+    result = clean_texts(texts)
+
+    assert result.index.equals(texts.index)
+    assert result.tolist() == [clean_text(t) for t in texts]
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 100_000])
+def test_clean_texts_matches_clean_text_on_edge_cases(chunk_size):
+    assert clean_texts(EDGE_CASES, chunk_size=chunk_size) == [clean_text(t) for t in EDGE_CASES]
+
+def test_clean_texts_accepts_empty_input():
+    assert clean_texts([]) == []
+    assert clean_texts(pd.Series([], dtype=object)).empty
+
+# ---------------------------
+# Batch sentiment
+# ---------------------------
+# Negations, intensifiers, repeated and unknown words, and (for raw text) the
+# punctuation and contractions that send a comment down TextBlob's own tokenizer
+SENTIMENT_CASES = [
+    "", "good", "not good", "not very good", "very very good", "really bad", "never bad at all",
+    "good good good", "xyzzy plugh", "love it but the battery is terrible", "Great!!!", "I don't like it.",
+    "\u201cbest\u201d purchase ever", "meh\nnot great", "so-so :)",
+]
+
+def assert_matches_textblob(texts):
+    expected = [get_sentiment(t) for t in texts]
+
+    scores, labels = get_sentiments(texts)
+
+    assert np.max(np.abs(scores - [score for score, _ in expected]), initial=0.0) <= SENTIMENT_TOLERANCE
+    assert labels.tolist() == [label for _, label in expected]
+
+def test_get_sentiments_matches_textblob_on_cleaned_comments(corpus):
+    assert_matches_textblob(clean_texts(corpus["comment_text"]).tolist())
+
+def test_get_sentiments_matches_textblob_on_edge_cases():
+    assert_matches_textblob(SENTIMENT_CASES)
+    assert_matches_textblob(clean_texts(SENTIMENT_CASES))
+
+def test_get_sentiments_treats_missing_text_as_neutral():
+    scores, labels = get_sentiments([None, np.nan, ""])
+
+    assert scores.tolist() == [0.0, 0.0, 0.0]
+    assert labels.tolist() == ["Neutral"] * 3
+
+# ---------------------------
+# Parallel pipeline
+# ---------------------------
+
+@pytest.fixture(scope="module")
+def pool():
+    with worker_pool(2) as executor:
+        yield executor
+
+@pytest.fixture
+def shuffled(corpus):
+    """The corpus in a shuffled order with a non-default index, plus exact repeats."""
+    df = pd.concat([corpus, corpus.head(300)]).sample(frac=1.0, random_state=3)
+    return df.set_axis(pd.Index(np.arange(len(df)) * 10 + 7, name="row"))
+
+@pytest.mark.parametrize("use_cache", [False, True])
+@pytest.mark.parametrize("dedupe", [False, True])
+def test_run_pipeline_in_parallel_keeps_row_order(shuffled, pool, tmp_path, use_cache, dedupe):
+    expected = run_pipeline(shuffled, workers=1, dedupe=dedupe)
+    cache = NLPCache(str(tmp_path / "cache.sqlite")) if use_cache else None
+    try:
+        # Small tasks, so rows travel through many chunks and pool tasks
+        for _ in range(2 if use_cache else 1):  # Cold, then warm cache
+            result = run_pipeline(shuffled, workers=2, chunk_size=97, min_parallel_rows=1, cache=cache,
+                                  dedupe=dedupe, executor=pool)
+            pd.testing.assert_frame_equal(result, expected)
+    finally:
+        if cache is not None:
+            cache.close()
+
+def test_run_pipeline_matches_the_serial_path_with_its_own_pool(shuffled):
+    result = run_pipeline(shuffled, workers=2, min_parallel_rows=1)
+
+    pd.testing.assert_frame_equal(result, run_pipeline(shuffled, workers=1))
+    assert result["clean_text"].tolist() == [clean_text(t) for t in shuffled["comment_text"]]
+
+# ---------------------------
+# Topic-count selection
+# ---------------------------
+
+def test_select_n_topics_separates_budget_skips_from_degenerate_candidates():
+    texts = ["battery drains fast"] * 10 + ["camera looks great"] * 10
+    result = select_n_topics(texts, k_values=[2, 3], time_budget=-1.0, workers=2)
+    assert result["n_topics"] is None
+    assert result["skipped"] == [2, 3]
+    assert result["degenerate"] == []
+
+    # Identical documents always fall into a single cluster, which cannot be scored
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # KMeans warns about the duplicate points
+        result = select_n_topics(["battery drains fast"] * 10, k_values=[2, 3], workers=2)
+    assert result["n_topics"] is None
+    assert result["scores"] == {}
+    assert result["degenerate"] == [2, 3]
+    assert result["skipped"] == []
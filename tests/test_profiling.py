@@ -0,0 +1,27 @@
+import pytest
+
+from profiling import PipelineProfile, reset_peak_rss
+
+def touch(n_bytes):
+    """Allocates n_bytes and writes every page, so they become resident."""
+    buffer = bytearray(n_bytes)
+    buffer[::4096] = b"\1" * len(buffer[::4096])
+    return buffer
+
+@pytest.mark.skipif(not reset_peak_rss(), reason="needs /proc/self/clear_refs (Linux)")
+def test_stage_peak_rss_includes_memory_freed_before_the_stage_ends():
+    profile = PipelineProfile()
+    with profile.stage("output"):
+        with profile.stage("cleaning"):
+            touch(200 * 2 ** 20)  # Freed again before the stage ends
+        with profile.stage("sentiment"):
+            kept = touch(20 * 2 ** 20)
+
+    table = profile.to_frame()
+    # The temporary 200 MB shows in the peak of its own stage and of the enclosing one...
+    assert table.loc["cleaning", "peak_rss_mb"] - table.loc["sentiment", "peak_rss_mb"] > 150
+    assert table.loc["output", "peak_rss_mb"] == table.loc["cleaning", "peak_rss_mb"]
+    # ...but not in the growth, which only counts what the stage kept
+    assert abs(table.loc["cleaning", "rss_growth_mb"]) < 20
+    assert table.loc["sentiment", "rss_growth_mb"] >= 15
+    assert len(kept)
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from results_store import append_results, load_results_frame
+
+def batch(topics, platform="YouTube", day="2024-01-01"):
+    """An analyzed batch with one comment per entry of topics."""
+    n = len(topics)
+    return pd.DataFrame({
+        "comment_text": [f"comment {i}" for i in range(n)],
+        "clean_text": [f"comment {i}" for i in range(n)],
+        "sentiment_score": np.linspace(-1, 1, n),
+        "sentiment_label": ["Negative"] * (n // 2) + ["Positive"] * (n - n // 2),
+        "topic_cluster": topics,
+        "platform": platform,
+        "timestamp": pd.Timestamp(day),
+    })
+
+@pytest.mark.parametrize("file_format", ["ipc", "parquet"])
+def test_batches_of_one_topic_model_share_topic_ids(tmp_path, file_format):
+    root = str(tmp_path)
+    append_results(batch([0, 1, 2, 0]), root, ["a0", "a1", "a2"], batch_id="20240101T000000-1",
+                   file_format=file_format, topic_model="model-a")
+    append_results(batch([2, 1, -1], platform="Instagram", day="2024-01-02"), root, ["a0'", "a1'", "a2'"],
+                   batch_id="20240102T000000-2", file_format=file_format, topic_model="model-a")
+    append_results(batch([0, 1]), root, ["b0", "b1"], batch_id="20240103T000000-3", file_format=file_format)
+
+    df, topic_keywords, n_batches = load_results_frame(root)
+
+    assert n_batches == 3
+    # Model A's three topics plus two topics of the model-less batch
+    assert len(topic_keywords) == 5
+    ids = {(row.batch_id, row.comment_text): row.topic_cluster for row in df.itertuples()}
+    first, second, third = "20240101T000000-1", "20240102T000000-2", "20240103T000000-3"
+    assert ids[(first, "comment 2")] == ids[(second, "comment 0")]   # Topic 2 of model A
+    assert ids[(first, "comment 1")] == ids[(second, "comment 1")]   # Topic 1 of model A
+    assert ids[(second, "comment 2")] == -1
+    assert ids[(third, "comment 0")] not in {ids[(first, f"comment {i}")] for i in range(4)}
+    # Shared topics are described by the latest batch's keywords
+    assert topic_keywords[ids[(first, "comment 1")]] == "a1'"
+    assert topic_keywords[ids[(third, "comment 1")]] == "b1"
+    assert sorted(set(df["topic_cluster"]) - {-1}) == list(range(5))
+
+def test_batches_without_a_topic_model_never_share_topic_ids(tmp_path):
+    root = str(tmp_path)
+    append_results(batch([0, 1]), root, ["x0", "x1"], batch_id="20240101T000000-1")
+    append_results(batch([0, 1]), root, ["y0", "y1"], batch_id="20240102T000000-2")
+
+    df, topic_keywords, _ = load_results_frame(root)
+
+    assert len(topic_keywords) == 4
+    assert df.groupby("batch_id", observed=True)["topic_cluster"].apply(frozenset).nunique() == 2
+    assert sorted(topic_keywords) == ["x0", "x1", "y0", "y1"]
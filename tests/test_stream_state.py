@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engagement import impact_table
+from keyword_index import KeywordIndex
+from nlp_utils import run_pipeline
+from stream_state import StreamState
+
+@pytest.fixture(scope="module")
+def analyzed(corpus):
+    return run_pipeline(corpus, workers=1)
+
+def stream(analyzed, state, chunk_size=500):
+    folded = []
+    for start in range(0, len(analyzed), chunk_size):
+        folded += state.add(analyzed.iloc[start:start + chunk_size])
+    return folded + state.finish()
+
+def test_folded_chunks_cover_the_stream_in_order(analyzed):
+    state = StreamState(n_topics=3, engine="kmeans", sample_size=300, fit_rows=800)
+
+    folded = stream(analyzed, state)
+
+    result = pd.concat(folded, ignore_index=True)
+    assert result["comment_text"].tolist() == analyzed["comment_text"].tolist()
+    assert set(result["topic_cluster"]) <= {-1, 0, 1, 2}  # -1: nothing left after cleaning
+    assert state.aggregates.rows == len(analyzed)
+    assert state.topic_report["action"] == "fitted" and len(state.topic_keywords) == 3
+
+def test_bounded_results_match_the_folded_rows(analyzed):
+    state = StreamState(n_topics=3, engine="kmeans", sample_size=300, fit_rows=800)
+
+    result = pd.concat(stream(analyzed, state), ignore_index=True)
+
+    pd.testing.assert_frame_equal(state.impact_table(), impact_table(result))
+    full = KeywordIndex().add(result["clean_text"])
+    for term, count in full.top(50).items():
+        assert state.keyword_index.counts()[state.keyword_index.vocabulary[term]] == count
+    negative = result["sentiment_label"] == "Negative"
+    assert state.keyword_index.top(10, group=("sentiment_label", "Negative")).to_dict() == \
+        full.top(10, rows=negative.to_numpy()).to_dict()
+    assert state.trend_cube.cells["count"].sum() == len(result)
+
+def test_sample_is_capped_and_drawn_from_the_whole_stream(analyzed):
+    state = StreamState(n_topics=3, engine="kmeans", sample_size=300, fit_rows=800)
+
+    stream(analyzed, state, chunk_size=200)
+
+    assert len(state.sample) == 300
+    assert state.sample["comment_text"].isin(analyzed["comment_text"]).all()
+    positions = np.flatnonzero(analyzed["comment_text"].isin(state.sample["comment_text"]).to_numpy())
+    assert positions.min() < len(analyzed) // 4 and positions.max() > 3 * len(analyzed) // 4
+
+def test_short_stream_is_fitted_on_finish(analyzed):
+    state = StreamState(n_topics=3, engine="kmeans", fit_rows=10_000)
+
+    assert state.add(analyzed.iloc[:400]) == []
+    folded = state.finish()
+
+    assert len(folded) == 1 and len(folded[0]) == 400
+    assert state.topic_model is not None and state.finish() == []
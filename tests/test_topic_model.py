@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic_corpus import generate_corpus
+from nlp_utils import clean_texts
+from topic_model import TopicModel, _match_topics
+
+@pytest.fixture(scope="module")
+def texts():
+    return clean_texts(generate_corpus(2_000, seed=7)["comment_text"]).tolist()
+
+@pytest.fixture(scope="module")
+def later_texts():
+    """A later batch on the same topics, in a different order (so KMeans starts differently)."""
+    return clean_texts(generate_corpus(2_000, seed=8)["comment_text"]).tolist()[::-1]
+
+def keyword_sets(model):
+    return [set(k.split(", ")) for k in model.topic_keywords]
+
+def test_retrain_keeps_topic_ids_stable(texts, later_texts):
+    model = TopicModel(n_topics=6)
+    labels = model.fit(texts)
+    keywords = keyword_sets(model)
+    model_id = model.model_id
+
+    relabelled = model.retrain(later_texts)
+
+    assert model.model_id == model_id
+    assert len(relabelled) == len(later_texts)
+    # Each topic keeps its id: its keywords overlap most with its own old keywords
+    for topic, new_keywords in enumerate(keyword_sets(model)):
+        overlaps = [len(new_keywords & old) for old in keywords]
+        assert int(np.argmax(overlaps)) == topic
+    # ...and the first batch mostly keeps its labels (a fresh fit numbers topics arbitrarily)
+    assert np.mean(model.predict(texts) == labels) > 0.7
+    fresh = TopicModel(n_topics=6)
+    fresh.fit(later_texts)
+    assert np.mean(fresh.predict(texts) == labels) < 0.5
+
+def test_match_topics_recovers_a_permutation():
+    rng = np.random.default_rng(0)
+    old_terms = np.array([f"term{i}" for i in range(40)])
+    old_centers = rng.random((5, 40)) ** 4
+    topic_order = np.array([3, 0, 4, 1, 2])
+    term_order = rng.permutation(40)
+
+    order = _match_topics(old_centers, old_terms, old_centers[topic_order][:, term_order], old_terms[term_order])
+
+    # order[new_id] = position of that topic in the new model
+    assert np.array_equal(topic_order[order], np.arange(5))
+
+def test_update_labels_against_the_model_before_updating(texts):
+    model = TopicModel(n_topics=6)
+    model.fit(texts[:1_000])
+    expected = model.predict(texts[1_000:])
+    counts = model.counts.copy()
+
+    labels = model.update(texts[1_000:])
+
+    assert np.array_equal(labels, expected)
+    # Every labelled comment is folded into its topic's running mean
+    assert np.array_equal(model.counts - counts, np.bincount(labels[labels >= 0], minlength=6))
+
+def test_saved_model_keeps_its_id(texts, tmp_path):
+    model = TopicModel(n_topics=4)
+    model.fit(texts[:500])
+    path = str(tmp_path / "model.pkl")
+    model.save(path)
+
+    loaded = TopicModel.load(path)
+
+    assert loaded.model_id == model.model_id
+    assert np.array_equal(loaded.predict(texts), model.predict(texts))
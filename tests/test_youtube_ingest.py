@@ -0,0 +1,124 @@
+import json
+
+import pytest
+
+import youtube_ingest
+from fake_youtube import FakeHttpError, FakeYouTube
+from youtube_ingest import MAX_PAGE_SIZE, QuotaExceededError, fetch_comments, iter_comment_pages
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Records backoff delays instead of sleeping."""
+    delays = []
+    monkeypatch.setattr(youtube_ingest.time, "sleep", delays.append)
+    return delays
+
+def comment_ids(df):
+    return sorted(df["comment_id"])
+
+def test_fetches_every_comment_of_every_video():
+    fake = FakeYouTube({"vid_a": 250, "vid_b": 30})
+
+    df = fetch_comments(fake, ["vid_a", "vid_b", "vid_a"], max_comments=1_000)
+
+    assert len(df) == 280
+    assert df["comment_id"].is_unique
+    assert set(df["platform"]) == {"YouTube"}
+    assert df.groupby("video_id").size().to_dict() == {"vid_a": 250, "vid_b": 30}
+
+def test_cap_limits_comments_and_stops_fetching():
+    fake = FakeYouTube({"vid_a": 1_000, "vid_b": 1_000, "vid_c": 1_000})
+
+    df = fetch_comments(fake, ["vid_a", "vid_b", "vid_c"], max_comments=250, workers=3)
+
+    assert len(df) == 250
+    assert df["comment_id"].is_unique
+    # Workers stop once the cap is reached: at most one page in flight per video past it
+    assert len(fake.calls) <= 250 // MAX_PAGE_SIZE + 1 + 3
+
+@pytest.mark.parametrize("status, reason", [(429, ""), (500, ""), (503, ""), (403, "rateLimitExceeded")])
+def test_retries_rate_limits_and_server_errors_with_backoff(sleeps, status, reason):
+    errors = [FakeHttpError(status, reason) for _ in range(3)]
+    fake = FakeYouTube({"vid_a": 150}, failures={("vid_a", 1): errors})
+
+    df = fetch_comments(fake, ["vid_a"], max_comments=1_000, backoff_seconds=1.0)
+
+    assert len(df) == 150
+    assert fake.calls == [("vid_a", 0)] + [("vid_a", 1)] * 4
+    # Exponential backoff: 1, 2, 4 seconds plus up to 1 second of jitter
+    assert len(sleeps) == 3
+    for attempt, delay in enumerate(sleeps):
+        assert 2 ** attempt <= delay <= 2 ** attempt + 1
+
+def test_gives_up_after_max_retries(sleeps):
+    errors = [FakeHttpError(503) for _ in range(10)]
+    fake = FakeYouTube({"vid_a": 50}, failures={("vid_a", 0): errors})
+
+    with pytest.raises(FakeHttpError):
+        fetch_comments(fake, ["vid_a"], max_retries=2, backoff_seconds=0.0)
+
+    assert len(fake.calls) == 3
+    assert len(sleeps) == 2
+
+def test_client_errors_are_not_retried(sleeps):
+    fake = FakeYouTube({"vid_a": 50}, failures={("vid_a", 0): [FakeHttpError(404, "videoNotFound")]})
+
+    with pytest.raises(FakeHttpError):
+        fetch_comments(fake, ["vid_a"])
+
+    assert len(fake.calls) == 1
+    assert sleeps == []
+
+def test_quota_exhaustion_raises_and_resumes_where_it_stopped(tmp_path, sleeps):
+    fake = FakeYouTube({"vid_a": 450}, quota=2)
+    state_dir = str(tmp_path / "state")
+
+    with pytest.raises(QuotaExceededError):
+        fetch_comments(fake, ["vid_a"], max_comments=1_000, state_dir=state_dir)
+    assert sleeps == []  # Quota errors are not retried
+
+    # The quota resets: only the pages not fetched yet are requested
+    fake.quota = None
+    fake.calls.clear()
+    df = fetch_comments(fake, ["vid_a"], max_comments=1_000, state_dir=state_dir)
+
+    assert comment_ids(df) == [f"vid_a-{i:05d}" for i in range(450)]
+    assert fake.calls == [("vid_a", 2), ("vid_a", 3), ("vid_a", 4)]
+
+def test_quota_error_surfaces_after_other_videos_finish(tmp_path):
+    fake = FakeYouTube({"vid_a": 300, "vid_b": 40},
+                       failures={("vid_a", 1): [FakeHttpError(403, "quotaExceeded")]})
+    pages = []
+
+    with pytest.raises(QuotaExceededError):
+        for video_id, rows in iter_comment_pages(fake, ["vid_a", "vid_b"], max_comments=1_000,
+                                                 state_dir=str(tmp_path)):
+            pages.append((video_id, len(rows)))
+
+    assert ("vid_b", 40) in pages
+
+def test_resume_does_not_duplicate_a_page_fetched_before_the_crash(tmp_path):
+    state_dir = str(tmp_path)
+    fake = FakeYouTube({"vid_a": 250})
+    fetch_comments(fake, ["vid_a"], max_comments=150, state_dir=state_dir)
+
+    # Simulate a crash after page 1 was appended but before its state was saved:
+    # the state still points at page 1, whose rows are already on disk
+    with open(tmp_path / "vid_a.json", "w", encoding="utf-8") as f:
+        json.dump({"page_token": "100", "complete": False}, f)
+
+    fake.calls.clear()
+    df = fetch_comments(fake, ["vid_a"], max_comments=1_000, state_dir=state_dir)
+
+    assert comment_ids(df) == [f"vid_a-{i:05d}" for i in range(250)]
+    assert fake.calls == [("vid_a", 1), ("vid_a", 2)]
+
+def test_completed_video_is_fetched_again_from_the_start(tmp_path):
+    fake = FakeYouTube({"vid_a": 120})
+    fetch_comments(fake, ["vid_a"], state_dir=str(tmp_path))
+
+    fake.calls.clear()
+    df = fetch_comments(fake, ["vid_a"], state_dir=str(tmp_path))
+
+    assert len(df) == 120
+    assert fake.calls == [("vid_a", 0), ("vid_a", 1)]
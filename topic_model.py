@@ -0,0 +1,301 @@
+import hashlib
+import os
+import pickle
+import uuid
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from nlp_cache import PIPELINE_VERSION
+from nlp_utils import TOPIC_VOCABULARY_SIZE, centroid_keywords, fit_topic_model, text_mask
+
+# Bump when the pickled layout changes; older files are refused by load()
+MODEL_FORMAT = 1
+
+# Drift thresholds (see TopicModel.drift)
+DRIFT_DISTANCE_RATIO = 1.25  # Mean distance to the nearest topic vs. the fit baseline
+DRIFT_UNKNOWN_SHARE = 0.15   # Increase in the share of comments with no known vocabulary
+
+# Rows used to measure the fit-time baseline
+BASELINE_SAMPLE_SIZE = 20_000
+
+class TopicModel:
+    """
+    A persisted TF-IDF + K-Means topic model that labels new comments without refitting.
+
+    fit() learns the vocabulary and topic centroids once. New comments are
+    then labelled with predict() against the frozen vocabulary and centroids,
+    update() additionally folds them into the centroids (an online running
+    mean, so topic ids never move), and drift() reports when the vocabulary
+    or topic structure has shifted enough that retrain() is worthwhile.
+    retrain() fits from scratch and then renumbers the new topics to match
+    the old ones, so topic ids stay stable across weekly reports.
+
+    Attributes:
+        model_id (str): Identifies this model's topic numbering; kept across
+            update() and retrain(), so results labelled by the same model
+            can share topic ids (see results_store.load_results_frame).
+        vectorizer (TfidfVectorizer): The fitted vectorizer.
+        model (KMeans or MiniBatchKMeans): The fitted clustering model.
+        counts (np.ndarray): Comments folded into each topic so far.
+        topic_keywords (list): Keyword string per topic.
+        baseline (dict): Fit-time mean distance and unknown-vocabulary share.
+    """
+
+    def __init__(self, n_topics=5, engine="kmeans", max_features=TOPIC_VOCABULARY_SIZE,
+                 keyword_ranking="weight"):
+        self.n_topics = n_topics
+        self.engine = engine
+        self.max_features = max_features
+        self.keyword_ranking = keyword_ranking
+        self.model_id = uuid.uuid4().hex
+        self.vectorizer = None
+        self.model = None
+        self.counts = None
+        self.topic_keywords = []
+        self.baseline = None
+        self.docs_since_fit = 0
+
+    @property
+    def is_fitted(self):
+        return self.model is not None
+
+    def fit(self, texts):
+        """
+        Fits the vocabulary and topics from scratch.
+
+        Args:
+            texts (iterable): Cleaned texts (empty ones are ignored).
+
+        Returns:
+            np.ndarray: Topic per input text (-1 for empty texts).
+
+        Raises:
+            ValueError: If there are fewer non-empty texts than topics, or no
+                vocabulary is left after stop word removal.
+        """
+        values = list(texts)
+        has_text = text_mask(values)
+        docs = [t for t, keep in zip(values, has_text) if keep]
+        if len(docs) < self.n_topics:
+            raise ValueError(f"Need at least {self.n_topics} non-empty texts to fit {self.n_topics} topics")
+
+        labels, self.model, self.vectorizer = fit_topic_model(
+            docs, self.n_topics, self.engine, max_features=self.max_features
+        )
+        self.counts = np.bincount(labels, minlength=self.n_topics).astype(np.int64)
+        self._refresh_keywords()
+        self.baseline = self._measure(self._sample(docs))
+        self.docs_since_fit = 0
+
+        clusters = np.full(len(values), -1, dtype=np.int32)
+        clusters[has_text] = labels
+        return clusters
+
+    def predict(self, texts):
+        """
+        Labels texts against the frozen vocabulary and centroids.
+
+        Texts that are empty, or contain no word from the vocabulary, get -1.
+
+        Returns:
+            np.ndarray: Topic per input text.
+        """
+        X, has_text = self._vectorize(texts)
+        clusters = np.full(len(has_text), -1, dtype=np.int32)
+        if X.shape[0]:
+            known = X.getnnz(axis=1) > 0
+            labels = self.model.predict(X)
+            clusters[np.flatnonzero(has_text)[known]] = labels[known]
+        return clusters
+
+    def update(self, texts):
+        """
+        Labels new texts and folds them into the topic centroids.
+
+        Each centroid moves to the running mean of every comment assigned to
+        it so far, so one small delta only nudges it and topic ids are kept.
+
+        Returns:
+            np.ndarray: Topic per input text (labels from before the update).
+        """
+        X, has_text = self._vectorize(texts)
+        clusters = np.full(len(has_text), -1, dtype=np.int32)
+        if not X.shape[0]:
+            return clusters
+        known = X.getnnz(axis=1) > 0
+        X = X[known]
+        labels = self.model.predict(X)
+        clusters[np.flatnonzero(has_text)[known]] = labels
+
+        # Running mean per topic: sum the new rows of each topic with one sparse product
+        indicator = sp.csr_matrix(
+            (np.ones(len(labels)), (labels, np.arange(len(labels)))), shape=(self.n_topics, len(labels))
+        )
+        sums = np.asarray((indicator @ X).todense())
+        added = np.bincount(labels, minlength=self.n_topics)
+        total = self.counts + added
+        centers = self.model.cluster_centers_
+        moved = added > 0
+        centers[moved] = (centers[moved] * self.counts[moved, None] + sums[moved]) / total[moved, None]
+        self.counts = total
+        self.docs_since_fit += len(labels)
+        self._refresh_keywords()
+        return clusters
+
+    def drift(self, texts):
+        """
+        Compares a batch of texts to the fit-time baseline.
+
+        Returns:
+            dict: docs, mean_distance, distance_ratio (vs. baseline; 0 when
+                no text has known terms), unknown_share (non-empty texts with no known vocabulary),
+                unknown_increase (vs. baseline) and needs_retrain.
+        """
+        values, has_text = self._texts_and_mask(texts)
+        stats = self._measure([t for t, keep in zip(values, has_text) if keep])
+        ratio = stats["mean_distance"] / self.baseline["mean_distance"] if self.baseline["mean_distance"] else 1.0
+        increase = stats["unknown_share"] - self.baseline["unknown_share"]
+        return {
+            "docs": stats["docs"],
+            "mean_distance": stats["mean_distance"],
+            "distance_ratio": ratio,
+            "unknown_share": stats["unknown_share"],
+            "unknown_increase": increase,
+            "needs_retrain": bool(stats["docs"]) and (ratio > DRIFT_DISTANCE_RATIO or increase > DRIFT_UNKNOWN_SHARE),
+        }
+
+    def retrain(self, texts, n_topics=None):
+        """
+        Fits from scratch, then renumbers topics to match the previous model.
+
+        New centroids are matched to old ones by cosine similarity over the
+        terms both vocabularies share (Hungarian assignment), so a topic that
+        survives the retrain keeps its id. Unmatched topics take the free ids.
+
+        Args:
+            texts (iterable): Cleaned texts to fit on.
+            n_topics (int): Optional new number of topics.
+
+        Returns:
+            np.ndarray: Topic per input text, using the stable ids.
+        """
+        if not self.is_fitted:
+            if n_topics is not None:
+                self.n_topics = n_topics
+            return self.fit(texts)
+
+        old_centers = self.model.cluster_centers_
+        old_terms = self.vectorizer.get_feature_names_out()
+        if n_topics is not None:
+            self.n_topics = n_topics
+        clusters = self.fit(texts)
+
+        order = _match_topics(old_centers, old_terms, self.model.cluster_centers_,
+                              self.vectorizer.get_feature_names_out())
+        # order[new_id] = position of that topic in the freshly fitted model
+        self.model.cluster_centers_ = self.model.cluster_centers_[order]
+        self.counts = self.counts[order]
+        if hasattr(self.model, "labels_"):
+            self.model.labels_ = np.argsort(order)[self.model.labels_]
+        self._refresh_keywords()
+        remap = np.append(np.argsort(order), -1)  # -1 stays -1
+        return remap[clusters].astype(np.int32)
+
+    def save(self, path):
+        """Pickles the model; the file is replaced atomically."""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        state = {"format": MODEL_FORMAT, "pipeline_version": PIPELINE_VERSION, "state": self.__dict__}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a model written by save(). Only load files you created: this unpickles.
+
+        Raises:
+            ValueError: If the file was written by an incompatible version.
+        """
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("format") != MODEL_FORMAT or state.get("pipeline_version") != PIPELINE_VERSION:
+            raise ValueError(f"{path} was written by an incompatible version; retrain the topic model")
+        model = cls()  # Attributes added since the file was written keep their defaults
+        model.__dict__.update(state["state"])
+        if "model_id" not in state["state"]:
+            # Saved before models had ids: the file's location is the next best stable identity
+            model.model_id = hashlib.blake2b(os.path.abspath(path).encode("utf-8"), digest_size=16).hexdigest()
+        return model
+
+    # ---------------------------
+    # Internals
+    # ---------------------------
+    def _texts_and_mask(self, texts):
+        values = texts.tolist() if isinstance(texts, pd.Series) else list(texts)
+        return values, text_mask(values)
+
+    def _vectorize(self, texts):
+        values, has_text = self._texts_and_mask(texts)
+        docs = [t for t, keep in zip(values, has_text) if keep]
+        if not docs:
+            return sp.csr_matrix((0, len(self.vectorizer.vocabulary_))), has_text
+        return self.vectorizer.transform(docs), has_text
+
+    def _sample(self, docs):
+        if len(docs) <= BASELINE_SAMPLE_SIZE:
+            return docs
+        rng = np.random.default_rng(42)
+        return [docs[i] for i in np.sort(rng.choice(len(docs), BASELINE_SAMPLE_SIZE, replace=False))]
+
+    def _measure(self, docs):
+        """Mean distance to the nearest centroid and share of docs with no known terms."""
+        if not docs:
+            return {"docs": 0, "mean_distance": 0.0, "unknown_share": 0.0}
+        X = self.vectorizer.transform(docs)
+        known = X.getnnz(axis=1) > 0
+        distance = float(self.model.transform(X[known]).min(axis=1).mean()) if known.any() else 0.0
+        return {"docs": len(docs), "mean_distance": distance, "unknown_share": float(1 - known.mean())}
+
+    def _refresh_keywords(self):
+        self.topic_keywords = centroid_keywords(
+            self.model.cluster_centers_, self.vectorizer.get_feature_names_out(), ranking=self.keyword_ranking
+        )
+
+def _match_topics(old_centers, old_terms, new_centers, new_terms):
+    """
+    Returns order such that new_centers[order] lines up with the old topic ids.
+
+    Old topic j is matched to at most one new topic; matched topics whose old
+    id is still in range keep it, the rest fill the remaining ids in order.
+    """
+    # Project both centroid sets onto the shared vocabulary
+    old_index = {term: i for i, term in enumerate(old_terms)}
+    shared = [(old_index[term], j) for j, term in enumerate(new_terms) if term in old_index]
+    n_new = len(new_centers)
+    if not shared:
+        return np.arange(n_new)
+    old_cols, new_cols = map(list, zip(*shared))
+    old = old_centers[:, old_cols]
+    new = new_centers[:, new_cols]
+    old = old / np.maximum(np.linalg.norm(old, axis=1, keepdims=True), 1e-12)
+    new = new / np.maximum(np.linalg.norm(new, axis=1, keepdims=True), 1e-12)
+    from scipy.optimize import linear_sum_assignment
+
+    new_rows, old_rows = linear_sum_assignment(-(new @ old.T))
+
+    order = np.full(n_new, -1)
+    unplaced = []
+    for new_row, old_row in zip(new_rows, old_rows):
+        if old_row < n_new:
+            order[old_row] = new_row
+        else:
+            unplaced.append(new_row)
+    matched = set(new_rows)
+    unplaced = sorted(unplaced + [i for i in range(n_new) if i not in matched])
+    order[order == -1] = unplaced
+    return order
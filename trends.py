@@ -0,0 +1,240 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Rollup granularities: label -> pandas offset alias
+TREND_FREQUENCIES = {"Hourly": "h", "Daily": "D", "Weekly": "W-MON"}
+
+# Dimensions of a cube cell, and the additive measures stored per cell
+CUBE_DIMENSIONS = ("bucket", "platform", "sentiment_label", "topic_cluster")
+CUBE_MEASURES = ("count", "score_sum", "likes_sum")
+
+# Measures accepted by TrendCube.series()
+TREND_MEASURES = ("count", "likes", "score_sum", "mean_score", "share")
+
+SENTIMENT_LABELS = ["Positive", "Neutral", "Negative"]
+
+class TrendCube:
+    """
+    Pre-aggregated sentiment/topic rollups by time bucket x platform x sentiment x topic.
+
+    Raw comments are scanned once, by build(). Every trend query (volume,
+    mean sentiment, sentiment share, coarser buckets, rolling windows and
+    spikes) is then answered from the cube cells, whose number is bounded by
+    buckets x platforms x 3 x topics rather than by comments. Measures are
+    additive, so cubes built from separate batches can be merged.
+
+    Attributes:
+        freq (str): Pandas offset alias of the bucket size (e.g. "h").
+        cells (pd.DataFrame): One row per non-empty cell, with CUBE_DIMENSIONS
+            (categorical platform/sentiment, int16 topic, -1 = no topic) and
+            CUBE_MEASURES.
+    """
+
+    def __init__(self, cells, freq="h"):
+        self.cells = cells
+        self.freq = freq
+
+    @classmethod
+    def build(cls, df, freq="h"):
+        """
+        Aggregates analyzed comments into a cube.
+
+        Uses the timestamp column (or published_at for YouTube comments);
+        rows without a parseable time are left out.
+
+        Args:
+            df (pd.DataFrame): Analyzed comments with sentiment_label and
+                sentiment_score, optionally platform, topic_cluster and likes.
+            freq (str): Bucket size, a pandas offset alias.
+
+        Returns:
+            TrendCube
+        """
+        timestamps = _timestamps(df)
+        keep = timestamps.notna().to_numpy()
+        rows = df[keep]
+
+        def column(name, default):
+            return rows[name].to_numpy() if name in rows.columns else np.full(len(rows), default)
+
+        frame = pd.DataFrame({
+            "bucket": _bucket(timestamps[keep], freq).to_numpy(),
+            "platform": pd.Categorical(pd.Series(column("platform", "Unknown"), dtype=object).fillna("Unknown")),
+            "sentiment_label": pd.Categorical(column("sentiment_label", "Neutral"), categories=SENTIMENT_LABELS),
+            "topic_cluster": column("topic_cluster", -1).astype(np.int16),
+            "count": np.ones(len(rows), dtype=np.int64),
+            "score_sum": column("sentiment_score", 0.0).astype(np.float64),
+            "likes_sum": pd.to_numeric(pd.Series(column("likes", 0)), errors="coerce").fillna(0).to_numpy(np.int64),
+        })
+        return cls(_sum_cells(frame), freq)
+
+    def merge(self, other):
+        """Combines two cubes of the same bucket size (e.g. a stored cube and a new batch)."""
+        if other.freq != self.freq:
+            raise ValueError(f"Cannot merge a {other.freq!r} cube into a {self.freq!r} cube")
+        return TrendCube(_sum_cells(pd.concat([_plain(self.cells), _plain(other.cells)], ignore_index=True)),
+                         self.freq)
+
+    def rollup(self, freq):
+        """
+        Re-buckets the cube to a coarser granularity without touching raw rows.
+
+        Args:
+            freq (str): A pandas offset alias coarser than self.freq.
+
+        Returns:
+            TrendCube
+        """
+        if freq == self.freq:
+            return self
+        cells = _plain(self.cells)
+        cells["bucket"] = _bucket(cells["bucket"], freq)
+        return TrendCube(_sum_cells(cells), freq)
+
+    def series(self, measure="count", by="sentiment_label", platform=None, topic=None, freq=None):
+        """
+        A trend table with one row per bucket (empty buckets included).
+
+        Args:
+            measure (str): One of TREND_MEASURES: "count", "likes",
+                "score_sum", "mean_score" (mean sentiment score) or "share"
+                (each column's share of its bucket's comments).
+            by (str): Column split: "sentiment_label", "platform",
+                "topic_cluster" or None for a single "total" column.
+            platform (str): Optional platform to restrict to.
+            topic (int): Optional topic to restrict to.
+            freq (str): Optional coarser granularity (see rollup()).
+
+        Returns:
+            pd.DataFrame: Indexed by bucket start time.
+        """
+        if measure not in TREND_MEASURES:
+            raise ValueError(f"Unknown measure {measure!r}; expected one of {TREND_MEASURES}")
+        cube = self.rollup(freq) if freq else self
+        cells = cube.cells
+        if platform is not None:
+            cells = cells[cells["platform"] == platform]
+        if topic is not None:
+            cells = cells[cells["topic_cluster"] == topic]
+
+        keys = ["bucket"] if by is None else ["bucket", by]
+        grouped = cells.groupby(keys, observed=True)[list(CUBE_MEASURES)].sum()
+        if measure == "mean_score":
+            values = grouped["score_sum"] / grouped["count"]
+        elif measure == "score_sum":
+            values = grouped["score_sum"]
+        elif measure == "likes":
+            values = grouped["likes_sum"]
+        else:
+            values = grouped["count"]
+        table = values.to_frame("total") if by is None else values.unstack(by)
+        if by == "sentiment_label":
+            table = table.reindex(columns=SENTIMENT_LABELS)
+        table.columns = [str(c) for c in table.columns]
+        table = table.reindex(cube.buckets())
+
+        if measure == "share":
+            totals = table.sum(axis=1)
+            table = table.div(totals.where(totals > 0), axis=0)
+        elif measure != "mean_score":
+            table = table.fillna(0)
+            if measure != "score_sum":
+                table = table.astype(np.int64)
+        return table
+
+    def buckets(self):
+        """Every bucket start from the first to the last non-empty bucket."""
+        if self.cells.empty:
+            return pd.DatetimeIndex([], name="bucket")
+        first, last = self.cells["bucket"].min(), self.cells["bucket"].max()
+        return pd.date_range(first, last, freq=self.freq, name="bucket")
+
+    def save(self, path):
+        """Writes the cube as Parquet; the bucket size is kept in the file metadata."""
+        table = pa.Table.from_pandas(self.cells, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[b"trend_freq"] = self.freq.encode()
+        pq.write_table(table.replace_schema_metadata(metadata), path)
+
+    @classmethod
+    def load(cls, path):
+        """Reads a cube written by save()."""
+        table = pq.read_table(path)
+        freq = (table.schema.metadata or {}).get(b"trend_freq", b"h").decode()
+        return cls(table.to_pandas(), freq)
+
+def rolling(table, window):
+    """Rolling sum over a count table; window is in buckets (e.g. 24 hourly buckets)."""
+    return table.rolling(window, min_periods=1).sum()
+
+def rolling_mean_score(cube, window, by=None, **kwargs):
+    """
+    Rolling mean sentiment score, weighted by comment count.
+
+    Rolls the score sums and counts separately, so quiet buckets do not
+    weigh as much as busy ones. Accepts the filters of TrendCube.series().
+    """
+    counts = rolling(cube.series("count", by=by, **kwargs), window)
+    score_sums = rolling(cube.series("score_sum", by=by, **kwargs), window)
+    return score_sums / counts.where(counts > 0)
+
+def detect_spikes(series, window=24, threshold=3.0, min_count=5):
+    """
+    Flags buckets that jump well above their trailing baseline.
+
+    The baseline is the mean and standard deviation of the previous window
+    buckets (the current bucket is excluded). The deviation is floored at
+    sqrt(mean) and 1, so a flat or sparse history does not turn every small
+    bump into a spike.
+
+    Args:
+        series (pd.Series): Per-bucket values (e.g. negative comment counts).
+        window (int): Trailing buckets used as the baseline.
+        threshold (float): Minimum z-score of a spike.
+        min_count (float): Minimum value of a spike.
+
+    Returns:
+        pd.DataFrame: One row per spike with value, baseline and z_score.
+    """
+    history = series.shift(1).rolling(window, min_periods=max(2, window // 4))
+    baseline = history.mean()
+    spread = np.maximum(np.maximum(history.std(), np.sqrt(baseline.clip(lower=0))), 1.0)
+    z_score = (series - baseline) / spread
+    spikes = ((z_score >= threshold) & (series >= min_count)).fillna(False)
+    return pd.DataFrame({"value": series, "baseline": baseline, "z_score": z_score})[spikes]
+
+# ---------------------------
+# Internals
+# ---------------------------
+def _timestamps(df):
+    """Comment times as naive datetimes (published_at is UTC and is converted)."""
+    if "timestamp" in df.columns:
+        return pd.to_datetime(df["timestamp"], errors="coerce")
+    if "published_at" in df.columns:
+        return pd.to_datetime(df["published_at"], errors="coerce", utc=True).dt.tz_localize(None)
+    return pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+
+def _bucket(times, freq):
+    """Bucket start for each time; weekly buckets ("W-MON") start on Monday at midnight."""
+    times = pd.Series(times)
+    if freq == "W-MON":
+        days = times.dt.normalize()
+        return days - pd.to_timedelta(days.dt.weekday, unit="D")
+    return times.dt.floor(freq)
+
+def _plain(cells):
+    """Cells with object platform labels, so cubes with different categories can be combined."""
+    return cells.assign(platform=cells["platform"].astype(object))
+
+def _sum_cells(cells):
+    cells = cells.assign(
+        platform=pd.Categorical(cells["platform"]),
+        sentiment_label=pd.Categorical(cells["sentiment_label"], categories=SENTIMENT_LABELS),
+    )
+    return (
+        cells.groupby(list(CUBE_DIMENSIONS), observed=True, sort=True)[list(CUBE_MEASURES)]
+        .sum()
+        .reset_index()
+    )
@@ -0,0 +1,291 @@
+import json
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# HTTP statuses worth retrying with exponential backoff
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# The YouTube Data API returns at most 100 comment threads per page
+MAX_PAGE_SIZE = 100
+
+class QuotaExceededError(Exception):
+    """Raised when the YouTube Data API daily quota is exhausted.
+
+    Page tokens fetched so far are persisted, so the fetch can be resumed
+    once the quota resets.
+    """
+
+def extract_video_id(url):
+    """
+    Extracts the video ID from common YouTube URL formats.
+
+    Args:
+        url (str): A watch URL (...?v=ID), a short URL (youtu.be/ID) or a bare ID.
+
+    Returns:
+        str or None: The video ID, or None if it could not be found.
+    """
+    url = (url or "").strip()
+    if "v=" in url:
+        return url.split("v=")[1].split("&")[0] or None
+    if "youtu.be/" in url:
+        return url.split("youtu.be/")[1].split("?")[0] or None
+    # A bare 11-character video ID
+    if len(url) == 11 and "/" not in url:
+        return url
+    return None
+
+def build_youtube_client(api_key):
+    """
+    Creates a YouTube Data API v3 client.
+
+    httplib2 (used by googleapiclient) is not thread-safe, so each worker
+    thread should create its own client.
+    """
+    from googleapiclient.discovery import build
+    return build("youtube", "v3", developerKey=api_key, cache_discovery=False)
+
+def iter_comment_pages(client_factory, video_ids, max_comments=500, state_dir=None,
+                       workers=4, max_retries=5, backoff_seconds=1.0):
+    """
+    Fetches top-level comments for several videos concurrently, yielding pages as they arrive.
+
+    Each video is paged sequentially (page tokens are sequential), while
+    different videos are fetched in parallel on a thread pool. When state_dir
+    is given, every page is appended to disk together with the next page
+    token, so an interrupted fetch resumes where it stopped; a video whose
+    fetch completed is fetched again from the start.
+
+    Args:
+        client_factory (callable): Returns a YouTube client (or a fake with the
+            same commentThreads().list(...).execute() interface). Called once
+            per worker thread.
+        video_ids (list): Video IDs to fetch.
+        max_comments (int): Cap on the total number of comments yielded.
+        state_dir (str): Optional directory for resumable fetch state.
+        workers (int): Number of videos fetched in parallel.
+        max_retries (int): Retries per page for rate limits and server errors.
+        backoff_seconds (float): Base delay for exponential backoff.
+
+    Yields:
+        tuple: (video_id, rows) where rows is a list of comment dicts with
+            comment_id, video_id, comment_text, likes, published_at and platform.
+
+    Raises:
+        QuotaExceededError: If the API quota ran out (after other videos finish).
+    """
+    video_ids = list(dict.fromkeys(video_ids))
+    if not video_ids or max_comments <= 0:
+        return
+
+    pages = queue.Queue()
+    stop = threading.Event()
+    lock = threading.Lock()
+    fetched = [0]  # Comments received so far by all workers
+
+    def has_capacity():
+        with lock:
+            return not stop.is_set() and fetched[0] < max_comments
+
+    def worker(video_id):
+        try:
+            client = client_factory()
+            for rows in _fetch_video_pages(client, video_id, state_dir, has_capacity,
+                                           max_retries, backoff_seconds):
+                with lock:
+                    fetched[0] += len(rows)
+                pages.put(("page", video_id, rows))
+        except Exception as exc:
+            pages.put(("error", video_id, exc))
+        finally:
+            pages.put(("done", video_id, None))
+
+    errors = []
+    yielded = 0
+    pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(video_ids))))
+    try:
+        for video_id in video_ids:
+            pool.submit(worker, video_id)
+
+        running = len(video_ids)
+        while running:
+            kind, video_id, payload = pages.get()
+            if kind == "done":
+                running -= 1
+            elif kind == "error":
+                errors.append(payload)
+            elif yielded < max_comments:
+                rows = payload[:max_comments - yielded]
+                yielded += len(rows)
+                if rows:
+                    yield video_id, rows
+    finally:
+        # Also reached when the consumer stops iterating early
+        stop.set()
+        pool.shutdown(wait=True)
+
+    if errors:
+        quota_errors = [e for e in errors if isinstance(e, QuotaExceededError)]
+        raise quota_errors[0] if quota_errors else errors[0]
+
+def fetch_comments(client_factory, video_ids, max_comments=500, **kwargs):
+    """
+    Fetches comments for several videos and returns them as one DataFrame.
+
+    Accepts the same keyword arguments as iter_comment_pages().
+
+    Returns:
+        pd.DataFrame: One row per comment (empty if nothing was fetched).
+    """
+    rows = []
+    for _, page in iter_comment_pages(client_factory, video_ids, max_comments, **kwargs):
+        rows.extend(page)
+    return pd.DataFrame(rows)
+
+def _fetch_video_pages(client, video_id, state_dir, has_capacity, max_retries, backoff_seconds):
+    """Yields pages of comment rows for one video, resuming from persisted state."""
+    page_token = None
+    saved_ids = set()
+    if state_dir:
+        state = _load_state(state_dir, video_id)
+        if state is not None and not state["complete"]:
+            saved_rows = _load_rows(state_dir, video_id)
+            if saved_rows:
+                yield saved_rows
+            saved_ids = {row.get("comment_id") for row in saved_rows} - {None}
+            page_token = state["page_token"]
+        else:
+            _reset_state(state_dir, video_id)
+
+    while has_capacity():
+        params = dict(
+            part="snippet",
+            videoId=video_id,
+            maxResults=MAX_PAGE_SIZE,
+            textFormat="plainText",
+        )
+        if page_token:
+            params["pageToken"] = page_token
+        response = _execute_with_backoff(
+            client.commentThreads().list(**params), max_retries, backoff_seconds
+        )
+
+        rows = [_to_row(video_id, item) for item in response.get("items", [])]
+        if saved_ids:
+            # A page appended before a crash, but whose state was not saved, is fetched again
+            rows = [row for row in rows if row["comment_id"] not in saved_ids]
+        page_token = response.get("nextPageToken")
+        if state_dir:
+            _append_rows(state_dir, video_id, rows)
+            _save_state(state_dir, video_id, page_token, complete=page_token is None)
+        yield rows
+
+        if page_token is None:
+            break
+
+def _execute_with_backoff(request, max_retries, backoff_seconds):
+    """Executes an API request, retrying rate limits and server errors."""
+    for attempt in range(max_retries + 1):
+        try:
+            return request.execute()
+        except Exception as exc:
+            status = _http_status(exc)
+            reason = _error_content(exc)
+            if status == 403 and ("quotaExceeded" in reason or "dailyLimitExceeded" in reason):
+                raise QuotaExceededError("YouTube API quota exceeded") from exc
+            retryable = status in RETRY_STATUSES or (status == 403 and "rateLimitExceeded" in reason)
+            if not retryable or attempt == max_retries:
+                raise
+            # Exponential backoff with jitter
+            time.sleep(backoff_seconds * (2 ** attempt) + random.uniform(0, backoff_seconds))
+
+def _http_status(exc):
+    """Returns the HTTP status of a googleapiclient HttpError (or compatible fake)."""
+    status = getattr(getattr(exc, "resp", None), "status", None)
+    try:
+        return int(status)
+    except (TypeError, ValueError):
+        return None
+
+def _error_content(exc):
+    content = getattr(exc, "content", b"") or b""
+    if isinstance(content, bytes):
+        content = content.decode("utf-8", "replace")
+    return str(content)
+
+def _to_row(video_id, item):
+    """Flattens one commentThread resource into a comment row."""
+    comment = item["snippet"]["topLevelComment"]["snippet"]
+    return {
+        "comment_id": item.get("id"),
+        "video_id": video_id,
+        "comment_text": comment.get("textDisplay"),
+        "likes": comment.get("likeCount"),
+        "published_at": comment.get("publishedAt"),
+        "platform": "YouTube",
+    }
+
+# ---------------------------
+# Resumable fetch state
+# ---------------------------
+# <state_dir>/<video_id>.json   {"page_token": ..., "complete": bool}
+# <state_dir>/<video_id>.jsonl  one fetched comment row per line
+
+def _state_paths(state_dir, video_id):
+    base = os.path.join(state_dir, video_id)
+    return base + ".json", base + ".jsonl"
+
+def _load_state(state_dir, video_id):
+    state_path, _ = _state_paths(state_dir, video_id)
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _save_state(state_dir, video_id, page_token, complete):
+    state_path, _ = _state_paths(state_dir, video_id)
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"page_token": page_token, "complete": complete}, f)
+    # Atomic replace so an interrupted write never leaves a corrupt state file
+    os.replace(tmp_path, state_path)
+
+def _reset_state(state_dir, video_id):
+    os.makedirs(state_dir, exist_ok=True)
+    for path in _state_paths(state_dir, video_id):
+        if os.path.exists(path):
+            os.remove(path)
+
+def _append_rows(state_dir, video_id, rows):
+    _, rows_path = _state_paths(state_dir, video_id)
+    with open(rows_path, "a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+
+def _load_rows(state_dir, video_id):
+    """Loads persisted rows, dropping duplicates left by a page written twice."""
+    _, rows_path = _state_paths(state_dir, video_id)
+    rows, seen = [], set()
+    try:
+        with open(rows_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue  # Partially written last line
+                comment_id = row.get("comment_id")
+                if comment_id is not None:
+                    if comment_id in seen:
+                        continue
+                    seen.add(comment_id)
+                rows.append(row)
+    except OSError:
+        pass
+    return rows